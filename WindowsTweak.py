@@ -1,32 +1,65 @@
+import argparse
+import asyncio
+import bisect
 import ctypes
+import csv
 import datetime
+import fnmatch
+import functools
+import gc
+import gzip
+import heapq
+import json
 import locale
+import math
+import multiprocessing
+import operator
 import os
 import platform
+import random
 import re
+import shlex
 import shutil
+import socket
+import struct
 import subprocess
 import sys
 import threading
 import time
+import tracemalloc
 import webbrowser
 import zipfile
+import zlib
+from array import array
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import resource_tracker, shared_memory
 
 # Try importing external libraries, if they fail, they will be installed below
 try:
     import psutil
     import requests
-    import wmi
-    from PyQt5.QtCore import (QObject, QPoint, QSize, Qt, QThread, QTimer,
-                              pyqtSignal, pyqtSlot)
+    from PyQt5.QtCore import (QAbstractTableModel, QEvent, QEventLoop,
+                              QItemSelection,
+                              QItemSelectionModel, QModelIndex, QObject,
+                              QPoint, QPointF, QRectF, QSize,
+                              QSortFilterProxyModel,
+                              Qt, QThread, QTimer, pyqtSignal, pyqtSlot)
     from PyQt5.QtGui import (QBrush, QColor, QCursor, QFont, QFontDatabase,
-                             QIcon, QPainter, QPen)
+                             QIcon, QImage, QKeySequence, QPainter, QPen,
+                             QPolygonF, QTransform)
     from PyQt5.QtWidgets import (QAbstractItemView, QApplication, QCheckBox,
-                                 QComboBox, QFrame, QGridLayout, QGroupBox,
-                                 QHBoxLayout, QHeaderView, QLabel, QLineEdit,
+                                 QComboBox, QFileDialog, QFrame, QGridLayout,
+                                 QGroupBox,
+                                 QHBoxLayout, QHeaderView, QInputDialog,
+                                 QLabel, QLineEdit,
                                  QMainWindow, QMenu, QMessageBox, QProgressBar,
-                                 QPushButton, QScrollArea, QSplitter,
-                                 QStyleFactory, QTableWidget, QTableWidgetItem,
+                                 QPushButton, QScrollArea, QShortcut, QSplitter,
+                                 QStyle, QStyleFactory, QSystemTrayIcon,
+                                 QTableView, QTableWidget,
+                                 QTableWidgetItem,
                                  QTabWidget, QTextEdit, QToolTip, QVBoxLayout,
                                  QWidget)
 except ImportError:
@@ -39,7 +72,9 @@ except ImportError:
 
 def install_and_restart():
     """Installs dependencies and restarts the script if libraries are missing."""
-    required = ["PyQt5", "psutil", "requests", "wmi", "pywin32"]
+    required = ["PyQt5", "psutil", "requests"]
+    if sys.platform == "win32":
+        required += ["wmi", "pywin32"]
     missing = []
 
     for lib in required:
@@ -64,13 +99,22 @@ def install_and_restart():
             sys.exit(1)
 
 
-install_and_restart()
+if __name__ == "__main__":  # Importing the module (tests) must not pip-install
+    install_and_restart()
 
 try:
+    import wmi
     HAS_WMI = True
 except ImportError:
     HAS_WMI = False
 
+try:
+    import numpy as np  # Optional: vectorized process queries
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
 # ============================================================================
 # CONFIGURATION & STYLES
 # ============================================================================
@@ -139,6 +183,24 @@ STYLESHEET = f"""
     }}
     QPushButton#action_btn:hover {{ background-color: {THEME['accent']}; color: black; }}
 
+    QPushButton[tool="true"] {{
+        background-color: #1a1a21;
+        border: 1px solid {THEME['border']};
+        border-radius: 4px;
+        padding-left: 10px;
+        text-align: left;
+        font-size: 10pt;
+    }}
+    QPushButton[tool="true"]:hover {{ background-color: #252530; border: 1px solid {THEME['accent']}; }}
+    QPushButton[tool="true"][installed="true"] {{ border-left: 4px solid {THEME['accent']}; }}
+    QPushButton#section_header {{
+        background-color: {THEME['bg_panel']};
+        color: {THEME['accent']};
+        font-weight: bold;
+        text-align: left;
+        padding: 8px 10px;
+    }}
+
     QTabWidget::pane {{ border: 1px solid {THEME['border']}; }}
     QTabBar::tab {{
         background: {THEME['bg_panel']};
@@ -154,10 +216,11 @@ STYLESHEET = f"""
         color: {THEME['accent']};
         font-weight: bold;
     }}
-    QTableWidget {{ background-color: {THEME['bg_panel']}; gridline-color: #333; border: none; }}
-    QTableWidget::item {{ padding: 5px; }}
+    QTableView {{ background-color: {THEME['bg_panel']}; gridline-color: #333; border: none; }}
+    QTableView::item {{ padding: 5px; }}
     QHeaderView::section {{ background-color: #222; color: {THEME['accent']}; border: 1px solid #333; padding: 4px; }}
     QLineEdit, QComboBox {{ background: "#1a1a21"; border: 1px solid {THEME['border']}; color: {THEME['accent']}; padding: 5px; }}
+    QLineEdit[invalid="true"] {{ border: 1px solid #ff3e3e; }}
     QProgressBar {{ border: 1px solid #333; background: #000; text-align: center; border-radius: 2px; }}
     QProgressBar::chunk {{ background-color: {THEME['accent']}; }}
     QScrollBar:vertical {{ background: {THEME['bg_main']}; width: 12px; }}
@@ -166,6 +229,9 @@ STYLESHEET = f"""
     QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {{ height: 0px; }}
 """
 
+# Persistent app data (caches, configs) lives next to the portable tools
+DATA_DIR = os.path.join(os.getcwd(), "WindowsTweakData")
+
 TOOLS_DB = {
     # ==================================================
     # Cleaning & Optimization (Portable)
@@ -331,6 +397,3905 @@ TOOLS_DB = {
 }
 
 
+# ============================================================================
+# TOOL CATALOG
+# ============================================================================
+
+# First existing file wins; TOOLS_DB above is the built-in fallback
+TOOL_CATALOG_FILES = [os.path.join(DATA_DIR, "tools.json"),
+                      os.path.join(DATA_DIR, "tools.toml")]
+TOOL_CACHE_FILE = os.path.join(DATA_DIR, "tools_cache.json")
+TOOL_CACHE_VERSION = 1
+TOOL_TYPES = ("zip", "exe", "cmd")
+
+
+def _tool_entries(data):
+    """(category, tool) pairs from either catalog shape:
+    {"Category": [tool, ...]} (like TOOLS_DB) or {"tools": [{"category": ...}]}."""
+    if isinstance(data.get("tools"), list):
+        for tool in data["tools"]:
+            yield (tool.get("category", "Other") if isinstance(tool, dict) else "?"), tool
+        return
+    for cat, tools in data.items():
+        if not isinstance(tools, list):
+            raise ValueError(f"Category {cat!r} must be a list of tools")
+        for tool in tools:
+            yield cat, tool
+
+
+def compile_tool(tool, is_64=sys.maxsize > 2**32):
+    """Normalised copy with defaults, the arch-specific exe and hover HTML."""
+    t = dict(tool)
+    t.setdefault("desc", "")
+    t.setdefault("exe_64", "")
+    t.setdefault("exe_32", t["exe_64"])
+    t.pop("category", None)
+    t["exe"] = t["exe_64"] if is_64 else t["exe_32"]
+    t["html"] = (
+        f"<h3 style='color:{THEME['accent']}'>{t['name']}</h3>"
+        f"<p style='font-size:13px'>{t['desc']}</p>"
+        f"<p style='color:#888; font-size:11px'><i>ID: {t['id']} | Type: {t['type']}</i></p>")
+    return t
+
+
+def validate_tools(data):
+    """{category: [compiled tool]} or ValueError listing every problem."""
+    errors = []
+    seen = set()
+    categories = {}
+    for n, (cat, tool) in enumerate(_tool_entries(data)):
+        where = f"{cat}[{n}]"
+        if not isinstance(tool, dict):
+            errors.append(f"{where}: expected a table/object")
+            continue
+        missing = [k for k in ("id", "name", "type") if not tool.get(k)]
+        if tool.get("type") in ("zip", "exe"):
+            missing += [k for k in ("url", "exe_64") if not tool.get(k)]
+        elif tool.get("type") == "cmd" and not tool.get("cmd"):
+            missing.append("cmd")
+        if missing:
+            errors.append(f"{where} ({tool.get('id', '?')}): missing {', '.join(missing)}")
+            continue
+        if tool["type"] not in TOOL_TYPES:
+            errors.append(f"{where} ({tool['id']}): unknown type {tool['type']!r}")
+            continue
+        if tool["id"] in seen:
+            errors.append(f"{where}: duplicate id {tool['id']!r}")
+            continue
+        seen.add(tool["id"])
+        categories.setdefault(cat, []).append(compile_tool(tool))
+    if errors:
+        raise ValueError("; ".join(errors[:10]) + (f" (+{len(errors) - 10} more)"
+                                                    if len(errors) > 10 else ""))
+    return categories
+
+
+def _read_catalog(path):
+    if path.lower().endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ValueError("TOML catalogs need Python 3.11+ or 'tomli'") from None
+        with open(path, "rb") as f:
+            try:
+                return tomllib.load(f)
+            except tomllib.TOMLDecodeError as e:
+                raise ValueError(f"{path}: {e}") from None
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            return json.load(f)
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}") from None
+
+
+class ToolCatalog:
+    """Validated tool catalog, kept in precompiled form next to its source.
+
+    The cache is reused while the source file's size and mtime are
+    unchanged, so startup skips parsing, validation and HTML building.
+    """
+
+    def __init__(self, categories, source="built-in", cached=False):
+        self.categories = categories  # {category: [compiled tool]}
+        self.source = source
+        self.cached = cached
+
+    def __len__(self):
+        return sum(len(t) for t in self.categories.values())
+
+    @classmethod
+    def builtin(cls):
+        return cls(validate_tools(TOOLS_DB))
+
+    @classmethod
+    def load(cls, path=None, cache_path=TOOL_CACHE_FILE):
+        """Catalog from `path` (or the first TOOL_CATALOG_FILES entry that
+        exists), falling back to TOOLS_DB. Raises ValueError if invalid."""
+        if path is None:
+            path = next((p for p in TOOL_CATALOG_FILES if os.path.exists(p)), None)
+            if path is None:
+                return cls.builtin()
+        st = os.stat(path)
+        stamp = [TOOL_CACHE_VERSION, os.path.abspath(path), st.st_size, st.st_mtime_ns,
+                 sys.maxsize > 2**32]
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+            if cache.get("stamp") == stamp:
+                return cls(dict(cache["categories"]), path, cached=True)
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        categories = validate_tools(_read_catalog(path))
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path, "w", encoding="utf-8") as f:
+                json.dump({"stamp": stamp, "categories": list(categories.items())}, f)
+        except OSError:
+            pass
+        return cls(categories, path)
+
+
+# Tool folders remember what the last install wrote, so an update only
+# touches members whose CRC32/size changed in the archive's central directory
+TOOL_INDEX_FILE = ".wt_index.json"
+DeltaStats = namedtuple("DeltaStats", "added changed removed unchanged written")
+
+
+def _file_crc(path, chunk=1 << 20):
+    crc = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(chunk)
+            if not block:
+                return crc
+            crc = zlib.crc32(block, crc)
+
+
+def _member_path(dest, name):
+    """Absolute target of an archive member; None if it escapes `dest`."""
+    path = os.path.normpath(os.path.join(dest, *name.split("/")))
+    root = os.path.normpath(dest)
+    try:
+        if os.path.commonpath([root, path]) != root or path == root:
+            return None
+    except ValueError:  # Another drive
+        return None
+    return path
+
+
+def _write_index(index_path, zip_path, files):
+    tmp = index_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"archive": os.path.basename(zip_path), "files": files}, f)
+    os.replace(tmp, index_path)
+
+
+def delta_extract(zip_path, dest, index_name=TOOL_INDEX_FILE):
+    """Bring `dest` in line with the archive, writing only what changed.
+
+    Members are compared with the index of the previous install; members
+    it does not list (first install, tools unpacked by older versions, or
+    an interrupted update) are checked by size, then CRC. Files the
+    previous install put there but the archive no longer has are removed;
+    anything else in `dest` (user settings written by the tool) is left
+    alone. If a member cannot be written, the index still records every
+    member already in place, and the error is re-raised.
+    """
+    index_path = os.path.join(dest, index_name)
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            old = json.load(f)["files"]
+    except (OSError, ValueError, KeyError):
+        old = None
+    added = changed = unchanged = written = 0
+    files = {}
+    current = dict(old or {})  # What is on disk right now, should we fail midway
+    try:
+        with zipfile.ZipFile(zip_path) as z:
+            for info in z.infolist():  # Central directory only, no member data
+                if info.is_dir():
+                    continue
+                path = _member_path(dest, info.filename)
+                if path is None:
+                    continue  # Unsafe name (absolute or "..")
+                entry = files[info.filename] = [info.CRC, info.file_size]
+                try:
+                    on_disk = os.path.getsize(path)
+                except OSError:
+                    on_disk = None
+                if on_disk == info.file_size:
+                    known = old.get(info.filename) if old else None
+                    same = known == entry if known else _file_crc(path) == info.CRC
+                    if same:
+                        unchanged += 1
+                        current[info.filename] = entry
+                        continue
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = path + ".wt-new"
+                try:
+                    with z.open(info) as src, open(tmp, "wb") as out:
+                        shutil.copyfileobj(src, out, 1 << 20)  # BadZipFile on a bad CRC
+                    os.replace(tmp, path)
+                except BaseException:
+                    try:
+                        os.remove(tmp)
+                    except OSError:
+                        pass
+                    raise
+                current[info.filename] = entry
+                written += info.file_size
+                if on_disk is None:
+                    added += 1
+                else:
+                    changed += 1
+        removed = 0
+        for name in (old or {}).keys() - files.keys():
+            path = _member_path(dest, name)
+            if path is None:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            removed += 1
+            del current[name]
+            # Prune directories the removal emptied, up to `dest`
+            parent = os.path.dirname(path)
+            while parent != os.path.normpath(dest):
+                try:
+                    os.rmdir(parent)
+                except OSError:
+                    break
+                parent = os.path.dirname(parent)
+    except BaseException:
+        if current != (old or {}):
+            try:
+                _write_index(index_path, zip_path, current)
+            except OSError:
+                pass  # Disk full: the old index only makes the next run rewrite more
+        raise
+    _write_index(index_path, zip_path, files)
+    return DeltaStats(added, changed, removed, unchanged, written)
+
+
+# ============================================================================
+# INSTRUMENTATION
+# ============================================================================
+
+# Latency bucket upper bounds in seconds: 1 us .. ~35 s, 8 buckets per doubling
+PERF_BOUNDS = [1e-6 * 2 ** (i / 8) for i in range(201)]
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; add() is a bisect and two increments."""
+    __slots__ = ("name", "counts", "count", "total", "max")
+
+    def __init__(self, name):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(PERF_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(PERF_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (0-100)."""
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return min(PERF_BOUNDS[i] if i < len(PERF_BOUNDS) else self.max, self.max)
+        return self.max
+
+    def summary(self):
+        return {"count": self.count, "total_ms": self.total * 1000,
+                "max_ms": self.max * 1000,
+                **{f"p{q}_ms": self.percentile(q) * 1000 for q in (50, 95, 99)}}
+
+
+class _Span:
+    __slots__ = ("hist", "t0")
+
+    def __init__(self, hist):
+        self.hist = hist
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.add(time.perf_counter() - self.t0)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+def _null_span(name):
+    return NULL_SPAN
+
+
+class Instrumentation:
+    """Named latency histograms for hot paths.
+
+    Disabled by default; span() then returns the shared NULL_SPAN without
+    looking at the histograms. Decorated functions are only wrapped at all
+    when PERF_WRAP was set at import (see instrumented()).
+    """
+
+    def __init__(self):
+        self.hists = {}
+        self.since = time.monotonic()
+        self.enabled = False
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, on):
+        self._enabled = bool(on)
+        # Rebind span() so the disabled path is a single call, no checks
+        self.span = self._span if on else _null_span
+
+    def histogram(self, name):
+        h = self.hists.get(name)
+        if h is None:
+            h = self.hists[name] = LatencyHistogram(name)
+        return h
+
+    def _span(self, name):
+        return _Span(self.histogram(name))
+
+    def reset(self):
+        for h in self.hists.values():
+            h.reset()
+        self.since = time.monotonic()
+
+    def report(self):
+        """name -> summary dict (plus calls/s since the last reset)."""
+        elapsed = max(1e-9, time.monotonic() - self.since)
+        out = {}
+        for name, h in sorted(self.hists.items()):
+            s = h.summary()
+            s["rate"] = h.count / elapsed
+            out[name] = s
+        return out
+
+    def dump(self, path, extra=None):
+        data = {"host": platform.node(), "created": datetime.datetime.now().isoformat(),
+                "window_s": time.monotonic() - self.since, "bounds_s": PERF_BOUNDS,
+                "paths": {n: dict(s, counts=self.hists[n].counts)
+                          for n, s in self.report().items()}}
+        data.update(extra or {})
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+
+
+PERF = Instrumentation()
+# Decided once, before any @instrumented function is defined
+PERF_WRAP = os.environ.get("WT_PERF", "") not in ("", "0") or "--diagnostics" in sys.argv
+
+
+def _timed(fn, hist):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not PERF.enabled:
+            return fn(*args, **kwargs)
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            hist.add(time.perf_counter() - t0)
+    return wrapper
+
+
+def instrumented(name):
+    """Record each call of the wrapped function into PERF[name].
+
+    Without WT_PERF=1 (or --diagnostics) the function is returned as is.
+    """
+    def deco(fn):
+        if not PERF_WRAP:
+            return fn
+        return _timed(fn, PERF.histogram(name))
+    return deco
+
+
+# ============================================================================
+# MEMORY BUDGET
+# ============================================================================
+
+class MemoryBudget:
+    """RSS target for long sessions and the buffer caps derived from it.
+
+    Caps shrink in proportion below DEFAULT_MB and never grow past the
+    defaults; exceeding the target is reported by the housekeeping pass.
+    """
+    DEFAULT_MB = 200
+    CONSOLE_LINES = 5000
+
+    def __init__(self, mb=None):
+        self.mb = mb or self.DEFAULT_MB
+        scale = min(1.0, self.mb / self.DEFAULT_MB)
+        self.console_lines = max(200, int(self.CONSOLE_LINES * scale))
+        self.heatmap_columns = max(120, int(HEATMAP_COLUMNS * scale))
+        self.proc_history = max(10, int(PROC_HISTORY_LEN * scale))
+        self.alloc_reports = max(10, int(60 * scale))
+
+    def over(self, rss):
+        return rss > self.mb * 1048576
+
+
+class AllocationTracker:
+    """tracemalloc snapshots compared with the one taken at start().
+
+    Each sample() keeps the top growing allocation sites, so the
+    diagnostics tab can show which lines keep accumulating over hours.
+    """
+    IGNORE = (tracemalloc.__file__, "<frozen importlib._bootstrap>",
+              "<frozen importlib._bootstrap_external>", "<unknown>")
+
+    def __init__(self, keep=60, top=15, frames=1):
+        self.top = top
+        self.frames = frames
+        self.baseline = None
+        self.owns_tracing = False
+        self.reports = deque(maxlen=keep)  # (ts, traced bytes, rows)
+
+    @property
+    def active(self):
+        return self.baseline is not None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.owns_tracing = True
+        self.reports.clear()
+        self.baseline = self._snapshot()
+
+    def stop(self):
+        self.baseline = None
+        if self.owns_tracing:
+            tracemalloc.stop()
+            self.owns_tracing = False
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, pattern) for pattern in self.IGNORE])
+
+    def sample(self):
+        """[(site, size, size_diff, count_diff)] of the top growing sites."""
+        stats = self._snapshot().compare_to(self.baseline, "lineno")
+        stats.sort(key=lambda s: s.size_diff, reverse=True)
+        rows = []
+        for s in stats[:self.top]:
+            frame = s.traceback[0]
+            rows.append((f"{os.path.basename(frame.filename)}:{frame.lineno}",
+                         s.size, s.size_diff, s.count_diff))
+        self.reports.append((time.time(), tracemalloc.get_traced_memory()[0], rows))
+        return rows
+
+    def trend(self, site):
+        """Size of `site` in every kept report (0 where it wasn't in the top)."""
+        return [next((r[1] for r in rows if r[0] == site), 0) for _, _, rows in self.reports]
+
+    def dump(self):
+        return [{"ts": ts, "traced": traced,
+                 "sites": [dict(zip(("site", "size", "size_diff", "count_diff"), r))
+                           for r in rows]}
+                for ts, traced, rows in self.reports]
+
+
+# ============================================================================
+# HARDWARE INVENTORY
+# ============================================================================
+
+HW_CACHE_FILE = os.path.join(DATA_DIR, "hardware_cache.json")
+HW_CACHE_TTL = 7 * 24 * 3600  # Static facts rarely change; a reboot also invalidates
+
+# WMI class -> fields to fetch. Each entry is an independent query.
+HW_WMI_QUERIES = {
+    "cpu": ("Win32_Processor", ["Name", "MaxClockSpeed"]),
+    "gpu": ("Win32_VideoController", ["Name", "DriverVersion",
+                                      "CurrentHorizontalResolution",
+                                      "CurrentVerticalResolution"]),
+    "board": ("Win32_BaseBoard", ["Manufacturer", "Product", "SerialNumber"]),
+    "bios": ("Win32_BIOS", ["Manufacturer", "Version", "ReleaseDate"]),
+}
+
+
+class WmiProvider:
+    """WMI query backend. Keeps one COM apartment + connection per pool thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                import pythoncom
+                pythoncom.CoInitialize()
+            except ImportError:
+                pass
+            conn = self._local.conn = wmi.WMI()
+        return conn
+
+    def query(self, wmi_class, fields):
+        # Selecting only the needed columns is much cheaper than SELECT *
+        wql = f"SELECT {', '.join(fields)} FROM {wmi_class}"
+        return [{f: getattr(obj, f, None) for f in fields}
+                for obj in self._conn().query(wql)]
+
+
+class HardwareInventory:
+    """Structured hardware facts with an on-disk cache for the static part.
+
+    `provider` is anything exposing query(wmi_class, fields) -> [dict];
+    pass a fake to run without Windows. None disables the WMI sections.
+    """
+
+    def __init__(self, provider=None, cache_path=HW_CACHE_FILE, ttl=HW_CACHE_TTL,
+                 max_workers=4):
+        self.provider = provider
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+        self._static = None
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="hw")
+        return self._pool
+
+    # --- Static facts ---
+    def _load_cache(self, boot_time):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - cached.get("collected_at", 0) > self.ttl:
+            return None
+        # boot_time jitters by a second or so on Windows
+        if abs(cached.get("boot_time", 0) - boot_time) > 2:
+            return None
+        return cached
+
+    def _save_cache(self, static):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp = self.cache_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(static, f, indent=1, default=str)
+            os.replace(tmp, self.cache_path)
+        except OSError:
+            pass
+
+    def _query_static(self, boot_time):
+        static = {
+            "collected_at": time.time(),
+            "boot_time": boot_time,
+            "os": {
+                "system": platform.system(),
+                "release": platform.release(),
+                "version": platform.version(),
+                "hostname": platform.node(),
+                "arch": platform.machine(),
+            },
+            "cpu": {
+                "name": platform.processor(),
+                "physical_cores": psutil.cpu_count(logical=False),
+                "logical_cores": psutil.cpu_count(logical=True),
+            },
+            "memory": {"total": psutil.virtual_memory().total},
+            "wmi_error": None,
+        }
+        if self.provider is None:
+            return static
+
+        pool = self._executor()
+        futures = {key: pool.submit(self.provider.query, cls, fields)
+                   for key, (cls, fields) in HW_WMI_QUERIES.items()}
+        results, errors = {}, []
+        for key, fut in futures.items():
+            try:
+                results[key] = fut.result()
+            except Exception as e:
+                errors.append(f"{key}: {e}")
+        cpu_rows = results.pop("cpu", None)
+        static.update(results)
+        if cpu_rows and cpu_rows[0].get("Name"):
+            static["cpu"]["name"] = cpu_rows[0]["Name"].strip()
+            static["cpu"]["max_clock_mhz"] = cpu_rows[0].get("MaxClockSpeed")
+        static["wmi_error"] = "; ".join(errors) or None
+        return static
+
+    def static_facts(self, force=False):
+        with self._lock:
+            boot_time = psutil.boot_time()
+            if not force:
+                if self._static and abs(self._static["boot_time"] - boot_time) <= 2 \
+                        and time.time() - self._static["collected_at"] <= self.ttl:
+                    return self._static, True
+                cached = self._load_cache(boot_time)
+                if cached:
+                    self._static = cached
+                    return cached, True
+            static = self._query_static(boot_time)
+            # Don't pin a partial result for a week
+            if not static["wmi_error"]:
+                self._save_cache(static)
+            self._static = static
+            return static, False
+
+    # --- Dynamic facts ---
+    def dynamic_facts(self):
+        freq = psutil.cpu_freq()
+        mem = psutil.virtual_memory()
+        dynamic = {
+            "cpu_frequency_mhz": round(freq.current, 2) if freq else None,
+            "memory": {"used_percent": mem.percent, "available": mem.available},
+            "battery": None,
+        }
+        batt = psutil.sensors_battery() if hasattr(
+            psutil, "sensors_battery") else None
+        if batt:
+            dynamic["battery"] = {
+                "percent": batt.percent,
+                "plugged": batt.power_plugged,
+                "secs_left": None if batt.secsleft in (
+                    psutil.POWER_TIME_UNLIMITED, psutil.POWER_TIME_UNKNOWN) else batt.secsleft,
+            }
+        return dynamic
+
+    def collect(self, force=False):
+        static, cache_hit = self.static_facts(force)
+        return {
+            "static": static,
+            "dynamic": self.dynamic_facts(),
+            "cache_hit": cache_hit,
+            "sampled_at": time.time(),
+        }
+
+    def to_json(self, inventory):
+        return json.dumps(inventory, indent=2, default=str)
+
+
+def format_inventory(inv):
+    """Human-readable report for the HARDWARE tab."""
+    st, dy = inv["static"], inv["dynamic"]
+    gb = 1024 ** 3
+    lines = ["=== OPERATING SYSTEM ===",
+             f"OS: {st['os']['system']} {st['os']['release']} ({st['os']['version']})",
+             f"Hostname: {st['os']['hostname']}",
+             f"Arch: {st['os']['arch']}",
+             "\n=== PROCESSOR ===",
+             f"CPU: {st['cpu']['name']}",
+             f"Cores: {st['cpu']['physical_cores']} Physical / {st['cpu']['logical_cores']} Logical"]
+    if dy["cpu_frequency_mhz"] is not None:
+        lines.append(f"Frequency: {dy['cpu_frequency_mhz']:.2f} Mhz")
+
+    lines += ["\n=== MEMORY (RAM) ===",
+              f"Total: {st['memory']['total'] / gb:.2f} GB",
+              f"Used: {dy['memory']['used_percent']}%",
+              f"Available: {dy['memory']['available'] / gb:.2f} GB"]
+
+    batt = dy["battery"]
+    if batt:
+        lines += ["\n=== BATTERY ===",
+                  f"Charge: {batt['percent']}%",
+                  f"Status: {'Charging' if batt['plugged'] else 'Discharging'}"]
+        if batt["secs_left"] is not None:
+            m, s = divmod(batt["secs_left"], 60)
+            h, m = divmod(m, 60)
+            lines.append(f"Time remaining: {h}h {m}m")
+
+    if "gpu" in st:
+        lines.append("\n=== GPU & VIDEO ===")
+        for gpu in st["gpu"]:
+            lines.append(f"- {gpu['Name']}")
+            lines.append(f"  Driver: {gpu['DriverVersion']}")
+            lines.append(
+                f"  Resolution: {gpu['CurrentHorizontalResolution']}x{gpu['CurrentVerticalResolution']}")
+    if "board" in st or "bios" in st:
+        lines.append("\n=== BIOS & BOARD ===")
+        for board in st.get("board", []):
+            lines.append(f"Board: {board['Manufacturer']} {board['Product']}")
+            if board.get("SerialNumber"):
+                lines.append(f"  Serial: {board['SerialNumber']}")
+        for bios in st.get("bios", []):
+            lines.append(f"BIOS: {bios['Manufacturer']} v{bios['Version']}")
+    if st.get("wmi_error"):
+        lines.append(f"\n[!] WMI Query Error: {st['wmi_error']}")
+
+    age = int(inv["sampled_at"] - st["collected_at"])
+    lines.append(
+        f"\n[static data {'cached, ' if inv['cache_hit'] else ''}{age // 60} min old]")
+    return "\n".join(lines)
+
+
+# ============================================================================
+# TELEMETRY
+# ============================================================================
+
+TELEMETRY_HISTORY = 60  # Points per graph series
+
+
+def fmt_rate(bps):
+    for unit in ("B/s", "KB/s", "MB/s"):
+        if bps < 1024:
+            return f"{bps:.0f} {unit}" if unit == "B/s" else f"{bps:.1f} {unit}"
+        bps /= 1024
+    return f"{bps:.2f} GB/s"
+
+
+def nice_ceiling(v):
+    """Smallest 1/2/5 x 10^n >= v, for readable auto-scaled axes."""
+    if v < 1e-300:  # EWMAs decay to subnormals whose 10^n underflows to 0
+        return 1
+    exp = 10 ** math.floor(math.log10(v))
+    for m in (1, 2, 5, 10):
+        if v <= m * exp:
+            return m * exp
+
+
+class NetTelemetry:
+    """Per-NIC traffic rates from net_io_counters(pernic=True).
+
+    Each sample is O(#interfaces): one counter read, one delta and one EWMA
+    update per NIC. `counters` can be swapped for a fake in tests.
+    """
+    FIELDS = ("bytes_recv", "bytes_sent", "packets_recv", "packets_sent",
+              "errin", "errout", "dropin", "dropout")
+    ALL = "All interfaces"
+
+    def __init__(self, alpha=0.4, counters=None, history=TELEMETRY_HISTORY):
+        self.alpha = alpha
+        self.counters = counters or (lambda: psutil.net_io_counters(pernic=True))
+        self.prev = {}
+        self.prev_ts = None
+        self.smooth = {}   # nic -> {field: rate/s}
+        self.history = {}  # nic -> deque[(down, up)] of smoothed bytes/s
+        self.history_len = history
+
+    def sample(self):
+        now = time.monotonic()
+        cur = self.counters()
+        dt = now - self.prev_ts if self.prev_ts else 0
+        self.prev_ts = now
+
+        total = dict.fromkeys(self.FIELDS, 0.0)
+        for nic, c in cur.items():
+            p = self.prev.get(nic)
+            if p is None or dt <= 0:
+                continue
+            sm = self.smooth.get(nic)
+            # max(0) absorbs counter resets (adapter re-plugged, 32-bit wrap)
+            raw = [max(0, getattr(c, f) - getattr(p, f)) / dt for f in self.FIELDS]
+            if sm is None:
+                sm = self.smooth[nic] = dict(zip(self.FIELDS, raw))
+            else:
+                for f, r in zip(self.FIELDS, raw):
+                    sm[f] += self.alpha * (r - sm[f])
+            for f in self.FIELDS:
+                total[f] += sm[f]
+            self._remember(nic, sm)
+        self._remember(self.ALL, total)
+
+        for nic in self.prev.keys() - cur.keys():
+            self.smooth.pop(nic, None)
+            self.history.pop(nic, None)
+        self.prev = cur
+        self.smooth[self.ALL] = total
+        return self.smooth
+
+    def replay(self, smooth):
+        """Take recorded rates (a sample()'s result) as if just measured."""
+        for nic in self.history.keys() - smooth.keys():
+            del self.history[nic]
+        for nic, rates in smooth.items():
+            self._remember(nic, rates)
+        self.smooth = smooth
+
+    def _remember(self, nic, rates):
+        h = self.history.get(nic)
+        if h is None:
+            h = self.history[nic] = deque(maxlen=self.history_len)
+        h.append((rates["bytes_recv"], rates["bytes_sent"]))
+
+    def interfaces(self):
+        return [self.ALL] + sorted(n for n in self.smooth if n != self.ALL)
+
+
+class DiskTelemetry:
+    """Per-physical-disk I/O rates plus usage of every mounted partition.
+
+    Busy% uses busy_time where the platform reports it (Linux) and falls
+    back to read_time + write_time (Windows), capped at 100.
+    """
+    ALL = "All disks"
+    METRICS = ("busy", "read_bps", "write_bps", "read_iops", "write_iops", "latency_ms")
+
+    def __init__(self, counters=None, usage_every=10, history=TELEMETRY_HISTORY):
+        self.counters = counters or (lambda: psutil.disk_io_counters(perdisk=True) or {})
+        self.usage_every = usage_every  # Usage barely moves; poll it less often
+        self.prev = {}
+        self.prev_ts = None
+        self.ticks = 0
+        self.rates = {}
+        self.partitions = {}  # mountpoint -> percent used
+        self.history = {}     # disk or mountpoint -> deque of tuples
+        self.history_len = history
+
+    def sample(self):
+        now = time.monotonic()
+        cur = self.counters()
+        dt = now - self.prev_ts if self.prev_ts else 0
+        self.prev_ts = now
+
+        rates = {}
+        for disk, c in cur.items():
+            p = self.prev.get(disk)
+            if p is None or dt <= 0:
+                continue
+            r_ops = max(0, c.read_count - p.read_count)
+            w_ops = max(0, c.write_count - p.write_count)
+            io_ms = max(0, c.read_time - p.read_time) + max(0, c.write_time - p.write_time)
+            busy_ms = max(0, c.busy_time - p.busy_time) if hasattr(c, "busy_time") else io_ms
+            rates[disk] = {
+                "busy": min(100.0, busy_ms / (dt * 10)),
+                "read_bps": max(0, c.read_bytes - p.read_bytes) / dt,
+                "write_bps": max(0, c.write_bytes - p.write_bytes) / dt,
+                "read_iops": r_ops / dt,
+                "write_iops": w_ops / dt,
+                "latency_ms": io_ms / (r_ops + w_ops) if r_ops + w_ops else 0.0,
+                "_ops": r_ops + w_ops, "_io_ms": io_ms,
+            }
+        if rates:
+            total = {f: sum(r[f] for r in rates.values())
+                     for f in ("read_bps", "write_bps", "read_iops", "write_iops", "_ops", "_io_ms")}
+            total["busy"] = max(r["busy"] for r in rates.values())
+            total["latency_ms"] = total["_io_ms"] / total["_ops"] if total["_ops"] else 0.0
+            rates[self.ALL] = total
+        for r in rates.values():
+            del r["_ops"], r["_io_ms"]
+        for disk, r in rates.items():
+            self._remember(disk, tuple(r[m] for m in self.METRICS))
+
+        if self.ticks % self.usage_every == 0:
+            self.partitions = self._usage()
+        for mount, pct in self.partitions.items():
+            self._remember(mount, (pct,))
+        self.ticks += 1
+
+        for disk in self.prev.keys() - cur.keys():
+            self.history.pop(disk, None)
+        self.prev = cur
+        self.rates = rates
+        return rates
+
+    def replay(self, rates, partitions):
+        """Take recorded rates and usage as if just measured."""
+        for key in self.history.keys() - rates.keys() - partitions.keys():
+            del self.history[key]
+        for disk, r in rates.items():
+            self._remember(disk, tuple(r[m] for m in self.METRICS))
+        for mount, pct in partitions.items():
+            self._remember(mount, (pct,))
+        self.rates = rates
+        self.partitions = partitions
+
+    def _usage(self):
+        usage = {}
+        for part in psutil.disk_partitions():
+            if "cdrom" in part.opts or not part.fstype:
+                continue
+            try:
+                usage[part.mountpoint] = psutil.disk_usage(part.mountpoint).percent
+            except OSError:  # Card readers, unmounted volumes...
+                continue
+        for mount in self.partitions.keys() - usage.keys():
+            self.history.pop(mount, None)
+        return usage
+
+    def _remember(self, key, values):
+        h = self.history.get(key)
+        if h is None:
+            h = self.history[key] = deque(maxlen=self.history_len)
+        h.append(values)
+
+    def disks(self):
+        return [self.ALL] + sorted(d for d in self.rates if d != self.ALL)
+
+
+class TelemetrySampler:
+    """Single place the monitor reads system metrics from."""
+
+    def __init__(self):
+        self.net = NetTelemetry()
+        self.disk = DiskTelemetry()
+
+    @instrumented("telemetry.sample")
+    def sample(self):
+        mem = psutil.virtual_memory()
+        core_times = psutil.cpu_times_percent(percpu=True)
+        return {
+            "ts": time.time(),
+            "cpu": psutil.cpu_percent(),
+            "cpu_cores": [round(100.0 - t.idle, 1) for t in core_times],
+            "cpu_core_times": core_times,
+            "ram": mem.percent,
+            "ram_available": mem.available,
+            "disk_io": self.disk.sample(),
+            "partitions": self.disk.partitions,
+            "net": self.net.sample(),
+        }
+
+
+class AdaptiveScheduler:
+    """Chooses the global timer interval from what the user can see, alert
+    state and system load, and throttles the expensive per-tab refreshes."""
+    WATCHING_MS = 1000   # Window focused
+    INACTIVE_MS = 2500   # Visible behind other windows
+    HIDDEN_MS = 5000     # Minimized or hidden
+    ALERT_MS = 1000      # An alert is firing: never slower than this
+    MAX_MS = 15000
+    BUSY_CPU = 85.0      # Smoothed system CPU above which we back off
+    MIN_GAP = {"processes": 2.0, "connections": 2.0}  # Seconds between refreshes
+
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self.load = 0.0
+        self.last_run = {}
+
+    def observe(self, cpu):
+        self.load += self.alpha * (cpu - self.load)
+
+    def interval(self, visible, active, alerting=False):
+        base = self.WATCHING_MS if active else (self.INACTIVE_MS if visible else self.HIDDEN_MS)
+        if alerting:
+            return min(base, self.ALERT_MS)
+        if self.load > self.BUSY_CPU:
+            # Up to 4x slower as the machine approaches 100% busy
+            base *= 1 + 3 * (self.load - self.BUSY_CPU) / (100.0 - self.BUSY_CPU)
+        return int(min(self.MAX_MS, base))
+
+    def due(self, name, now=None, force=False):
+        """True (and marks the run) if `name` hasn't run within its minimum gap.
+
+        `force` is for refreshes the user asked for: always due, but the
+        timer then waits a full gap after it.
+        """
+        now = time.monotonic() if now is None else now
+        if not force and now - self.last_run.get(name, -1e9) < self.MIN_GAP.get(name, 0.0):
+            return False
+        self.last_run[name] = now
+        return True
+
+
+class SelfMonitor:
+    """WindowsTweak's own CPU, RSS and time spent in timer work."""
+
+    def __init__(self):
+        self.proc = psutil.Process()
+        self.proc.cpu_percent(None)
+        self.ncpu = psutil.cpu_count() or 1
+        self.busy = 0.0
+        self.since = time.perf_counter()
+        self.last = {"cpu": 0.0, "rss": self.proc.memory_info().rss, "duty": 0.0}
+
+    @contextmanager
+    def measure(self):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.busy += time.perf_counter() - t0
+
+    def sample(self):
+        now = time.perf_counter()
+        elapsed = now - self.since
+        self.last = {
+            "cpu": self.proc.cpu_percent(None) / self.ncpu,
+            "rss": self.proc.memory_info().rss,
+            "duty": 100.0 * self.busy / elapsed if elapsed > 0 else 0.0,
+        }
+        self.busy, self.since = 0.0, now
+        return self.last
+
+
+# ============================================================================
+# PROCESS SAMPLING & HISTORY
+# ============================================================================
+
+PROC_HISTORY_LEN = 60  # Samples kept per process
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+def sparkline(values, hi=None):
+    """Unicode block sparkline; `hi` fixes the scale (defaults to max)."""
+    if not values:
+        return ""
+    top = hi if hi else max(values)
+    if top <= 0:
+        return SPARK_CHARS[0] * len(values)
+    last = len(SPARK_CHARS) - 1
+    return "".join(SPARK_CHARS[min(last, int(v / top * last))] for v in values)
+
+
+class TopN:
+    """Rolling largest-N tracker.
+
+    Updates push onto a heap and mark older entries for the same pid stale,
+    so update/remove are O(log n); stale entries are dropped lazily.
+    """
+
+    def __init__(self):
+        self._heap = []   # (-value, version, pid)
+        self._cur = {}    # pid -> (version, value)
+        self._ver = 0
+
+    def update(self, pid, value):
+        self._ver += 1
+        self._cur[pid] = (self._ver, value)
+        heapq.heappush(self._heap, (-value, self._ver, pid))
+        if len(self._heap) > 2 * len(self._cur) + 64:
+            self._compact()
+
+    def remove(self, pid):
+        self._cur.pop(pid, None)
+
+    def _compact(self):
+        self._heap = [(-v, ver, pid) for pid, (ver, v) in self._cur.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, n):
+        heap, out, keep = self._heap, [], []
+        while heap and len(out) < n:
+            e = heapq.heappop(heap)
+            cur = self._cur.get(e[2])
+            if cur and cur[0] == e[1]:
+                out.append((e[2], -e[0]))
+                keep.append(e)
+        for e in keep:
+            heapq.heappush(heap, e)
+        return out
+
+    def __len__(self):
+        return len(self._cur)
+
+
+class _ProcSeries:
+    """Fixed-size ring of CPU% and RSS(MB) samples for one process."""
+    __slots__ = ("cpu", "rss", "head", "count")
+
+    def __init__(self, maxlen):
+        self.cpu = array("f", bytes(4 * maxlen))
+        self.rss = array("f", bytes(4 * maxlen))
+        self.head = 0
+        self.count = 0
+
+    def append(self, cpu, rss_mb):
+        self.cpu[self.head] = cpu
+        self.rss[self.head] = rss_mb
+        self.head = (self.head + 1) % len(self.cpu)
+        self.count = min(self.count + 1, len(self.cpu))
+
+    def ordered(self, col):
+        n, h = len(col), self.head
+        data = col[h:] + col[:h] if self.count == n else col[:h]
+        return data.tolist()
+
+
+class ProcessHistory:
+    """Per-PID bounded time series plus rolling CPU/memory hog rankings."""
+
+    def __init__(self, maxlen=PROC_HISTORY_LEN):
+        self.maxlen = maxlen
+        self.series = {}
+        self.top_cpu = TopN()
+        self.top_mem = TopN()
+
+    def record(self, pid, cpu, rss):
+        s = self.series.get(pid)
+        if s is None:
+            s = self.series[pid] = _ProcSeries(self.maxlen)
+        s.append(cpu, rss / 1048576)
+        self.top_cpu.update(pid, cpu)
+        self.top_mem.update(pid, rss)
+
+    def evict(self, pid):
+        self.series.pop(pid, None)
+        self.top_cpu.remove(pid)
+        self.top_mem.remove(pid)
+
+    def cpu_history(self, pid):
+        s = self.series.get(pid)
+        return s.ordered(s.cpu) if s else []
+
+    def rss_history(self, pid):
+        s = self.series.get(pid)
+        return s.ordered(s.rss) if s else []
+
+
+class ProcessSnapshot:
+    """Columnar result of one sampling pass; row i of every column is one process."""
+    COLUMNS = ("pid", "name", "user", "status", "cpu", "rss", "rss_delta",
+               "read_bps", "write_bps")
+
+    def __init__(self, ts=0.0):
+        self.ts = ts
+        self._index = None
+        self._derived = {}  # Query helpers, built on first use
+        for c in self.COLUMNS:
+            setattr(self, c, [])
+
+    def __len__(self):
+        return len(self.pid)
+
+    def append(self, *row):
+        for c, v in zip(self.COLUMNS, row):
+            getattr(self, c).append(v)
+
+    def row(self, i):
+        return {c: getattr(self, c)[i] for c in self.COLUMNS}
+
+    def index(self):
+        """pid -> row, built once per snapshot."""
+        if self._index is None:
+            self._index = {pid: i for i, pid in enumerate(self.pid)}
+        return self._index
+
+    def set(self, col, i, value):
+        getattr(self, col)[i] = value
+        self._derived.clear()
+
+    def column(self, name):
+        """A stored column, or "io" (read + write bytes/s)."""
+        if name != "io":
+            return getattr(self, name)
+        io = self._derived.get("io")
+        if io is None:
+            io = self._derived["io"] = [r + w for r, w in zip(self.read_bps, self.write_bps)]
+        return io
+
+    def array(self, name):
+        """Numeric column as a float64 NumPy array."""
+        key = ("array", name)
+        a = self._derived.get(key)
+        if a is None:
+            a = self._derived[key] = np.asarray(self.column(name), dtype=np.float64)
+        return a
+
+    def codes(self, name, as_array=False):
+        """Dictionary encoding of a text column: (row -> code, distinct values)."""
+        key = ("codes", name)
+        enc = self._derived.get(key)
+        if enc is None:
+            lookup = {}
+            codes = [lookup.setdefault(v, len(lookup)) for v in getattr(self, name)]
+            enc = self._derived[key] = (codes, list(lookup))
+        if as_array:
+            key = ("codes_array", name)
+            a = self._derived.get(key)
+            if a is None:
+                a = self._derived[key] = np.asarray(enc[0], dtype=np.intp)
+            return a, enc[1]
+        return enc
+
+
+class _QueryTerm:
+    """One compiled term of a ProcessQuery."""
+    __slots__ = ("column", "op", "values", "neg", "test")
+
+    def __init__(self, column, op, values, neg, test=None):
+        self.column, self.op, self.values, self.neg = column, op, values, neg
+        self.test = test  # Text terms: str -> bool, applied to distinct values
+
+    def mask(self, snap):
+        if self.test:
+            codes, uniques = snap.codes(self.column, as_array=True)
+            table = np.fromiter(map(self.test, uniques), bool, len(uniques))
+            m = table[codes]
+        elif self.op == "=":
+            m = np.isin(snap.array(self.column), self.values)
+        else:
+            m = ProcessQuery.OPS[self.op](snap.array(self.column), self.values[0])
+        return ~m if self.neg else m
+
+    def rows(self, snap, rows):
+        if self.test:
+            codes, uniques = snap.codes(self.column)
+            table = [self.test(u) != self.neg for u in uniques]
+            return [i for i in rows if table[codes[i]]]
+        col = snap.column(self.column)
+        if self.op == "=":
+            values = set(self.values)
+            return [i for i in rows if (col[i] in values) != self.neg]
+        op, v = ProcessQuery.OPS[self.op], self.values[0]
+        return [i for i in rows if op(col[i], v) != self.neg]
+
+
+class ProcessQuery:
+    """Field-aware process filter, parsed and compiled once per query text.
+
+    Terms are ANDed; `|` separates alternatives inside one value:
+
+        chrome                      name contains "chrome" (bare words)
+        name~chrome|edge            contains, case-insensitive
+        user:svc_*  status:stopped  equals, with * and ? wildcards
+        mem>500 cpu>=5 io>1M pid=4  numbers; mem/delta in MB, io/read/write
+                                    in KB/s, K/M/G suffixes allowed
+        -status:sleeping name!~svc  negation
+
+    Text terms are evaluated once per distinct value and mapped onto rows
+    through the snapshot's dictionary codes. With NumPy every term is a
+    boolean mask; without it, rows are narrowed term by term.
+    """
+    HELP = ("Terms are combined with AND; | separates alternatives.\n"
+            "Text: name~chrome (contains), user:svc_* status:stopped (equals, wildcards)\n"
+            "Numbers: cpu>=5 mem>500 (MB) io>1M (KB/s) pid=4|8 delta<0 read write\n"
+            "Negate with a leading - or !: -status:sleeping name!~svchost")
+    TEXT = {"name": "name", "user": "user", "status": "status", "state": "status"}
+    # field -> (snapshot column, size of the default unit)
+    NUMBER = {"pid": ("pid", 1), "cpu": ("cpu", 1),
+              "mem": ("rss", 1048576), "rss": ("rss", 1048576),
+              "delta": ("rss_delta", 1048576), "io": ("io", 1024),
+              "read": ("read_bps", 1024), "write": ("write_bps", 1024)}
+    SUFFIX = {"k": 1024, "m": 1048576, "g": 1073741824}
+    OPS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+    TERM = re.compile(r"(?P<neg>[-!]?)(?P<field>[a-z_]+)(?P<op>>=|<=|!?[~:=]|>|<)(?P<value>.+)",
+                      re.IGNORECASE)
+    NUM = re.compile(r"([-+]?(?:\d+\.?\d*|\.\d+))([kmg]?)b?", re.IGNORECASE)
+
+    def __init__(self, text, vectorized=HAS_NUMPY):
+        self.text = text
+        self.vectorized = vectorized and HAS_NUMPY
+        try:
+            tokens = shlex.split(text)
+        except ValueError as e:  # Unbalanced quotes
+            raise ValueError(str(e)) from None
+        self.terms = [self._compile(t) for t in tokens]
+
+    def __bool__(self):
+        return bool(self.terms)
+
+    def _compile(self, token):
+        m = self.TERM.fullmatch(token)
+        if not m:
+            neg = token[0] in "-!" and len(token) > 1
+            return self._text_term("name", "~", token[1:] if neg else token, neg)
+        field, op, value = m["field"].lower(), m["op"], m["value"]
+        neg = bool(m["neg"])
+        if op.startswith("!"):
+            neg, op = not neg, op[1:]
+        if op == ":":
+            op = "="
+        if field in self.TEXT:
+            if op not in ("~", "="):
+                raise ValueError(f"'{field}' is text: use ~ (contains) or : (equals)")
+            return self._text_term(self.TEXT[field], op, value, neg)
+        if field not in self.NUMBER:
+            raise ValueError(f"unknown field '{field}' (fields: "
+                             f"{', '.join(sorted({**self.TEXT, **self.NUMBER}))})")
+        if op == "~":
+            raise ValueError(f"'{field}' is a number: use > >= < <= or =")
+        column, unit = self.NUMBER[field]
+        values = [self._number(v, unit) for v in value.split("|")]
+        if op != "=" and len(values) > 1:
+            raise ValueError(f"'|' only works with = ({token})")
+        return _QueryTerm(column, op, values, neg)
+
+    def _text_term(self, column, op, value, neg):
+        alts = [v for v in value.split("|") if v]
+        if op == "~":
+            needles = [v.lower() for v in alts]
+            test = lambda s: any(n in s.lower() for n in needles)
+        else:
+            rx = re.compile("|".join(fnmatch.translate(v) for v in alts), re.IGNORECASE)
+            test = lambda s: rx.match(s) is not None
+        return _QueryTerm(column, op, alts, neg, test)
+
+    def _number(self, text, unit):
+        m = self.NUM.fullmatch(text)
+        if not m:
+            raise ValueError(f"not a number: '{text}'")
+        return float(m[1]) * (self.SUFFIX[m[2].lower()] if m[2] else unit)
+
+    @instrumented("processes.query")
+    def __call__(self, snap):
+        """Row indices of `snap` matching every term."""
+        if self.vectorized:
+            mask = np.ones(len(snap), bool)
+            for term in self.terms:
+                mask &= term.mask(snap)
+            return np.flatnonzero(mask).tolist()
+        rows = range(len(snap))
+        for term in self.terms:
+            rows = term.rows(snap, rows)
+        return list(rows)
+
+
+class ProcessSampler:
+    """Keeps psutil.Process handles alive between passes so CPU% and I/O
+    rates are measured against the previous sample instead of being lost."""
+    ATTRS = ["status", "memory_info", "cpu_percent", "io_counters"]
+
+    def __init__(self, history=None):
+        self.history = history if history is not None else ProcessHistory()
+        self.procs = {}      # pid -> psutil.Process
+        self.static = {}     # pid -> (name, user), fetched once
+        self.prev = {}       # pid -> (rss, read_bytes, write_bytes)
+        self.ncpu = psutil.cpu_count() or 1
+        self.last_ts = None
+        self.last = ProcessSnapshot()
+
+    def _forget(self, pid):
+        self.procs.pop(pid, None)
+        self.static.pop(pid, None)
+        self.prev.pop(pid, None)
+        self.history.evict(pid)
+
+    def _track(self, pid):
+        try:
+            p = psutil.Process(pid)
+            name = p.name()
+            try:
+                user = p.username()
+            except (psutil.AccessDenied, psutil.ZombieProcess, KeyError):
+                user = ""
+            p.cpu_percent(None)  # Prime; first real value comes next pass
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return
+        self.procs[pid] = p
+        self.static[pid] = (name, user)
+
+    @instrumented("processes.sample")
+    def sample(self):
+        now = time.monotonic()
+        dt = (now - self.last_ts) if self.last_ts else 0
+        self.last_ts = now
+
+        pids = set(psutil.pids())
+        for pid in self.procs.keys() - pids:
+            self._forget(pid)
+        for pid in pids - self.procs.keys():
+            self._track(pid)
+
+        snap = ProcessSnapshot(time.time())
+        dead = []
+        for pid, p in self.procs.items():
+            try:
+                info = p.as_dict(self.ATTRS, ad_value=None)
+            except psutil.NoSuchProcess:
+                dead.append(pid)
+                continue
+            mem = info["memory_info"]
+            rss = mem.rss if mem else 0
+            cpu = round((info["cpu_percent"] or 0.0) / self.ncpu, 1)
+            io = info["io_counters"]
+            rd, wr = (io.read_bytes, io.write_bytes) if io else (0, 0)
+
+            prev = self.prev.get(pid)
+            if prev and dt > 0:
+                rss_delta = rss - prev[0]
+                read_bps = max(0, rd - prev[1]) / dt
+                write_bps = max(0, wr - prev[2]) / dt
+            else:
+                rss_delta, read_bps, write_bps = 0, 0.0, 0.0
+            self.prev[pid] = (rss, rd, wr)
+
+            name, user = self.static[pid]
+            snap.append(pid, name, user, info["status"] or "?", cpu, rss,
+                        rss_delta, read_bps, write_bps)
+            self.history.record(pid, cpu, rss)
+
+        for pid in dead:
+            self._forget(pid)
+        self.last = snap
+        return snap
+
+
+def signal_processes(pids, action, tree=False, timeout=3, max_workers=16):
+    """Apply kill/suspend/resume to `pids` (and their descendants if `tree`).
+
+    Signals are sent concurrently. Kills go terminate -> wait -> kill -> wait.
+    Returns (ok_pids, {pid: error}).
+    """
+    ok, failures, procs, seen = [], {}, [], set()
+    for pid in pids:
+        try:
+            p = psutil.Process(pid)
+            family = [p] + (p.children(recursive=True) if tree else [])
+        except psutil.NoSuchProcess:
+            if action == "kill":
+                ok.append(pid)
+            else:
+                failures[pid] = "process has exited"
+            continue
+        except psutil.AccessDenied:
+            failures[pid] = "access denied"
+            continue
+        for q in family:
+            if q.pid not in seen:
+                seen.add(q.pid)
+                procs.append(q)
+    if not procs:
+        return ok, failures
+
+    def send(method):
+        def apply(p):
+            try:
+                getattr(p, method)()
+                return p, None
+            except psutil.NoSuchProcess:
+                return p, None if action == "kill" else "process has exited"
+            except psutil.AccessDenied:
+                return p, "access denied"
+            except Exception as e:
+                return p, str(e)
+        return apply
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(procs))) as pool:
+        first = "terminate" if action == "kill" else action
+        sent = []
+        for p, err in pool.map(send(first), procs):
+            if err:
+                failures[p.pid] = err
+            elif action == "kill":
+                sent.append(p)
+            else:
+                ok.append(p.pid)
+        if not sent:
+            return ok, failures
+
+        gone, alive = psutil.wait_procs(sent, timeout=timeout)
+        if alive:
+            # Escalate whatever ignored the polite request
+            for p, err in pool.map(send("kill"), alive):
+                if err:
+                    failures[p.pid] = err
+            more, alive = psutil.wait_procs(
+                [p for p in alive if p.pid not in failures], timeout=timeout)
+            gone += more
+    ok += [p.pid for p in gone]
+    for p in alive:
+        try:
+            # Killed but not yet reaped by their (new) parent
+            dead = p.status() == psutil.STATUS_ZOMBIE
+        except psutil.NoSuchProcess:
+            dead = True
+        if dead:
+            ok.append(p.pid)
+        else:
+            failures[p.pid] = f"still running after {2 * timeout}s"
+    return ok, failures
+
+
+class SyntheticProcessProvider:
+    """Deterministic fake process table (no OS access) for benchmarks.
+
+    Same interface as ProcessSampler: sample() -> ProcessSnapshot, .history.
+    """
+    STATUSES = ["running", "sleeping", "sleeping", "sleeping", "stopped"]
+    USERS = ["SYSTEM", "LOCAL SERVICE", "svc_build", "svc_web", "alice"]
+
+    def __init__(self, n=10000, seed=1, churn=0.01):
+        self.rng = random.Random(seed)
+        self.n = n
+        self.churn = churn
+        self.history = ProcessHistory()
+        self.procs = {}
+        self.next_pid = 4
+        for _ in range(n):
+            self._spawn()
+
+    def _spawn(self):
+        rng = self.rng
+        pid = self.next_pid
+        self.next_pid += 4
+        self.procs[pid] = [f"proc_{rng.randrange(800)}.exe", rng.choice(self.USERS),
+                           rng.choice(self.STATUSES), rng.random() * 5,
+                           rng.randrange(1, 2048) * 1048576]
+
+    def sample(self):
+        rng = self.rng
+        for pid in rng.sample(list(self.procs), int(self.n * self.churn)):
+            del self.procs[pid]
+            self.history.evict(pid)
+        while len(self.procs) < self.n:
+            self._spawn()
+
+        snap = ProcessSnapshot(time.time())
+        for pid, p in self.procs.items():
+            p[3] = max(0.0, min(100.0, p[3] + rng.uniform(-1, 1)))
+            delta = rng.randrange(-4, 5) * 65536
+            p[4] = max(65536, p[4] + delta)
+            snap.append(pid, p[0], p[1], p[2], round(p[3], 1), p[4], delta,
+                        rng.random() * 4096, rng.random() * 4096)
+            self.history.record(pid, p[3], p[4])
+        return snap
+
+
+# ============================================================================
+# LEAK WATCH
+# ============================================================================
+
+LEAK_WATCH_FILE = os.path.join(DATA_DIR, "leakwatch.json")
+
+
+class OnlineTrend:
+    """Exponentially weighted least-squares line through (t, y) points.
+
+    O(1) per point and no stored samples: older points fade with time
+    constant `tau` seconds. The origin moves to the newest point on every
+    add, so the sums stay well conditioned however long the watch runs.
+    """
+    __slots__ = ("tau", "last", "w", "st", "sy", "stt", "sty", "syy", "n")
+
+    def __init__(self, tau):
+        self.tau = tau
+        self.last = None
+        self.w = self.st = self.sy = self.stt = self.sty = self.syy = 0.0
+        self.n = 0
+
+    def add(self, t, y):
+        if self.last is not None:
+            dt = t - self.last
+            f = math.exp(-dt / self.tau)
+            self.w *= f
+            self.st *= f
+            self.sy *= f
+            self.stt *= f
+            self.sty *= f
+            self.syy *= f
+            # Shift x by -dt so the new point sits at x = 0
+            self.stt += dt * (dt * self.w - 2 * self.st)
+            self.sty -= dt * self.sy
+            self.st -= dt * self.w
+        self.w += 1.0
+        self.sy += y
+        self.syy += y * y
+        self.last = t
+        self.n += 1
+
+    def fit(self):
+        """(slope per second, r²) of the weighted fit; (0, 0) until 3 points."""
+        d = self.w * self.stt - self.st * self.st
+        if self.n < 3 or d <= 1e-12:
+            return 0.0, 0.0
+        cov = self.w * self.sty - self.st * self.sy
+        var_y = self.w * self.syy - self.sy * self.sy
+        r2 = min(1.0, cov * cov / (d * var_y)) if var_y > 1e-12 else 0.0
+        return cov / d, r2
+
+
+class _LeakState:
+    """Trends and last values of one watched process."""
+    __slots__ = ("proc", "name", "first", "samples", "values", "trends",
+                 "history", "flagged", "denied")
+
+    def __init__(self, proc, name, tau):
+        self.proc = proc
+        self.name = name
+        self.first = None
+        self.samples = 0
+        self.values = {}
+        # Long window for the rate, short one to tell "still growing" from a step
+        self.trends = {m: (OnlineTrend(tau), OnlineTrend(tau / 4))
+                       for m in LeakWatch.METRICS}
+        self.history = {m: deque(maxlen=LeakWatch.SPARK_LEN) for m in LeakWatch.METRICS}
+        self.flagged = set()
+        self.denied = set()
+
+    def rate(self, metric):
+        """(growth per hour, r²) of the long-window fit."""
+        slope, r2 = self.trends[metric][0].fit()
+        return slope * 3600, r2
+
+
+class LeakWatch:
+    """Handle/fd, thread and open-file trends for watched PIDs and name globs.
+
+    Each process is sampled about once per `period` seconds. tick() spends a
+    fractional per-process credit, so the work is spread round-robin over
+    the monitor's ticks instead of hitting every process at once, and stops
+    early when a tick has used `budget_s` of CPU time.
+    """
+    METRICS = ("handles", "threads", "files")
+    # Minimum sustained growth per hour before a process is flagged
+    MIN_RATE = {"handles": 30.0, "threads": 4.0, "files": 10.0}
+    MIN_R2 = 0.8
+    MIN_SPAN = 1800.0   # Seconds watched before anything is flagged
+    TAU = 3600.0
+    PERIOD = 60.0
+    FILES_EVERY = 5     # open_files() is slow on Windows: only every 5th sample
+    RESCAN = 30.0
+    BUDGET_S = 0.005
+    SPARK_LEN = 30
+
+    def __init__(self, patterns=(), pids=(), period=PERIOD, budget_s=BUDGET_S,
+                 process_iter=None):
+        self.period = period
+        self.budget_s = budget_s
+        self.process_iter = process_iter or psutil.process_iter
+        self.watched = {}      # (pid, create_time) -> _LeakState
+        self.queue = deque()   # Round-robin order of watched keys
+        self.credit = 0.0
+        self.last_tick = None
+        self.last_scan = None
+        self.set_targets(patterns, pids)
+
+    def set_targets(self, patterns=None, pids=None):
+        if patterns is not None:
+            self.patterns = sorted({p.strip().lower() for p in patterns if p.strip()})
+        if pids is not None:
+            self.pids = set(pids)
+        self.last_scan = None  # Pick up the change on the next tick
+
+    def add_pids(self, pids):
+        self.set_targets(pids=self.pids | set(pids))
+
+    @classmethod
+    def load(cls, path=LEAK_WATCH_FILE):
+        """Watch with the saved patterns; a missing file means nothing watched."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        patterns = config.get("patterns", []) if isinstance(config, dict) else None
+        if not isinstance(patterns, list) or not all(isinstance(p, str) for p in patterns):
+            raise ValueError(f"{path}: 'patterns' must be a list of strings")
+        return cls(patterns)
+
+    def save(self, path=LEAK_WATCH_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"patterns": self.patterns}, f, indent=2)
+        os.replace(tmp, path)
+
+    def __bool__(self):
+        return bool(self.patterns or self.pids)
+
+    def _matches(self, pid, name):
+        if pid in self.pids:
+            return True
+        name = name.lower()
+        return any(fnmatch.fnmatchcase(name, p) for p in self.patterns)
+
+    def _scan(self):
+        seen = set()
+        for p in self.process_iter(["name", "create_time"]):
+            name = p.info["name"] or ""
+            if not self._matches(p.pid, name):
+                continue
+            key = (p.pid, p.info["create_time"])
+            seen.add(key)
+            if key not in self.watched:
+                self.watched[key] = _LeakState(p, name, self.TAU)
+                self.queue.append(key)
+        for key in [k for k in self.watched if k not in seen]:
+            del self.watched[key]
+        self.queue = deque(k for k in self.queue if k in self.watched)
+        # PIDs added by hand stop being watched once they are gone
+        self.pids &= {pid for pid, _ in seen}
+
+    @instrumented("leaks.tick")
+    def tick(self, now=None):
+        """Sample this tick's share of the watched processes.
+
+        Returns [(state, metric)] for processes newly flagged as leaking.
+        """
+        now = time.time() if now is None else now
+        if not self:
+            self.watched.clear()
+            self.queue.clear()
+            return []
+        if self.last_scan is None or now - self.last_scan >= self.RESCAN:
+            self._scan()
+            self.last_scan = now
+        n = len(self.watched)
+        if self.last_tick is None:
+            dt = self.period  # Take one full round to start every trend
+        else:
+            dt = max(0.0, now - self.last_tick)
+        self.last_tick = now
+        self.credit = min(float(n), self.credit + n * dt / self.period)
+
+        flagged = []
+        deadline = time.perf_counter() + self.budget_s
+        while self.credit >= 1.0 and self.queue:
+            key = self.queue.popleft()
+            state = self.watched.get(key)
+            if state is None:
+                continue
+            self.credit -= 1.0
+            if self._sample(state, now):
+                self.queue.append(key)
+                flagged.extend(self._check(state, now))
+            else:
+                del self.watched[key]
+            if time.perf_counter() >= deadline:
+                break
+        return flagged
+
+    def _sample(self, state, now):
+        """Read one process's counters; False once it has exited."""
+        p = state.proc
+        values = {}
+        try:
+            with p.oneshot():
+                values["threads"] = p.num_threads()
+                values["handles"] = (p.num_handles() if psutil.WINDOWS else p.num_fds())
+        except psutil.NoSuchProcess:
+            return False
+        except psutil.AccessDenied:
+            state.denied.update(("handles", "threads"))
+        if state.samples % self.FILES_EVERY == 0:
+            try:
+                values["files"] = len(p.open_files())
+            except psutil.NoSuchProcess:
+                return False
+            except (psutil.AccessDenied, OSError):
+                state.denied.add("files")
+        if state.first is None:
+            state.first = now
+        state.samples += 1
+        for metric, v in values.items():
+            state.values[metric] = v
+            state.history[metric].append(v)
+            for trend in state.trends[metric]:
+                trend.add(now, v)
+        return True
+
+    def _check(self, state, now):
+        if now - state.first < self.MIN_SPAN:
+            return []
+        out = []
+        for metric in self.METRICS:
+            rate, r2 = state.rate(metric)
+            short, _ = state.trends[metric][1].fit()
+            leaking = (rate >= self.MIN_RATE[metric] and r2 >= self.MIN_R2
+                       and short * 3600 >= self.MIN_RATE[metric] / 2)
+            if leaking and metric not in state.flagged:
+                state.flagged.add(metric)
+                out.append((state, metric))
+            elif not leaking and rate < self.MIN_RATE[metric] / 2:
+                state.flagged.discard(metric)  # Hysteresis: re-arm once it levels off
+        return out
+
+    def suspects(self):
+        return [s for s in self.watched.values() if s.flagged]
+
+    def rows(self):
+        """Watched processes for display, suspects first then by handle growth."""
+        def key(s):
+            return (not s.flagged, -s.rate("handles")[0])
+        return sorted(self.watched.values(), key=key)
+
+
+class SyntheticLeakProcess:
+    """psutil.Process stand-in with scripted counters, for benchmarks.
+
+    `kind` is "flat" (noise only), "leak" (steady growth), "step" (one jump)
+    or "sawtooth" (grows, then a periodic cleanup frees everything).
+    """
+
+    def __init__(self, pid, name, kind, clock, rng):
+        self.pid = pid
+        self.info = {"name": name, "create_time": 1.0}
+        self.kind = kind
+        self.clock = clock
+        self.rng = rng
+        self.base = rng.randrange(100, 2000)
+
+    @contextmanager
+    def oneshot(self):
+        yield
+
+    def _value(self, per_hour):
+        t = self.clock[0] / 3600.0
+        grow = {"flat": 0.0, "leak": per_hour * t,
+                "step": 400.0 if t > 1.0 else 0.0,
+                "sawtooth": per_hour * (t % 0.25)}[self.kind]
+        return int(self.base + grow + self.rng.uniform(-8, 8))
+
+    def num_handles(self):
+        return self._value(120)
+
+    num_fds = num_handles
+
+    def num_threads(self):
+        return max(1, self._value(0) // 50)
+
+    def open_files(self):
+        return [None] * max(0, self._value(0) // 100)
+
+
+# ============================================================================
+# COMMAND RUNNERS & NETWORK HELPERS
+# ============================================================================
+
+# Keep console windows from flashing up for background commands
+NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+def run_command(cmd, timeout=30):
+    """Default blocking runner: returns stdout decoded like the console does."""
+    out = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                         stdin=subprocess.DEVNULL, timeout=timeout,
+                         creationflags=NO_WINDOW).stdout
+    return out.decode("cp850", errors="ignore")
+
+
+WLAN_LIST_CMD = "netsh wlan show profiles"
+WLAN_KEY_CMD = 'netsh wlan show profile name="{name}" key=clear'
+WLAN_PROFILE_RE = re.compile(r"All User Profile\s*:\s*(.+)")
+WLAN_KEY_RE = re.compile(r"Key Content\s*:\s*(.*)")
+
+
+def parse_wlan_profiles(output):
+    return [name.strip() for name in WLAN_PROFILE_RE.findall(output)]
+
+
+def parse_wlan_key(output):
+    match = WLAN_KEY_RE.search(output)
+    return match.group(1).strip() if match else "N/A"
+
+
+CommandResult = namedtuple("CommandResult", "cmd returncode output timed_out")
+
+
+class AsyncCommandRunner:
+    """Runs shell commands on an asyncio loop, each with its own timeout."""
+
+    def __init__(self, default_timeout=120):
+        self.default_timeout = default_timeout
+        self.encoding = locale.getpreferredencoding()
+
+    async def run(self, cmd, timeout=None):
+        proc = await asyncio.create_subprocess_shell(
+            cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+            stdin=asyncio.subprocess.DEVNULL, creationflags=NO_WINDOW)
+        try:
+            out, _ = await asyncio.wait_for(proc.communicate(),
+                                            timeout or self.default_timeout)
+        except asyncio.TimeoutError:
+            # Kill the shell's children too, or they keep the pipes open
+            try:
+                for child in psutil.Process(proc.pid).children(recursive=True):
+                    child.kill()
+            except psutil.Error:
+                pass
+            proc.kill()
+            await proc.wait()
+            return CommandResult(cmd, None, "", True)
+        return CommandResult(cmd, proc.returncode,
+                             out.decode(self.encoding, errors="replace"), False)
+
+
+class FakeCommandRunner:
+    """Drop-in for AsyncCommandRunner that simulates Windows services.
+
+    `sc stop/start` return at once and the service reports *_PENDING until
+    the transition time has elapsed; `net stop/start` block for it, like the
+    real thing. Lets the orchestration be tested and benchmarked anywhere.
+    """
+
+    def __init__(self, services=(), stop_time=1.0, start_time=1.0, exec_time=0.02,
+                 state_label="STATE"):
+        self.state = {s.lower(): "RUNNING" for s in services}
+        self.state_label = state_label  # e.g. "ZUSTAND" as a German sc prints it
+        self.pending = {}  # service -> (target state, ready at)
+        self.stop_time = stop_time
+        self.start_time = start_time
+        self.exec_time = exec_time
+        self.history = []
+
+    def _state(self, name):
+        target = self.pending.get(name)
+        if target:
+            if time.monotonic() >= target[1]:
+                self.state[name] = target[0]
+                del self.pending[name]
+            else:
+                return "STOP_PENDING" if target[0] == "STOPPED" else "START_PENDING"
+        return self.state.get(name, "STOPPED")
+
+    def _begin(self, name, start):
+        if self._state(name) != ("RUNNING" if start else "STOPPED"):
+            delay = self.start_time if start else self.stop_time
+            self.pending[name] = ("RUNNING" if start else "STOPPED",
+                                  time.monotonic() + delay)
+            return delay
+        return 0
+
+    async def _exec(self, cmd):
+        self.history.append(cmd)
+        parts = cmd.lower().split()
+        await asyncio.sleep(self.exec_time)
+        if parts[:1] == ["sc"] and len(parts) == 3:
+            verb, name = parts[1], parts[2]
+            if verb == "query":
+                state = self._state(name)
+                out = (f"        TYPE               : 20  WIN32_SHARE_PROCESS\n"
+                       f"        {self.state_label:<19}: {SC_STATES.index(state) + 1}  {state}\n"
+                       f"        WIN32_EXIT_CODE    : 0  (0x0)\n")
+                return CommandResult(cmd, 0, out, False)
+            self._begin(name, verb == "start")
+        elif parts[:1] == ["net"] and len(parts) == 3:
+            await asyncio.sleep(self._begin(parts[2], parts[1] == "start"))
+        return CommandResult(cmd, 0, "", False)
+
+    async def run(self, cmd, timeout=None):
+        try:
+            return await asyncio.wait_for(self._exec(cmd), timeout)
+        except asyncio.TimeoutError:
+            return CommandResult(cmd, None, "", True)
+
+
+UPDATE_SERVICES = ["wuauserv", "cryptSvc", "bits", "msiserver"]
+# SERVICE_STATUS dwCurrentState codes 1..7. `sc query` translates the
+# "STATE" label on non-English Windows, so match the numeric code instead
+# (TYPE is 10 or more for services, exit codes are followed by "(0x..)").
+SC_STATES = ("STOPPED", "START_PENDING", "STOP_PENDING", "RUNNING",
+             "CONTINUE_PENDING", "PAUSE_PENDING", "PAUSED")
+SC_STATE_RE = re.compile(r":\s*([1-7])\s+[A-Z_]+\b")
+
+
+async def service_state(runner, name):
+    res = await runner.run(f"sc query {name}", timeout=10)
+    match = SC_STATE_RE.search(res.output)
+    return SC_STATES[int(match.group(1)) - 1] if match else "UNKNOWN"
+
+
+async def set_service_state(runner, name, running, timeout=60):
+    """Ask the SCM for a state change, then poll until it is reached."""
+    target = "RUNNING" if running else "STOPPED"
+    if await service_state(runner, name) == target:
+        return True
+    res = await runner.run(f"sc {'start' if running else 'stop'} {name}", timeout=15)
+    if res.timed_out:
+        return False
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = 0.05
+    while loop.time() < deadline:
+        if await service_state(runner, name) == target:
+            return True
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 1.0)
+    return False
+
+
+async def set_services_state(runner, names, running, log_func):
+    """Transition independent services concurrently. Returns the failures."""
+    results = await asyncio.gather(
+        *(set_service_state(runner, n, running) for n in names))
+    failed = [n for n, ok in zip(names, results) if not ok]
+    verb = "start" if running else "stop"
+    for n in failed:
+        log_func(f"Could not {verb} {n} (timed out or refused).", "WARNING")
+    return failed
+
+
+async def reset_windows_update(runner, log_func, rename=os.rename):
+    log_func("Stopping Update Services...", "INFO")
+    await set_services_state(runner, UPDATE_SERVICES, False, log_func)
+
+    log_func("Renaming SoftwareDistribution...", "INFO")
+    for path in (r"C:\Windows\SoftwareDistribution", r"C:\Windows\System32\catroot2"):
+        if os.path.exists(path):
+            try:
+                rename(path, path + ".old")
+            except OSError as e:
+                log_func(f"Could not rename {path}: {e}", "WARNING")
+
+    log_func("Restarting Services...", "INFO")
+    await set_services_state(runner, UPDATE_SERVICES, True, log_func)
+
+
+async def reset_network_stack(runner, log_func):
+    async def run(cmd, timeout):
+        log_func(f"Exec: {cmd}", "CMD")
+        res = await runner.run(cmd, timeout=timeout)
+        if res.timed_out:
+            log_func(f"Timed out after {timeout}s: {cmd}", "WARNING")
+        return res
+
+    async def renew_lease():
+        # Renew only makes sense after the release has completed
+        await run("ipconfig /release", 60)
+        await run("ipconfig /renew", 90)
+
+    await asyncio.gather(renew_lease(), run("ipconfig /flushdns", 30))
+    await run("netsh int ip reset", 60)
+
+
+DNS_PRESETS = {
+    "Google (8.8.8.8)": ("8.8.8.8", "8.8.4.4"),
+    "Cloudflare (1.1.1.1)": ("1.1.1.1", "1.0.0.1"),
+    "Automatic (DHCP)": None,
+}
+DNS_BENCH_NAMES = ["microsoft.com", "google.com", "github.com", "wikipedia.org",
+                   "cloudflare.com", "amazon.com"]
+IPV4_RE = re.compile(r"\b(\d{1,3}(?:\.\d{1,3}){3})\b")
+
+
+def active_interfaces():
+    """Names of adapters that are up and carry a non-loopback IPv4 address."""
+    stats = psutil.net_if_stats()
+    names = []
+    for name, addrs in psutil.net_if_addrs().items():
+        st = stats.get(name)
+        if not st or not st.isup:
+            continue
+        ipv4 = [a.address for a in addrs if a.family == socket.AF_INET]
+        if ipv4 and not all(ip.startswith("127.") for ip in ipv4):
+            names.append(name)
+    return names
+
+
+def system_resolvers(runner=run_command):
+    """Resolvers currently in use (normally the DHCP-provided ones)."""
+    found = []
+    try:
+        if platform.system() == "Windows":
+            out = runner("netsh interface ipv4 show dnsservers")
+        else:
+            with open("/etc/resolv.conf", encoding="utf-8") as f:
+                out = "\n".join(l for l in f if l.startswith("nameserver"))
+    except Exception:
+        return found
+    for ip in IPV4_RE.findall(out):
+        if ip not in found and not ip.startswith("127."):
+            found.append(ip)
+    return found
+
+
+async def apply_dns(runner, interfaces, servers, log_func):
+    """Point every interface at `servers` (None = DHCP), concurrently."""
+    async def configure(name):
+        if servers is None:
+            cmds = [f'netsh interface ipv4 set dnsservers name="{name}" source=dhcp']
+        else:
+            cmds = [f'netsh interface ipv4 set dnsservers name="{name}" source=static '
+                    f'address={servers[0]} register=primary validate=no']
+            cmds += [f'netsh interface ipv4 add dnsservers name="{name}" '
+                     f'address={ip} index={i} validate=no'
+                     for i, ip in enumerate(servers[1:], start=2)]
+        for cmd in cmds:
+            res = await runner.run(cmd, timeout=20)
+            if res.timed_out or res.returncode:
+                log_func(f"{name}: {res.output.strip() or 'timed out'}", "WARNING")
+                return False
+        log_func(f"{name}: OK", "PROCESS")
+        return True
+
+    results = await asyncio.gather(*(configure(n) for n in interfaces))
+    return [n for n, ok in zip(interfaces, results) if not ok]
+
+
+def build_dns_query(name, qid):
+    header = struct.pack(">HHHHHH", qid, 0x0100, 1, 0, 0, 0)  # RD set
+    qname = b"".join(bytes([len(p)]) + p.encode("ascii")
+                     for p in name.split(".")) + b"\0"
+    return header + qname + struct.pack(">HH", 1, 1)  # A / IN
+
+
+def probe_resolver(host, port=53, names=DNS_BENCH_NAMES, rounds=3, timeout=1.0):
+    """Latencies in ms for sequential A queries; None marks a lost query."""
+    latencies = []
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(timeout)
+        for _ in range(rounds):
+            for name in names:
+                qid = random.randrange(65536)
+                t0 = time.perf_counter()
+                try:
+                    sock.sendto(build_dns_query(name, qid), (host, port))
+                    while True:
+                        data, _ = sock.recvfrom(4096)
+                        # Ignore late answers to earlier (timed out) queries
+                        if len(data) >= 4 and struct.unpack(">H", data[:2])[0] == qid \
+                                and data[2] & 0x80:
+                            break
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                except OSError:
+                    latencies.append(None)
+    return latencies
+
+
+def benchmark_resolvers(servers, **probe_args):
+    """Probe (label, host[, port]) servers in parallel, best first."""
+    def run(server):
+        label, host, port = (tuple(server) + (53,))[:3]
+        samples = probe_resolver(host, port, **probe_args)
+        ok = sorted(s for s in samples if s is not None)
+        return {
+            "label": label, "host": host, "port": port,
+            "median": ok[len(ok) // 2] if ok else None,
+            "p95": ok[min(len(ok) - 1, int(len(ok) * 0.95))] if ok else None,
+            "lost": len(samples) - len(ok), "sent": len(samples),
+        }
+
+    with ThreadPoolExecutor(max_workers=max(1, len(servers))) as pool:
+        results = list(pool.map(run, servers))
+    # Lossy resolvers rank below clean ones, then by median and tail latency
+    return sorted(results, key=lambda r: (r["median"] is None,
+                                          r["lost"] / r["sent"] > 0.1,
+                                          r["median"] or 0, r["p95"] or 0))
+
+
+def fmt_addr(addr):
+    if not addr:
+        return ""
+    ip, port = addr
+    return f"[{ip}]:{port}" if ":" in ip else f"{ip}:{port}"
+
+
+class ConnectionTracker:
+    """Diffs successive net_connections() polls and names the owning processes.
+
+    poll() returns (added, removed, changed) so views can update incrementally.
+    Names are cached per PID and forgotten once the PID owns no sockets.
+    """
+    PROTO = {(socket.AF_INET, socket.SOCK_STREAM): "TCP",
+             (socket.AF_INET6, socket.SOCK_STREAM): "TCP6",
+             (socket.AF_INET, socket.SOCK_DGRAM): "UDP",
+             (socket.AF_INET6, socket.SOCK_DGRAM): "UDP6"}
+
+    def __init__(self, source=None):
+        self.source = source or (lambda: psutil.net_connections(kind="inet"))
+        self.current = {}  # key -> status
+        self.names = {}    # pid -> process name
+
+    def name(self, pid):
+        if pid is None:
+            return "?"
+        name = self.names.get(pid)
+        if name is None:
+            try:
+                name = psutil.Process(pid).name()
+            except psutil.Error:
+                name = "?"
+            self.names[pid] = name
+        return name
+
+    def record(self, key, status):
+        """Display row for a connection key."""
+        pid, family, stype, laddr, raddr = key
+        return [self.name(pid), pid, self.PROTO.get((family, stype), "?"),
+                fmt_addr(laddr), fmt_addr(raddr), status]
+
+    @instrumented("connections.poll")
+    def poll(self):
+        prev = self.current
+        seen = {(c.pid, c.family, c.type, tuple(c.laddr), tuple(c.raddr)): c.status
+                for c in self.source()}
+        added, changed = [], []
+        for key, status in seen.items():
+            old = prev.get(key)
+            if old is None:
+                added.append((key, status))
+            elif old != status:
+                changed.append((key, status))
+        removed = [key for key in prev if key not in seen]
+        self.current = seen
+
+        live = {key[0] for key in seen}
+        for pid in self.names.keys() - live:
+            del self.names[pid]
+        return added, removed, changed
+
+
+# ============================================================================
+# ALERTING
+# ============================================================================
+
+ALERT_RULES_FILE = os.path.join(DATA_DIR, "alerts.json")
+ALERT_RULES_TEMPLATE = {
+    "rules": [
+        {"name": "CPU saturated", "metric": "cpu", "op": ">", "threshold": 90,
+         "for": 60, "clear": 80, "cooldown": 300},
+        {"name": "Low memory", "metric": "ram_available_mb", "op": "<",
+         "threshold": 1024, "clear": 1536, "cooldown": 600},
+        {"name": "Browser memory creeping up", "metric": "proc_rss_mb:chrome*",
+         "op": "growing", "threshold": 200, "for": 600, "cooldown": 1800,
+         "command": ""},
+    ]
+}
+AlertEvent = namedtuple("AlertEvent", "rule kind value ts")  # kind: FIRED/CLEARED
+
+
+class SlidingWindow:
+    """Min/max over the last `seconds`, kept in monotonic deques.
+
+    Every sample is pushed and popped at most once, so updates are O(1)
+    amortised regardless of window length or sample rate.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.mins = deque()  # (ts, value), values increasing
+        self.maxs = deque()  # (ts, value), values decreasing
+        self.start = None
+
+    def reset(self):
+        self.mins.clear()
+        self.maxs.clear()
+        self.start = None
+
+    def push(self, ts, value):
+        if self.start is None:
+            self.start = ts
+        while self.mins and self.mins[-1][1] >= value:
+            self.mins.pop()
+        self.mins.append((ts, value))
+        while self.maxs and self.maxs[-1][1] <= value:
+            self.maxs.pop()
+        self.maxs.append((ts, value))
+        cutoff = ts - self.seconds
+        while self.mins[0][0] < cutoff:
+            self.mins.popleft()
+        while self.maxs[0][0] < cutoff:
+            self.maxs.popleft()
+
+    def covered(self, ts):
+        """True once the window spans its full length of data."""
+        return self.start is not None and ts - self.start >= self.seconds
+
+    @property
+    def min(self):
+        return self.mins[0][1]
+
+    @property
+    def max(self):
+        return self.maxs[0][1]
+
+
+class AlertRule:
+    """Threshold rule with duration, hysteresis and cooldown.
+
+    op ">" / "<": value beyond `threshold` for the whole `for` window;
+    clears once back past `clear` (defaults to threshold).
+    op "growing": never decreasing for `for` seconds and up by more than
+    `threshold` over that run; clears when the value drops.
+    """
+    OPS = (">", "<", "growing")
+
+    def __init__(self, name, metric, op, threshold=0.0, duration=0.0, clear=None,
+                 cooldown=300.0, command="", notify=True):
+        if op not in self.OPS:
+            raise ValueError(f"{name}: unknown op {op!r} (use {', '.join(self.OPS)})")
+        if metric.startswith("proc_") and ":" in metric:
+            # ProcessRuleProbe matches and reports patterns in lower case
+            kind, pattern = metric.split(":", 1)
+            metric = f"{kind}:{pattern.lower()}"
+        self.name = name
+        self.metric = metric
+        self.op = op
+        self.threshold = float(threshold)
+        self.duration = float(duration)
+        self.clear = float(threshold if clear is None else clear)
+        self.cooldown = float(cooldown)
+        self.command = command
+        self.notify = notify
+        self.window = SlidingWindow(self.duration)
+        self.run_start = None  # (ts, value) of the current non-decreasing run
+        self.prev = None
+        self.value = None  # Last value fed, reported when the metric vanishes
+        self.active = False
+        self.last_fired = None
+
+    @classmethod
+    def from_dict(cls, d):
+        try:
+            return cls(d["name"], d["metric"], d["op"], d.get("threshold", 0),
+                       d.get("for", 0), d.get("clear"), d.get("cooldown", 300),
+                       d.get("command", ""), d.get("notify", True))
+        except KeyError as e:
+            raise ValueError(f"Alert rule {d.get('name', '?')!r} is missing {e}") from None
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Alert rule {d.get('name', '?')!r}: {e}") from None
+
+    def reset(self):
+        self.window.reset()
+        self.run_start = self.prev = None
+
+    def gone(self):
+        """The metric vanished (e.g. process exited): start over, clear if active."""
+        self.reset()
+        if self.active:
+            self.active = False
+            return "CLEARED"
+        return None
+
+    def _triggered(self, ts, value):
+        if self.op == "growing":
+            if self.prev is None or value < self.prev:
+                self.run_start = (ts, value)
+            self.prev = value
+            return (ts - self.run_start[0] >= self.duration
+                    and value - self.run_start[1] > self.threshold)
+        self.window.push(ts, value)
+        if not self.window.covered(ts):
+            return False
+        if self.op == ">":
+            return self.window.min > self.threshold
+        return self.window.max < self.threshold
+
+    def _cleared(self, value, triggered):
+        if self.op == ">":
+            return value < self.clear
+        if self.op == "<":
+            return value > self.clear
+        return not triggered  # Growth run broken
+
+    def feed(self, ts, value):
+        """Returns "FIRED", "CLEARED" or None."""
+        self.value = value
+        triggered = self._triggered(ts, value)
+        if self.active:
+            if self._cleared(value, triggered):
+                self.active = False
+                return "CLEARED"
+            return None
+        if triggered and (self.last_fired is None or ts - self.last_fired >= self.cooldown):
+            self.active = True
+            self.last_fired = ts
+            return "FIRED"
+        return None
+
+
+class ProcessRuleProbe:
+    """Summed RSS/CPU of processes whose name matches a glob, for alert rules.
+
+    Handles are kept between ticks (needed for CPU%) and the process list is
+    only rescanned every `rescan_every` ticks.
+    """
+
+    def __init__(self, patterns, rescan_every=10):
+        self.patterns = sorted({p.lower() for p in patterns})
+        self.rescan_every = rescan_every
+        self.handles = {p: {} for p in self.patterns}
+        self.ncpu = psutil.cpu_count() or 1
+        self.tick = 0
+
+    def _rescan(self):
+        for p in psutil.process_iter(["name"]):
+            name = (p.info["name"] or "").lower()
+            for pat in self.patterns:
+                if fnmatch.fnmatchcase(name, pat) and p.pid not in self.handles[pat]:
+                    p.cpu_percent(None)
+                    self.handles[pat][p.pid] = p
+
+    def sample(self):
+        if not self.patterns:
+            return {}
+        if self.tick % self.rescan_every == 0:
+            self._rescan()
+        self.tick += 1
+        out = {}
+        for pat, procs in self.handles.items():
+            rss = cpu = 0.0
+            for pid, p in list(procs.items()):
+                try:
+                    with p.oneshot():
+                        rss += p.memory_info().rss
+                        cpu += p.cpu_percent(None)
+                except psutil.NoSuchProcess:
+                    del procs[pid]
+                except psutil.AccessDenied:
+                    pass
+            if procs:
+                out[f"proc_rss_mb:{pat}"] = rss / 1048576
+                out[f"proc_cpu:{pat}"] = cpu / self.ncpu
+        return out
+
+
+def alert_metrics(sample):
+    """Flatten a TelemetrySampler sample into rule metric names."""
+    net = sample["net"].get(NetTelemetry.ALL, {})
+    disk = sample["disk_io"].get(DiskTelemetry.ALL, {})
+    metrics = {
+        "cpu": sample["cpu"],
+        "cpu_core_max": max(sample["cpu_cores"], default=0),
+        "ram": sample["ram"],
+        "ram_available_mb": sample["ram_available"] / 1048576,
+        "net_down": net.get("bytes_recv", 0.0),
+        "net_up": net.get("bytes_sent", 0.0),
+        "disk_busy": disk.get("busy", 0.0),
+        "disk_latency_ms": disk.get("latency_ms", 0.0),
+    }
+    for mount, pct in sample["partitions"].items():
+        metrics[f"disk_usage:{mount}"] = pct
+    return metrics
+
+
+class AlertEngine:
+    """Feeds metric samples to every rule; returns the resulting events."""
+
+    def __init__(self, rules=()):
+        self.rules = list(rules)
+        self.probe = ProcessRuleProbe(
+            r.metric.split(":", 1)[1] for r in self.rules if r.metric.startswith("proc_"))
+
+    @classmethod
+    def load(cls, path=ALERT_RULES_FILE):
+        """Rules from a JSON file; a missing file means no rules."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except ValueError as e:
+                raise ValueError(f"{path}: {e}") from None
+        return cls(AlertRule.from_dict(d) for d in data.get("rules", []))
+
+    @property
+    def active(self):
+        return [r for r in self.rules if r.active]
+
+    @instrumented("alerts.feed")
+    def feed(self, ts, metrics):
+        events = []
+        for rule in self.rules:
+            value = metrics.get(rule.metric)
+            if value is None:  # Gap (e.g. process not running)
+                kind, value = rule.gone(), rule.value
+            else:
+                kind = rule.feed(ts, value)
+            if kind:
+                events.append(AlertEvent(rule, kind, value, ts))
+        return events
+
+    def replay(self, samples):
+        """Evaluate recorded (ts, metrics) pairs; returns all events."""
+        events = []
+        for ts, metrics in samples:
+            events += self.feed(ts, metrics)
+        return events
+
+
+def read_metric_samples(path):
+    """JSON lines of {"ts": ..., "metrics": {...}} as (ts, metrics) pairs."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                rec = json.loads(line)
+                yield rec["ts"], rec["metrics"]
+
+
+# ============================================================================
+# MAINTENANCE SCHEDULING
+# ============================================================================
+
+MAINTENANCE_FILE = os.path.join(DATA_DIR, "maintenance.json")
+MAINTENANCE_STATE_FILE = os.path.join(DATA_DIR, "maintenance_state.json")
+MAINTENANCE_TEMPLATE = {
+    "profiles": {
+        "Weekly health check": {"tasks": ["sfc", "dism", "clean_temp"],
+                                "every_hours": 168, "jitter_minutes": 30,
+                                "window_hours": 24, "enabled": False},
+    },
+    # Heavy tasks wait, or pause mid-run, while any of these is exceeded
+    "thresholds": {"cpu": 40, "disk_mbps": 30, "idle_minutes": 5},
+}
+
+
+class _LastInputInfo(ctypes.Structure):
+    _fields_ = [("cbSize", ctypes.c_uint), ("dwTime", ctypes.c_uint)]
+
+
+def user_idle_seconds():
+    """Seconds since the last keyboard/mouse input, None where unknown."""
+    try:
+        info = _LastInputInfo(ctypes.sizeof(_LastInputInfo), 0)
+        if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+            return None
+        # Both tick counts are 32-bit and wrap every ~49.7 days
+        return ((ctypes.windll.kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF) / 1000.0
+    except (AttributeError, OSError):
+        return None
+
+
+class TaskControl:
+    """Pause/resume handle shared by a maintenance run and its tasks.
+
+    Commands started through spawn()/run() are suspended as a process tree
+    while paused; Python tasks call checkpoint() between units of work.
+    """
+
+    def __init__(self):
+        self.running = threading.Event()
+        self.running.set()
+        self.lock = threading.Lock()
+        self.procs = []  # psutil.Process of every child spawned
+        self.paused_at = None
+        self.paused_total = 0.0
+        self.usage_prev = None
+        self.ncpu = psutil.cpu_count() or 1
+
+    @property
+    def paused(self):
+        return not self.running.is_set()
+
+    def checkpoint(self):
+        self.running.wait()
+
+    def spawn(self, cmd, **kwargs):
+        self.checkpoint()
+        proc = subprocess.Popen(cmd, **kwargs)
+        with self.lock:
+            try:
+                self.procs.append(psutil.Process(proc.pid))
+            except psutil.Error:
+                pass  # Already gone
+            if self.paused:  # Paused between checkpoint() and Popen()
+                signal_processes([proc.pid], "suspend", tree=True)
+        return proc
+
+    def run(self, cmd, **kwargs):
+        """subprocess.run() whose child follows pause()/resume()."""
+        proc = self.spawn(cmd, **kwargs)
+        out, err = proc.communicate()
+        return subprocess.CompletedProcess(cmd, proc.returncode, out, err)
+
+    def _live_pids(self):
+        # Caller holds self.lock
+        self.procs = [p for p in self.procs if p.is_running()]
+        return [p.pid for p in self.procs]
+
+    def pause(self):
+        with self.lock:  # Atomic with respect to spawn()
+            if self.paused:
+                return
+            self.running.clear()
+            self.paused_at = time.monotonic()
+            signal_processes(self._live_pids(), "suspend", tree=True)
+
+    def resume(self):
+        with self.lock:
+            if not self.paused:
+                return
+            signal_processes(self._live_pids(), "resume", tree=True)
+            self.paused_total += time.monotonic() - self.paused_at
+            self.paused_at = None
+            self.running.set()
+
+    def usage(self):
+        """(CPU % of the machine, I/O bytes/s) used by the spawned trees
+        since the previous call."""
+        cpu = io = 0.0
+        with self.lock:
+            pids = self._live_pids()
+        for pid in pids:
+            try:
+                root = psutil.Process(pid)
+                for p in [root] + root.children(recursive=True):
+                    with p.oneshot():
+                        t = p.cpu_times()
+                        c = p.io_counters()
+                    cpu += t.user + t.system
+                    io += c.read_bytes + c.write_bytes
+            except (psutil.Error, AttributeError):
+                continue
+        now = time.monotonic()
+        prev, self.usage_prev = self.usage_prev, (now, cpu, io)
+        if prev is None or now <= prev[0]:
+            return 0.0, 0.0
+        dt = now - prev[0]
+        return (max(0.0, cpu - prev[1]) / dt * 100.0 / self.ncpu,
+                max(0.0, io - prev[2]) / dt)
+
+
+class MaintenanceScheduler:
+    """Places maintenance profiles in time and gates heavy tasks on load.
+
+    A profile is a list of task ids repeated every `every_hours`. Each run is
+    planned into the quietest stretch of the following `window_hours`, judged
+    by an hour-of-week load profile learned from telemetry and by how long
+    the profile's tasks took before, then pushed back by random jitter.
+    """
+    THRESHOLDS = {"cpu": 40.0, "disk_mbps": 30.0, "idle_minutes": 5.0}
+    DEFAULT_TASK_S = 300.0  # Assumed duration of a task never timed
+    KEEP_RUNS = 5           # Durations remembered per task
+    LOAD_ALPHA = 0.05       # Hour-of-week profile: slow, spans many weeks
+    NOW_ALPHA = 0.3         # Gate: smooths single-sample spikes
+    SLOTS = 168             # Hours in a week
+
+    def __init__(self, profiles=None, thresholds=None, state=None, rng=None):
+        self.profiles = profiles or {}
+        self.thresholds = dict(self.THRESHOLDS, **(thresholds or {}))
+        state = state or {}
+        self.next_run = state.get("next_run", {})
+        self.last_run = state.get("last_run", {})
+        self.durations = state.get("durations", {})
+        load = state.get("load")
+        self.load = load if load and len(load) == self.SLOTS else [None] * self.SLOTS
+        self.rng = rng or random.Random()
+        self.cpu = 0.0
+        self.disk_bps = 0.0
+
+    @classmethod
+    def load_files(cls, path=MAINTENANCE_FILE, state_path=MAINTENANCE_STATE_FILE):
+        """Profiles from `path` (none if missing) plus saved state."""
+        config, state = {}, {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        for name, p in config.get("profiles", {}).items():
+            if not isinstance(p.get("tasks"), list) or not p["tasks"]:
+                raise ValueError(f"profile {name!r}: 'tasks' must be a non-empty list")
+            if not p.get("every_hours", 0) > 0:
+                raise ValueError(f"profile {name!r}: 'every_hours' must be positive")
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            pass  # First run, or a torn write: start learning again
+        return cls(config.get("profiles"), config.get("thresholds"), state)
+
+    def state(self):
+        return {"next_run": self.next_run, "last_run": self.last_run,
+                "durations": self.durations,
+                "load": [None if v is None else round(v, 2) for v in self.load]}
+
+    def save_state(self, path=MAINTENANCE_STATE_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state(), f)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def slot(ts):
+        t = time.localtime(ts)
+        return t.tm_wday * 24 + t.tm_hour
+
+    def observe(self, ts, cpu, disk_bps):
+        """Feed load not caused by maintenance itself."""
+        self.cpu += self.NOW_ALPHA * (cpu - self.cpu)
+        self.disk_bps += self.NOW_ALPHA * (disk_bps - self.disk_bps)
+        s = self.slot(ts)
+        prev = self.load[s]
+        self.load[s] = cpu if prev is None else prev + self.LOAD_ALPHA * (cpu - prev)
+
+    def blocked(self, idle_s):
+        """Why heavy tasks must wait right now, or None."""
+        th = self.thresholds
+        if self.cpu > th["cpu"]:
+            return f"CPU {self.cpu:.0f}% > {th['cpu']:g}%"
+        if self.disk_bps / 1048576 > th["disk_mbps"]:
+            return f"disk {self.disk_bps / 1048576:.0f} MB/s > {th['disk_mbps']:g} MB/s"
+        if idle_s is not None and idle_s < th["idle_minutes"] * 60:
+            return "user active"
+        return None
+
+    def expected_duration(self, task_ids):
+        total = 0.0
+        for t in task_ids:
+            runs = sorted(self.durations.get(t, ()))
+            total += runs[len(runs) // 2] if runs else self.DEFAULT_TASK_S
+        return total
+
+    def record_task(self, task_id, seconds):
+        runs = self.durations.setdefault(task_id, [])
+        runs.append(round(seconds, 1))
+        del runs[:-self.KEEP_RUNS]
+
+    def plan(self, name, earliest):
+        """Choose and remember the next start of profile `name`."""
+        p = self.profiles[name]
+        start = earliest
+        known = [v for v in self.load if v is not None]
+        window = int(p.get("window_hours", 0))
+        if window and known:
+            neutral = sum(known) / len(known)
+            hours = max(1, math.ceil(self.expected_duration(p["tasks"]) / 3600))
+            base = earliest - earliest % 3600
+            best = None
+            for k in range(window + 1):
+                t = base + k * 3600
+                loads = [self.load[self.slot(t + j * 3600)] for j in range(hours)]
+                score = sum(neutral if v is None else v for v in loads) / hours
+                if best is None or score < best[0]:
+                    best = (score, max(t, earliest))
+            start = best[1]
+        start += self.rng.uniform(0, p.get("jitter_minutes", 0) * 60)
+        self.next_run[name] = start
+        return start
+
+    def due(self, now):
+        """Enabled profiles whose planned start has passed."""
+        names = []
+        for name, p in self.profiles.items():
+            if not p.get("enabled", True):
+                continue
+            if name not in self.next_run:
+                self.plan(name, now)
+            if self.next_run[name] <= now:
+                names.append(name)
+        return names
+
+    def finish_run(self, name, started):
+        self.last_run[name] = started
+        if name in self.profiles:
+            self.plan(name, started + self.profiles[name]["every_hours"] * 3600)
+
+
+# ============================================================================
+# HISTORY STORE & EXPORT
+# ============================================================================
+
+HISTORY_DIR = os.path.join(DATA_DIR, "history")
+HISTORY_RETENTION_DAYS = 14
+HISTORY_MAX_MB = 256  # Oldest day segments go first once the store is bigger
+HISTORY_TOP_PROCS = 20
+EXPORT_CHUNK = 4096
+PROC_EXPORT_COLUMNS = (("ts", "d"), ("pid", "I"), ("name", "str"), ("cpu", "f"),
+                       ("rss", "d"), ("read_bps", "f"), ("write_bps", "f"))
+COLUMNAR_MAGIC = b"WTCOL1\0\0"
+
+
+class HistoryStore:
+    """Append-only JSON-lines segments, one file per kind and day.
+
+    Telemetry lines are {"ts", "metrics"} (the format --replay-alerts
+    reads); process lines are {"ts", "rows"} with the top
+    HISTORY_TOP_PROCS by CPU and by RSS; the rest are dropped.
+    Readers stream line by line, so exports never hold a range in memory.
+    Lines are buffered and flushed every FLUSH_S; segments older than
+    `retention_days` or beyond `max_mb` in total are pruned. Nothing is
+    written unless `recording` (opt-in) or with root=None (replays).
+    """
+    KINDS = ("telemetry", "processes")
+    FLUSH_S = 10.0
+    PRUNE_S = 600.0
+
+    def __init__(self, root=HISTORY_DIR, retention_days=HISTORY_RETENTION_DAYS,
+                 max_mb=HISTORY_MAX_MB, recording=True):
+        self.root = root
+        self.retention_days = retention_days
+        self.max_mb = max_mb
+        self.recording = recording and root is not None
+        self.files = {}       # kind -> (day, open file)
+        self.last_proc_ts = None
+        self.flushed = self.pruned = time.monotonic()
+        self.prune()
+
+    def _segment(self, kind, day):
+        return os.path.join(self.root, f"{kind}-{day}.jsonl")
+
+    def _writer(self, kind, ts):
+        day = time.strftime("%Y%m%d", time.localtime(ts))
+        cur = self.files.get(kind)
+        if cur and cur[0] == day:
+            return cur[1]
+        if cur:
+            cur[1].close()
+        os.makedirs(self.root, exist_ok=True)
+        f = open(self._segment(kind, day), "a", encoding="utf-8")
+        self.files[kind] = (day, f)
+        return f
+
+    def _append(self, kind, ts, record):
+        if not self.recording:
+            return
+        try:
+            f = self._writer(kind, ts)
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            now = time.monotonic()
+            if now - self.flushed >= self.FLUSH_S:
+                self.flush()
+            if now - self.pruned >= self.PRUNE_S:
+                self.prune()
+        except OSError:
+            pass  # Full or read-only disk must not stop the monitor
+
+    def set_recording(self, on):
+        self.recording = bool(on) and self.root is not None
+        if not self.recording:
+            self.close()
+
+    def flush(self):
+        """Write buffered lines out (before exporting the live segments)."""
+        self.flushed = time.monotonic()
+        for _, f in self.files.values():
+            try:
+                f.flush()
+            except OSError:
+                pass
+
+    @instrumented("history.record")
+    def record(self, ts, metrics):
+        if not self.recording:
+            return
+        self._append("telemetry", ts, {
+            "ts": round(ts, 3), "metrics": {k: round(v, 2) for k, v in metrics.items()}})
+
+    def record_processes(self, snap, top=HISTORY_TOP_PROCS):
+        """The `top` busiest processes by CPU plus the `top` largest by RSS.
+
+        The rest of the snapshot is not kept (use --record for every
+        process); each snapshot is stored once.
+        """
+        if snap is None or not len(snap) or snap.ts == self.last_proc_ts:
+            return
+        self.last_proc_ts = snap.ts
+        rows = range(len(snap))
+        keep = set(heapq.nlargest(top, rows, key=snap.cpu.__getitem__))
+        keep.update(heapq.nlargest(top, rows, key=snap.rss.__getitem__))
+        self._append("processes", snap.ts, {"ts": round(snap.ts, 3), "rows": [
+            [snap.pid[i], snap.name[i], snap.cpu[i], snap.rss[i],
+             round(snap.read_bps[i]), round(snap.write_bps[i])] for i in sorted(keep)]})
+
+    def segments(self, kind, start=None, end=None):
+        """Segment paths for `kind` overlapping [start, end], oldest first."""
+        if self.root is None or not os.path.isdir(self.root):
+            return []
+        lo = time.strftime("%Y%m%d", time.localtime(start)) if start else ""
+        hi = time.strftime("%Y%m%d", time.localtime(end)) if end else "99999999"
+        out = []
+        for fn in sorted(os.listdir(self.root)):
+            if fn.startswith(kind + "-") and fn.endswith(".jsonl"):
+                day = fn[len(kind) + 1:-6]
+                if lo <= day <= hi:
+                    out.append(os.path.join(self.root, fn))
+        return out
+
+    _TS_RE = re.compile(r'\{"ts":([-0-9.e]+),')
+    _KEY_RE = re.compile(r'"((?:[^"\\]|\\.)*)":')
+
+    def metric_names(self, start=None, end=None):
+        """Metric names recorded in a range, scanned without decoding JSON."""
+        seen = set()
+        for path in self.segments("telemetry", start, end):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    m = self._TS_RE.match(line)
+                    if m and (start is None or float(m.group(1)) >= start) and \
+                            (end is None or float(m.group(1)) <= end):
+                        seen.update(self._KEY_RE.findall(line, m.end()))
+        seen.discard("metrics")
+        return sorted(json.loads(f'"{k}"') for k in seen)
+
+    def records(self, kind, start=None, end=None):
+        """Stream decoded records with start <= ts <= end."""
+        for path in self.segments(kind, start, end):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line of a live segment
+                    ts = rec["ts"]
+                    if (start is None or ts >= start) and (end is None or ts <= end):
+                        yield rec
+
+    def prune(self):
+        """Remove segments past the retention, then the oldest days over max_mb."""
+        self.pruned = time.monotonic()
+        cutoff = time.strftime(
+            "%Y%m%d", time.localtime(time.time() - self.retention_days * 86400))
+        if self.root is None or not os.path.isdir(self.root):
+            return
+        live = {f.name for _, f in self.files.values()}
+        kept = []  # (day, path, size)
+        for fn in os.listdir(self.root):
+            day = fn.rsplit("-", 1)[-1][:8]
+            if not (fn.endswith(".jsonl") and day.isdigit()):
+                continue
+            path = os.path.join(self.root, fn)
+            try:
+                if day < cutoff and path not in live:
+                    os.remove(path)
+                else:
+                    kept.append((day, path, os.path.getsize(path)))
+            except OSError:
+                pass
+        total = sum(size for _, _, size in kept)
+        for day, path, size in sorted(kept):
+            if total <= self.max_mb * 1048576:
+                break
+            if path in live:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def close(self):
+        for _, f in self.files.values():
+            f.close()
+        self.files.clear()
+
+
+def history_rows(store, kind, start=None, end=None):
+    """Flat export rows: (ts, metrics dict) or process row tuples."""
+    for rec in store.records(kind, start, end):
+        if kind == "telemetry":
+            yield rec["ts"], rec["metrics"]
+        else:
+            for row in rec["rows"]:
+                yield (rec["ts"], *row)
+
+
+def _chunked(iterable, size=EXPORT_CHUNK):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ColumnarWriter:
+    """Compact block-columnar file (.wtc).
+
+    Layout: magic, u32 + JSON header (columns and array typecodes), then
+    blocks of u32 row count followed by one packed array per column, a u32
+    zero terminator, and u32 + JSON string table for "str" columns, which
+    are stored as u32 dictionary codes. Missing floats are NaN.
+    """
+
+    def __init__(self, f, kind, columns):
+        self.f = f
+        self.columns = list(columns)
+        self.strings = {}
+        header = json.dumps({"kind": kind, "byteorder": sys.byteorder,
+                             "columns": [{"name": n, "type": t} for n, t in self.columns]})
+        f.write(COLUMNAR_MAGIC)
+        self._blob(header.encode("utf-8"))
+
+    def _blob(self, data):
+        self.f.write(struct.pack("<I", len(data)))
+        self.f.write(data)
+
+    def write_block(self, cols):
+        """`cols` is one sequence per column, all the same length."""
+        n = len(cols[0])
+        if not n:
+            return
+        self.f.write(struct.pack("<I", n))
+        for (_, typ), values in zip(self.columns, cols):
+            if typ == "str":
+                values = [self.strings.setdefault(v, len(self.strings)) for v in values]
+                typ = "I"
+            self.f.write(array(typ, values).tobytes())
+
+    def close(self):
+        self.f.write(struct.pack("<I", 0))
+        self._blob(json.dumps(list(self.strings)).encode("utf-8"))
+
+
+def read_columnar(path):
+    """(header, list of blocks); each block maps column name -> values."""
+    with open(path, "rb") as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is not a WindowsTweak columnar file")
+        size, = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(size))
+        swap = header["byteorder"] != sys.byteorder
+        blocks = []
+        while True:
+            n, = struct.unpack("<I", f.read(4))
+            if not n:
+                break
+            block = {}
+            for col in header["columns"]:
+                typ = "I" if col["type"] == "str" else col["type"]
+                arr = array(typ)
+                arr.frombytes(f.read(arr.itemsize * n))
+                if swap:
+                    arr.byteswap()
+                block[col["name"]] = arr
+            blocks.append(block)
+        size, = struct.unpack("<I", f.read(4))
+        strings = json.loads(f.read(size))
+    for block in blocks:
+        for col in header["columns"]:
+            if col["type"] == "str":
+                block[col["name"]] = [strings[i] for i in block[col["name"]]]
+    return header, blocks
+
+
+def export_history(store, kind, path, start=None, end=None, progress=None):
+    """Stream a time range to CSV (.csv) or columnar (.wtc); returns rows written.
+
+    Telemetry columns are the union of metric names in the range, found
+    by a first streaming scan, so memory stays at one chunk either way.
+    """
+    csv_out = path.lower().endswith(".csv")
+    source = history_rows(store, kind, start, end)
+    if kind == "telemetry":
+        names = store.metric_names(start, end)
+        columns = [("ts", "d")] + [(n, "f") for n in names]
+        missing = "" if csv_out else float("nan")
+        source = ([ts] + [m.get(n, missing) for n in names] for ts, m in source)
+    else:
+        columns = list(PROC_EXPORT_COLUMNS)
+
+    rows = 0
+    with open(path, "w" if csv_out else "wb", **({"newline": "", "encoding": "utf-8"}
+                                                   if csv_out else {})) as f:
+        if csv_out:
+            writer = csv.writer(f)
+            writer.writerow([n for n, _ in columns])
+        else:
+            writer = ColumnarWriter(f, kind, columns)
+        for chunk in _chunked(source):
+            if csv_out:
+                writer.writerows(chunk)
+            else:
+                writer.write_block(list(zip(*chunk)))
+            rows += len(chunk)
+            if progress:
+                progress(rows)
+        if not csv_out:
+            writer.close()
+    return rows
+
+
+def parse_when(text, now=None):
+    """'24h', '7d', '90m' (ago) or an ISO date/time -> epoch seconds."""
+    if not text:
+        return None
+    now = time.time() if now is None else now
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd])", text.strip())
+    if m:
+        return now - float(m.group(1)) * {"s": 1, "m": 60, "h": 3600, "d": 86400}[m.group(2)]
+    try:
+        return datetime.datetime.fromisoformat(text.strip()).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid time {text!r} (use e.g. 24h, 7d or 2024-05-01T08:00)") from None
+
+
+# ============================================================================
+# TRACE RECORD & REPLAY
+# ============================================================================
+
+TRACE_VERSION = 1
+TRACE_LEVEL = 3  # gzip level: most of the size win for a fraction of level 9's CPU
+
+
+def _trace_round(value):
+    """Floats to 2 decimals, recursively: rates need no more and gzip does better."""
+    if isinstance(value, float):
+        return round(value, 2)
+    if isinstance(value, dict):
+        return {k: _trace_round(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_trace_round(v) for v in value]
+    return value
+
+
+class TraceRecorder:
+    """Writes sampler output to a gzip'd JSON-lines trace (.wtr).
+
+    The first line is a header. Telemetry lines hold a whole sample;
+    process lines are deltas against the previous snapshot: "add" rows
+    for new PIDs, "upd" rows for PIDs whose counters changed and "del"
+    PIDs, so a 10k-process trace only pays for what moved.
+    """
+
+    def __init__(self, path, level=TRACE_LEVEL):
+        self.path = path
+        self.f = gzip.open(path, "wt", encoding="utf-8", compresslevel=level)
+        self.prev = {}   # pid -> (status, cpu, rss, rss_delta, read_bps, write_bps)
+        self.last_proc_ts = None
+        self._write({"wtr": TRACE_VERSION, "host": platform.node(), "started": time.time()})
+
+    def _write(self, record):
+        self.f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    @instrumented("trace.record")
+    def system(self, sample):
+        s = dict(sample)
+        times = s.pop("cpu_core_times") or []
+        s["core_fields"] = list(times[0]._fields) if times else []
+        s["cpu_core_times"] = [list(t) for t in times]
+        self._write({"k": "telemetry", "ts": round(sample["ts"], 3), "s": _trace_round(s)})
+
+    @instrumented("trace.record")
+    def processes(self, snap):
+        if snap is None or snap.ts == self.last_proc_ts:
+            return
+        self.last_proc_ts = snap.ts
+        prev, cur, add, upd = self.prev, {}, [], []
+        for i, pid in enumerate(snap.pid):
+            row = (snap.status[i], snap.cpu[i], snap.rss[i], snap.rss_delta[i],
+                   round(snap.read_bps[i]), round(snap.write_bps[i]))
+            cur[pid] = row
+            old = prev.get(pid)
+            if old is None:
+                add.append([pid, snap.name[i], snap.user[i], *row])
+            elif old != row:
+                upd.append([pid, *row])
+        gone = [pid for pid in prev if pid not in cur]
+        self.prev = cur
+        self._write({"k": "processes", "ts": round(snap.ts, 3),
+                     "add": add, "upd": upd, "del": gone})
+
+    def close(self):
+        self.f.close()
+
+
+class _TraceStream:
+    """Cursor over one record kind of a trace, paced by its TracePlayer."""
+
+    def __init__(self, player, kind):
+        self.player = player
+        self.prefix = f'{{"k":"{kind}"'
+        self.records = self._read()
+        self.next = next(self.records, None)
+        self.cur = None
+
+    def _read(self):
+        with gzip.open(self.player.path, "rt", encoding="utf-8") as f:
+            next(f)  # Header
+            for line in f:
+                # Skip the other kind without decoding it
+                if line.startswith(self.prefix):
+                    yield json.loads(line)
+
+    @property
+    def done(self):
+        return self.next is None
+
+    def advance(self, apply=None):
+        """Move to the record due now (the next one at speed 0); returns it.
+
+        `apply` is called on every record passed, in order, for consumers
+        that have to see all of them (process deltas).
+        """
+        due = self.player.due(self)
+        while self.next is not None and (self.cur is None or due is None
+                                         or self.next["ts"] <= due):
+            self.cur = self.next
+            self.next = next(self.records, None)
+            if apply:
+                apply(self.cur)
+            if due is None:
+                break
+        if self.cur is not None and self.player.pacer is self:
+            # Once the pacer runs out, the others play out what is left
+            self.player.clock = float("inf") if self.done else self.cur["ts"]
+        return self.cur
+
+
+class TraceTelemetry:
+    """Replays telemetry records; same interface as TelemetrySampler."""
+
+    def __init__(self, player):
+        self.stream = _TraceStream(player, "telemetry")
+        self.net = NetTelemetry(counters=dict)
+        self.disk = DiskTelemetry(counters=dict)
+        self.shown = None
+
+    @instrumented("telemetry.sample")
+    def sample(self):
+        rec = self.stream.advance()
+        if rec is None:
+            raise ValueError(f"{self.stream.player.path} has no telemetry records")
+        s = dict(rec["s"])
+        cores = namedtuple("scputimes", s.pop("core_fields"))
+        s["cpu_core_times"] = [cores(*t) for t in s["cpu_core_times"]]
+        if rec is not self.shown:  # Graph history only grows with new records
+            self.shown = rec
+            self.net.replay(s["net"])
+            self.disk.replay(s["disk_io"], s["partitions"])
+        return s
+
+
+class TraceProcesses:
+    """Replays process deltas; same interface as ProcessSampler."""
+
+    def __init__(self, player, history=None):
+        self.stream = _TraceStream(player, "processes")
+        self.history = history if history is not None else ProcessHistory()
+        self.rows = {}   # pid -> [name, user, status, cpu, rss, rss_delta, read, write]
+        self.last = ProcessSnapshot()
+
+    def _apply(self, rec):
+        rows = self.rows
+        for pid in rec["del"]:
+            rows.pop(pid, None)
+            self.history.evict(pid)
+        for pid, *row in rec["add"]:
+            rows[pid] = row
+        for pid, *counters in rec["upd"]:
+            rows[pid][2:] = counters
+
+    @instrumented("processes.sample")
+    def sample(self):
+        rec = self.stream.advance(self._apply)
+        if rec is None or rec["ts"] == self.last.ts:
+            return self.last
+        snap = ProcessSnapshot(rec["ts"])
+        if self.rows:
+            # Transpose once instead of appending row by row
+            snap.pid = list(self.rows)
+            for col, values in zip(ProcessSnapshot.COLUMNS[1:], zip(*self.rows.values())):
+                setattr(snap, col, list(values))
+        record = self.history.record
+        for pid, cpu, rss in zip(snap.pid, snap.cpu, snap.rss):
+            record(pid, cpu, rss)
+        self.last = snap
+        return snap
+
+
+class TracePlayer:
+    """A recorded trace played back through drop-in samplers.
+
+    speed 1.0 keeps the recorded timing (each sample() returns the latest
+    record due by now, 2.0 twice as fast); speed 0 steps one record per
+    call, as fast as the caller asks. At speed 0 the first stream opened
+    sets the pace and the others catch up to its timestamp, so consumers
+    polled at different rates still see the same moment.
+    """
+
+    def __init__(self, path, speed=1.0):
+        self.path = path
+        self.speed = speed
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+        except (OSError, ValueError, EOFError) as e:
+            raise ValueError(f"{path} is not a readable trace: {e}") from None
+        if not isinstance(header, dict) or header.get("wtr") != TRACE_VERSION:
+            raise ValueError(f"{path} is not a version {TRACE_VERSION} WindowsTweak trace")
+        self.header = header
+        self.t0 = None      # First recorded ts, set by the first record read
+        self.wall0 = None
+        self.streams = []
+        self.clock = float("-inf")  # Pacer's current ts (speed 0)
+
+    @property
+    def pacer(self):
+        return self.streams[0] if self.streams else None
+
+    def due(self, stream):
+        """Recorded ts `stream` may advance to; None means one step."""
+        if self.speed <= 0:
+            return None if stream is self.pacer else self.clock
+        if self.wall0 is None:
+            self.wall0 = time.monotonic()
+            self.t0 = min((s.next["ts"] for s in self.streams if s.next), default=0.0)
+        return self.t0 + (time.monotonic() - self.wall0) * self.speed
+
+    def _stream(self, consumer):
+        self.streams.append(consumer.stream)
+        return consumer
+
+    def telemetry(self):
+        return self._stream(TraceTelemetry(self))
+
+    def processes(self, history=None):
+        return self._stream(TraceProcesses(self, history))
+
+    @property
+    def finished(self):
+        return all(s.done for s in self.streams)
+
+
+# ============================================================================
+# TELEMETRY BUS (shared memory)
+# ============================================================================
+
+BUS_NAME = "windowstweak_bus"
+BUS_SLOTS = 600           # History rows: 10 min at the default 1 s interval
+BUS_CAPACITY = 1024       # Minimum values per row (cores, NICs, disks, mounts...)
+BUS_SCHEMA_BYTES = 65536
+BUS_INTERVAL = 1.0
+BUS_IDLE_EXIT = 60.0      # Publisher exits after this long without a reader
+BUS_STALE = 10.0          # Readers give up on a bus this far behind
+BUS_RETRY_S = 0.05        # Readers give up on a write in progress after this long
+
+
+def flatten_sample(sample):
+    """TelemetrySampler sample -> {key: float}; keys are JSON-able tuples."""
+    flat = {("ts",): sample["ts"], ("cpu",): sample["cpu"], ("ram",): sample["ram"],
+            ("ram_available",): float(sample["ram_available"])}
+    for i, busy in enumerate(sample["cpu_cores"]):
+        flat[("core", i)] = busy
+    for i, t in enumerate(sample["cpu_core_times"] or []):
+        for field, v in zip(t._fields, t):
+            flat[("times", i, field)] = v
+    for nic, rates in sample["net"].items():
+        for field, v in rates.items():
+            flat[("net", nic, field)] = v
+    for disk, rates in sample["disk_io"].items():
+        for field, v in rates.items():
+            flat[("disk", disk, field)] = v
+    for mount, pct in sample["partitions"].items():
+        flat[("part", mount)] = pct
+    return flat
+
+
+def unflatten_sample(keys, row):
+    """Inverse of flatten_sample; NaN marks keys absent from this sample."""
+    s = {"cpu_cores": [], "net": {}, "disk_io": {}, "partitions": {}}
+    times = {}
+    for key, v in zip(keys, row):
+        if v != v:  # NaN
+            continue
+        kind = key[0]
+        if len(key) == 1:
+            s[kind] = v
+        elif kind == "core":
+            s["cpu_cores"].append(v)
+        elif kind == "times":
+            times.setdefault(key[1], {})[key[2]] = v
+        elif kind == "part":
+            s["partitions"][key[1]] = v
+        else:
+            s["net" if kind == "net" else "disk_io"].setdefault(key[1], {})[key[2]] = v
+    s["ram_available"] = int(s.get("ram_available", 0))
+    fields = next(iter(times.values()), {})
+    cores = namedtuple("scputimes", list(fields))
+    s["cpu_core_times"] = [cores(**times[i]) for i in sorted(times)]
+    return s
+
+
+def _attach_shm(name):
+    """Open an existing segment without letting this process's resource
+    tracker delete it at exit (POSIX attaches are tracked before 3.13)."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        # multiprocessing children share their parent's tracker, where the
+        # entry may be the parent's own: leave it to the parent
+        if os.name == "posix" and multiprocessing.parent_process() is None:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class TelemetryBus:
+    """Latest telemetry plus a history ring in one shared-memory segment.
+
+    Layout: a 64-byte header, a u32 + JSON key list (append-only, so a
+    key's column never moves), the latest row, then `slots` history rows
+    of `capacity` doubles. The single writer bumps `seq` to odd before it
+    touches anything and back to even when done; readers retry whenever
+    `seq` was odd or changed while they read (a seqlock), so they never
+    block the writer. A writer that died mid-write leaves `seq` odd: after
+    BUS_RETRY_S readers return the last good sample and set `dead`.
+    Readers index the mapping directly; only the values they ask for are
+    copied out.
+    """
+    MAGIC = b"WTB2"
+    # magic, publisher pid, seq, count, schema generation, last read (wall
+    # time), key count, slots, capacity. The 8-byte fields are 8-aligned.
+    HEADER = struct.Struct("<4sIQQQdIII")
+    HEADER_SIZE = 64
+    SEQ, COUNT, LAST_READ, NKEYS = 8, 16, 32, 40  # Field offsets in HEADER
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self.buf = shm.buf
+        _, _, _, _, _, _, _, self.slots, self.capacity = self.HEADER.unpack_from(self.buf)
+        base = self.HEADER_SIZE + BUS_SCHEMA_BYTES
+        rows = self.buf[base:base + 8 * self.capacity * (self.slots + 1)].cast("d")
+        self.latest = rows[:self.capacity]
+        self.ring = rows[self.capacity:]
+        self._rows = rows
+        self.keys = []
+        self.index = {}
+        self.gen = -1
+        self.last = (0, None)  # Last consistent read()
+        self.dead = False
+
+    @classmethod
+    def create(cls, name=BUS_NAME, slots=BUS_SLOTS, capacity=BUS_CAPACITY):
+        size = cls.HEADER_SIZE + BUS_SCHEMA_BYTES + 8 * capacity * (slots + 1)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        cls.HEADER.pack_into(shm.buf, 0, cls.MAGIC, os.getpid(), 0, 0, 0, time.time(),
+                             0, slots, capacity)
+        struct.pack_into("<I", shm.buf, cls.HEADER_SIZE, 2)
+        shm.buf[cls.HEADER_SIZE + 4:cls.HEADER_SIZE + 6] = b"[]"
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name=BUS_NAME):
+        """Raises FileNotFoundError if no publisher has created the bus."""
+        shm = _attach_shm(name)
+        if bytes(shm.buf[:4]) != cls.MAGIC:
+            shm.close()
+            raise ValueError(f"Shared memory '{name}' is not a WindowsTweak bus")
+        return cls(shm, owner=False)
+
+    def _header(self):
+        return self.HEADER.unpack_from(self.buf)
+
+    def _set(self, fmt, offset, value):
+        struct.pack_into(fmt, self.buf, offset, value)
+
+    # --- Writer ---
+    @instrumented("bus.publish")
+    def publish(self, sample):
+        """Raises ValueError, leaving the bus as it was, if the sample
+        does not fit in a row or its keys do not fit in the schema area."""
+        flat = flatten_sample(sample)
+        if len(flat) > self.capacity:
+            raise ValueError(f"Sample has {len(flat)} values, the bus rows hold {self.capacity}")
+        new = [k for k in flat if k not in self.index]
+        reset = len(self.keys) + len(new) > self.capacity
+        if reset:
+            # Columns are exhausted (e.g. many hot-plugged NICs): start over
+            keys, index = list(flat), {k: i for i, k in enumerate(flat)}
+        elif new:
+            keys = self.keys + new
+            index = {k: i for i, k in enumerate(keys)}
+        else:
+            keys, index = self.keys, self.index
+        schema = None
+        if reset or new:
+            schema = json.dumps(keys, separators=(",", ":")).encode("utf-8")
+            if len(schema) + 4 > BUS_SCHEMA_BYTES:
+                raise ValueError("Telemetry bus key list is larger than the schema area")
+        # Whole rows, so absent keys read back as NaN rather than stale values
+        row = array("d", [float("nan")]) * self.capacity
+        for k, v in flat.items():
+            row[index[k]] = v
+
+        _, _, seq, count, gen, _, _, _, _ = self._header()
+        self._set("<Q", self.SEQ, seq + 1)  # Odd: write in progress
+        try:
+            if schema is not None:
+                struct.pack_into("<I", self.buf, self.HEADER_SIZE, len(schema))
+                self.buf[self.HEADER_SIZE + 4:self.HEADER_SIZE + 4 + len(schema)] = schema
+                self.keys, self.index = keys, index
+                gen += 1
+                if reset:
+                    count = 0
+            self.latest[:] = row
+            start = (count % self.slots) * self.capacity
+            self.ring[start:start + self.capacity] = row
+            struct.pack_into("<QQ", self.buf, self.COUNT, count + 1, gen)
+            self._set("<I", self.NKEYS, len(keys))
+        finally:
+            self._set("<Q", self.SEQ, seq + 2)  # Even: consistent again
+
+    def last_read(self):
+        return self._header()[5]
+
+    # --- Readers ---
+    def _consistent(self, read):
+        """Run `read()` until it saw no concurrent write; None (and `dead`
+        set) if the writer has not finished within BUS_RETRY_S."""
+        deadline = time.monotonic() + BUS_RETRY_S
+        while True:
+            seq = struct.unpack_from("<Q", self.buf, self.SEQ)[0]
+            if not seq & 1:
+                _, _, _, count, gen, _, nkeys, _, _ = self._header()
+                if gen != self.gen:
+                    size, = struct.unpack_from("<I", self.buf, self.HEADER_SIZE)
+                    raw = bytes(self.buf[self.HEADER_SIZE + 4:self.HEADER_SIZE + 4 + size])
+                out = read(count, nkeys)
+                if struct.unpack_from("<Q", self.buf, self.SEQ)[0] == seq:
+                    break
+            if time.monotonic() >= deadline:
+                self.dead = True
+                return None
+            time.sleep(0)
+        self.dead = False
+        if gen != self.gen:
+            self.keys = [tuple(k) for k in json.loads(raw)]
+            self.index = {k: i for i, k in enumerate(self.keys)}
+            self.gen = gen
+        self._set("<d", self.LAST_READ, time.time())  # Publisher's liveness check
+        return count, out
+
+    @instrumented("bus.read")
+    def read(self):
+        """(samples published, latest sample) - the sample is None before the first."""
+        got = self._consistent(lambda count, n: self.latest[:n].tolist())
+        if got is None:
+            return self.last  # Writer stuck mid-write (see `dead`)
+        count, row = got
+        self.last = count, (unflatten_sample(self.keys, row) if count else None)
+        return self.last
+
+    def history(self, key, n=BUS_SLOTS):
+        """Up to `n` newest values of one key (NaN where it was absent), oldest first."""
+        if key not in self.index:
+            self.read()  # Key may be newer than our copy of the schema
+        col = self.index.get(key)
+        if col is None:
+            return []
+
+        def read(count, _):
+            m = min(n, count, self.slots)
+            ring, cap, slots = self.ring, self.capacity, self.slots
+            return [ring[((count - m + i) % slots) * cap + col] for i in range(m)]
+        got = self._consistent(read)
+        return got[1] if got else []
+
+    def close(self):
+        for view in (self.latest, self.ring, self._rows):
+            view.release()
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class BusTelemetry:
+    """TelemetrySampler stand-in that reads the shared-memory bus.
+
+    The sampling, and the GIL time it costs, stays in the publisher
+    process; sample() only copies the latest row out of the segment.
+    """
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.net = NetTelemetry(counters=dict)
+        self.disk = DiskTelemetry(counters=dict)
+        self.count = None
+        self.last = None
+
+    @property
+    def stale(self):
+        return self.bus.dead or self.last is None or \
+            time.time() - self.last["ts"] > BUS_STALE
+
+    @instrumented("telemetry.sample")
+    def sample(self):
+        count, s = self.bus.read()
+        if s is None:
+            raise ValueError("The telemetry bus has not published a sample yet")
+        if count != self.count:  # Graph history only grows with new samples
+            self.count = count
+            self.net.replay(s["net"])
+            self.disk.replay(s["disk_io"], s["partitions"])
+            self.last = s
+        return self.last
+
+    def close(self):
+        self.bus.close()
+
+
+def run_bus(name=BUS_NAME, interval=BUS_INTERVAL, idle_exit=BUS_IDLE_EXIT):
+    """Publisher process: sample telemetry into the bus until no reader has
+    looked at it for `idle_exit` seconds (0 = run until interrupted)."""
+    telemetry = TelemetrySampler()
+    # Rows sized from this machine (160 cores flatten to over 1000 values),
+    # with room for NICs and disks that are not up yet
+    capacity = max(BUS_CAPACITY, 2 * len(flatten_sample(telemetry.sample())))
+    try:
+        bus = TelemetryBus.create(name, capacity=capacity)
+    except FileExistsError:
+        print(f"A telemetry bus '{name}' is already running")
+        return
+    print(f"Publishing telemetry to shared memory '{name}' every {interval:g} s", flush=True)
+    warned = False
+    try:
+        while not idle_exit or time.time() - bus.last_read() < idle_exit:
+            t0 = time.monotonic()
+            try:
+                bus.publish(telemetry.sample())
+            except ValueError as e:  # Skipped: readers see the bus go stale
+                if not warned:
+                    print(f"Telemetry not published: {e}", flush=True)
+                    warned = True
+            time.sleep(max(0.0, interval - (time.monotonic() - t0)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        bus.close()
+
+
+def connect_bus(name=BUS_NAME, spawn=True, timeout=10.0):
+    """Attach to the bus, starting a publisher process if there is none.
+    Returns a TelemetryBus with a fresh sample published."""
+    try:
+        bus = TelemetryBus.attach(name)
+    except FileNotFoundError:
+        if not spawn:
+            raise
+        cmd = [sys.executable] if getattr(sys, "frozen", False) else \
+            [sys.executable, os.path.abspath(__file__)]
+        subprocess.Popen(cmd + ["--bus-serve", "--bus-name", name],
+                         stdout=subprocess.DEVNULL, creationflags=NO_WINDOW)
+        bus = None
+    deadline = time.monotonic() + timeout
+    while True:
+        if bus is None:
+            try:
+                bus = TelemetryBus.attach(name)
+            except FileNotFoundError:
+                pass
+        if bus is not None:
+            count, s = bus.read()
+            if count and time.time() - s["ts"] < BUS_STALE:
+                return bus
+        if time.monotonic() > deadline:
+            if bus:
+                bus.close()
+            raise TimeoutError(f"No telemetry on bus '{name}' after {timeout:g} s")
+        time.sleep(0.1)
+
+
+def watch_bus(name=BUS_NAME):
+    """Print one line per published sample (a minimal bus client)."""
+    bus = connect_bus(name)
+    last = None
+    try:
+        while True:
+            count, s = bus.read()
+            if bus.dead:
+                print("The telemetry bus publisher stopped mid-write", flush=True)
+                break
+            if count != last:
+                last = count
+                net = s["net"].get(NetTelemetry.ALL, {})
+                disk = s["disk_io"].get(DiskTelemetry.ALL, {})
+                print(f"{time.strftime('%H:%M:%S', time.localtime(s['ts']))}  "
+                      f"CPU {s['cpu']:5.1f}%  RAM {s['ram']:5.1f}%  "
+                      f"NET {fmt_rate(net.get('bytes_recv', 0))} down "
+                      f"{fmt_rate(net.get('bytes_sent', 0))} up  "
+                      f"DISK {disk.get('busy', 0):5.1f}% busy", flush=True)
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        bus.close()
+
+
+# ============================================================================
+# METRICS EXPORT (OpenMetrics)
+# ============================================================================
+
+METRICS_PORT = 9188
+METRICS_TOP_N = 10
+
+
+def _om_label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _om_value(value):
+    """OpenMetrics number: NaN/+Inf/-Inf spelled out, NumPy scalars as plain floats."""
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def _om_family(lines, name, help_text, samples, unit=None):
+    """Append one gauge family; `samples` is [(labels dict or None, value)]."""
+    lines.append(f"# TYPE {name} gauge")
+    if unit:
+        lines.append(f"# UNIT {name} {unit}")
+    lines.append(f"# HELP {name} {help_text}")
+    for labels, value in samples:
+        if labels:
+            inner = ",".join(f'{k}="{_om_label(v)}"' for k, v in labels.items())
+            lines.append(f"{name}{{{inner}}} {_om_value(value)}")
+        else:
+            lines.append(f"{name} {_om_value(value)}")
+
+
+def render_openmetrics(sample, snap=None, top=METRICS_TOP_N, alerts=None, own=None):
+    """OpenMetrics text exposition for one telemetry sample (+ top processes)."""
+    lines = []
+    p = "windowstweak_"
+    _om_family(lines, p + "sample_timestamp_seconds", "Time of the last sample.",
+               [(None, sample["ts"])], "seconds")
+    _om_family(lines, p + "cpu_percent", "Total CPU utilisation.", [(None, sample["cpu"])])
+    _om_family(lines, p + "cpu_core_percent", "Per-core CPU utilisation.",
+               [({"core": i}, v) for i, v in enumerate(sample["cpu_cores"])])
+    _om_family(lines, p + "memory_percent", "Physical memory in use.", [(None, sample["ram"])])
+    _om_family(lines, p + "memory_available_bytes", "Physical memory available.",
+               [(None, sample["ram_available"])], "bytes")
+
+    disks = sample["disk_io"].items()
+    _om_family(lines, p + "disk_busy_percent", "Time the disk was busy.",
+               [({"disk": d}, m["busy"]) for d, m in disks])
+    _om_family(lines, p + "disk_read_bytes_per_second", "Disk read throughput.",
+               [({"disk": d}, m["read_bps"]) for d, m in disks])
+    _om_family(lines, p + "disk_write_bytes_per_second", "Disk write throughput.",
+               [({"disk": d}, m["write_bps"]) for d, m in disks])
+    _om_family(lines, p + "disk_latency_seconds", "Average I/O latency.",
+               [({"disk": d}, m["latency_ms"] / 1000) for d, m in disks], "seconds")
+    _om_family(lines, p + "filesystem_used_percent", "Space used per mount point.",
+               [({"mount": mnt}, v) for mnt, v in sample["partitions"].items()])
+
+    nics = sample["net"].items()
+    _om_family(lines, p + "network_receive_bytes_per_second", "Inbound network rate.",
+               [({"interface": n}, m["bytes_recv"]) for n, m in nics])
+    _om_family(lines, p + "network_transmit_bytes_per_second", "Outbound network rate.",
+               [({"interface": n}, m["bytes_sent"]) for n, m in nics])
+
+    if snap is not None and len(snap) and top:
+        rows = range(len(snap))
+        by_cpu = heapq.nlargest(top, rows, key=snap.cpu.__getitem__)
+        by_rss = heapq.nlargest(top, rows, key=snap.rss.__getitem__)
+        _om_family(lines, p + "process_cpu_percent", f"Top {top} processes by CPU.",
+                   [({"pid": snap.pid[i], "name": snap.name[i]}, snap.cpu[i]) for i in by_cpu])
+        _om_family(lines, p + "process_resident_memory_bytes", f"Top {top} processes by RSS.",
+                   [({"pid": snap.pid[i], "name": snap.name[i]}, snap.rss[i]) for i in by_rss],
+                   "bytes")
+
+    if own is not None:
+        _om_family(lines, p + "self_cpu_percent", "CPU used by WindowsTweak itself.",
+                   [(None, own["cpu"])])
+        _om_family(lines, p + "self_resident_memory_bytes", "WindowsTweak's own RSS.",
+                   [(None, own["rss"])], "bytes")
+    if alerts is not None and alerts.rules:
+        _om_family(lines, p + "alert_active", "1 while an alert rule is firing.",
+                   [({"rule": r.name}, int(r.active)) for r in alerts.rules])
+    lines.append("# EOF\n")
+    return "\n".join(lines)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.payload  # Swapped atomically by publish()
+        self.send_response(200)
+        self.send_header("Content-Type", MetricsExporter.CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MetricsExporter:
+    """Serves the latest exposition on /metrics from a daemon thread.
+
+    The text is rendered once per sample in publish(); scrapes only copy
+    bytes. Top processes come from the snapshot handed to publish() or, with
+    a `procs` sampler of its own, are re-sampled every `proc_every` publishes.
+    """
+    CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+    def __init__(self, port=METRICS_PORT, host="127.0.0.1", top=METRICS_TOP_N, proc_every=4,
+                 procs=None):
+        self.server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self.server.daemon_threads = True
+        self.server.payload = b"# EOF\n"
+        self.top = top
+        self.proc_every = proc_every
+        self.procs = procs if top else None
+        self.snap = None
+        self.tick = 0
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       name="metrics-exporter", daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    @instrumented("metrics.publish")
+    def publish(self, sample, alerts=None, own=None, snap=None):
+        if snap is not None:
+            self.snap = snap
+        elif self.procs and self.tick % self.proc_every == 0:
+            self.snap = self.procs.sample()
+        self.tick += 1
+        self.server.payload = render_openmetrics(
+            sample, self.snap, self.top, alerts, own).encode("utf-8")
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def run_headless(port, host, interval=1.5, rules_path=ALERT_RULES_FILE, trace=None,
+                 recorder=None, bus=None, record_history=False):
+    """Sample, evaluate alerts and serve /metrics without a window.
+
+    History is recorded with record_history. With a TracePlayer the samples
+    come from the trace (never recorded to history) and the loop ends with
+    it. With a TelemetryBus they are read from the shared publisher.
+    """
+    if trace:
+        telemetry = trace.telemetry()
+    elif bus:
+        telemetry = BusTelemetry(bus)
+    else:
+        telemetry = TelemetrySampler()
+    alerts = AlertEngine.load(rules_path)
+    history = HistoryStore(None if trace else HISTORY_DIR, recording=record_history)
+    own = SelfMonitor()
+    scheduler = AdaptiveScheduler()
+    # No PROCESSES tab to share with: the exporter samples processes itself
+    latest = ProcessHistory(maxlen=1)
+    exporter = MetricsExporter(port, host, procs=trace.processes(latest) if trace
+                               else ProcessSampler(latest))
+    print(f"Serving {exporter.url} ({len(alerts.rules)} alert rules), Ctrl+C to stop")
+    try:
+        while True:
+            with own.measure():
+                sample = telemetry.sample()
+                if bus and telemetry.stale:
+                    print("Telemetry bus stopped publishing; sampling locally", flush=True)
+                    telemetry.close()
+                    bus, telemetry = None, TelemetrySampler()
+                scheduler.observe(sample["cpu"])
+                metrics = alert_metrics(sample)
+                history.record(sample["ts"], metrics)
+                if recorder:
+                    recorder.system(sample)
+                if alerts.rules:
+                    metrics.update(alerts.probe.sample())
+                    for e in alerts.feed(sample["ts"], metrics):
+                        stamp = time.strftime("%H:%M:%S", time.localtime(e.ts))
+                        print(f"{stamp}  {e.kind:<8} {e.rule.name}  "
+                              f"({e.rule.metric} = {e.value:.2f})", flush=True)
+                exporter.publish(sample, alerts, own.sample())
+                history.record_processes(exporter.snap)
+                if recorder:
+                    recorder.processes(exporter.snap)
+            if trace and trace.finished:
+                print(f"Replay of {trace.path} finished")
+                break
+            if trace and trace.speed <= 0:
+                continue
+            # Same load back-off as the GUI, scaled to the requested interval
+            ms = scheduler.interval(True, True, bool(alerts.active))
+            time.sleep(interval * ms / AdaptiveScheduler.WATCHING_MS)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        exporter.close()
+        history.close()
+        if recorder:
+            recorder.close()
+        if bus:
+            telemetry.close()
+
+
 # ============================================================================
 # AUXILIARY CLASSES AND WORKERS
 # ============================================================================
@@ -348,32 +4313,18 @@ class HoverButton(QPushButton):
         self.setText(tool_data['name'])
         self.setCursor(Qt.PointingHandCursor)
         self.setFixedHeight(45)
+        self.setProperty("tool", True)  # Styled by the global STYLESHEET
         self.update_style(is_installed)
 
     def update_style(self, installed):
-        base_style = f"""
-            QPushButton {{
-                background-color: #1a1a21;
-                color: {THEME['fg_text']};
-                border-radius: 4px;
-                padding-left: 10px;
-                text-align: left;
-                font-size: 10pt;
-            }}
-            QPushButton:hover {{ background-color: #252530; border: 1px solid {THEME['accent']}; }}
-        """
-        border_color = THEME['accent'] if installed else THEME['border']
-        border_width = "4px" if installed else "1px"
-        # Left border indicates installation status
-        extra = f"border: 1px solid {THEME['border']}; border-left: {border_width} solid {border_color};"
-        self.setStyleSheet(base_style + extra)
+        # Left border indicates installation status ([installed="true"] rule);
+        # re-polishing applies it without parsing any CSS
+        self.setProperty("installed", bool(installed))
+        self.style().unpolish(self)
+        self.style().polish(self)
 
     def enterEvent(self, event):
-        self.on_hover.emit(
-            f"<h3 style='color:{THEME['accent']}'>{self.tool_data['name']}</h3>"
-            f"<p style='font-size:13px'>{self.tool_data['desc']}</p>"
-            f"<p style='color:#888; font-size:11px'><i>ID: {self.tool_data['id']} | Type: {self.tool_data.get('type', 'N/A')}</i></p>"
-        )
+        self.on_hover.emit(self.tool_data['html'])  # Built once by the catalog
         super().enterEvent(event)
 
     def leaveEvent(self, event):
@@ -381,26 +4332,101 @@ class HoverButton(QPushButton):
         super().leaveEvent(event)
 
 
+class ToolSection(QWidget):
+    """Collapsible catalog category. Buttons are created by `factory` the
+    first time the section is expanded or scrolled into view; until then
+    the body only reserves its estimated height."""
+    ROW_HEIGHT = 51
+
+    def __init__(self, title, tools, factory, parent=None):
+        super().__init__(parent)
+        self.title = title
+        self.tools = tools
+        self.factory = factory
+        self.built = False
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.header = QPushButton()
+        self.header.setObjectName("section_header")
+        self.header.setCheckable(True)
+        self.header.setChecked(True)
+        self.header.toggled.connect(self.set_expanded)
+        self.body = QWidget()
+        self.grid = QGridLayout(self.body)
+        self.body.setMinimumHeight(self.ROW_HEIGHT * ((len(tools) + 1) // 2))
+        layout.addWidget(self.header)
+        layout.addWidget(self.body)
+        self._update_header()
+
+    def _update_header(self):
+        arrow = "▾" if self.header.isChecked() else "▸"
+        self.header.setText(f"{arrow} {self.title} ({len(self.tools)})")
+
+    def set_expanded(self, on):
+        self.body.setVisible(on)
+        self._update_header()
+        if on:
+            self.ensure_built()
+
+    def ensure_built(self):
+        if self.built or not self.header.isChecked():
+            return
+        self.built = True
+        for i, tool in enumerate(self.tools):
+            self.grid.addWidget(self.factory(tool), i // 2, i % 2)
+        self.body.setMinimumHeight(0)
+
+
 class ModernGraph(QFrame):
-    """Real-time modern graph."""
+    """Real-time modern graph. Extra series share the primary's axis."""
 
-    def __init__(self, label, suffix="%", color="#00ff9d"):
+    def __init__(self, label, suffix="%", color="#00ff9d", fmt=None, autoscale=False):
         super().__init__()
         self.label = label
         self.suffix = suffix
         self.color = QColor(color)
-        self.data = [0] * 60
+        self.fmt = fmt or (lambda v: f"{v}{self.suffix}")
+        self.autoscale = autoscale
+        self.data = deque([0] * TELEMETRY_HISTORY, maxlen=TELEMETRY_HISTORY)
+        self.series = [(label, self.color, self.data)]
         self.current = 0
+        self.caption = None
+        self.nseries = 1
         self.setMinimumHeight(120)
         self.setStyleSheet(
             f"border: 1px solid {THEME['border']}; background: #080808; border-radius: 6px;")
 
-    def update_value(self, val):
+    def configure(self, fmt, autoscale, nseries=1):
+        """Switch what the graph shows; only the first `nseries` are drawn."""
+        self.fmt = fmt
+        self.autoscale = autoscale
+        self.nseries = nseries
+
+    def add_series(self, name, color):
+        data = deque([0] * TELEMETRY_HISTORY, maxlen=TELEMETRY_HISTORY)
+        self.series.append((name, QColor(color), data))
+        self.nseries = len(self.series)
+        return data
+
+    def update_value(self, val, *extra):
+        """Push the primary value (and one value per extra series)."""
         self.current = val
         self.data.append(val)
-        self.data.pop(0)
+        for (_, _, data), v in zip(self.series[1:], extra):
+            data.append(v)
+        self.update()
+
+    def load(self, points):
+        """Replace the history with (primary, extra...) tuples."""
+        for _, _, data in self.series:
+            data.extend([0] * TELEMETRY_HISTORY)
+        for p in points:
+            for (_, _, data), v in zip(self.series, p):
+                data.append(v)
+        self.current = self.data[-1]
         self.update()
 
+    @instrumented("graph.paint")
     def paintEvent(self, event):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing)
@@ -420,30 +4446,380 @@ class ModernGraph(QFrame):
 
         painter.setFont(QFont("Consolas", 20, QFont.Bold))
         painter.setPen(self.color)
-        painter.drawText(15, 60, f"{self.current}{self.suffix}")
+        painter.drawText(15, 60, self.caption or self.fmt(self.current))
 
-        # Line Graph with Fill
-        path_color = QColor(self.color)
-        path_color.setAlpha(50)
-
-        painter.setPen(QPen(self.color, 2))
-        step = w / (len(self.data) - 1) if len(self.data) > 1 else w
         max_val = 100
-        if self.label == "NET":
-            max_val = max(max(self.data), 10)
+        if self.autoscale:
+            max_val = nice_ceiling(max(max(d) for _, _, d in self.series[:self.nseries]))
+            painter.setPen(QColor("#666"))
+            painter.setFont(QFont("Consolas", 9))
+            painter.drawText(w - 110, 16, f"max {self.fmt(max_val)}")
+
+        # One polyline per series, drawn in a single call each
+        for _, color, data in reversed(self.series[:self.nseries]):
+            n = len(data)
+            step = w / (n - 1) if n > 1 else w
+            pts = QPolygonF([QPointF(i * step,
+                                     max(0, min(h, h - (v / max_val * (h - 10)))))
+                             for i, v in enumerate(data)])
+            painter.setPen(QPen(color, 2))
+            painter.drawPolyline(pts)
+
+
+HEATMAP_COLUMNS = 2400  # One hour at the default 1.5 s tick
+HEAT_NO_DATA = 255
+
+
+def heat_color_table():
+    """Indexed8 palette: 0-100 = load gradient, 255 = no data yet."""
+    stops = [(0, (12, 12, 12)), (25, (21, 116, 23)), (60, (235, 179, 49)),
+             (100, (255, 62, 62))]
+    table = []
+    for i in range(256):
+        v = min(i, 100)
+        for (a, ca), (b, cb) in zip(stops, stops[1:]):
+            if v <= b:
+                t = (v - a) / (b - a)
+                table.append(QColor(*(int(x + (y - x) * t) for x, y in zip(ca, cb))).rgb())
+                break
+    table[HEAT_NO_DATA] = QColor("#080808").rgb()
+    return table
+
+
+class LoopLagProbe(QObject):
+    """Event-loop lag: how late a precise 100 ms timer fires, i.e. how long
+    the GUI thread was blocked before it could run."""
+
+    def __init__(self, interval_ms=100, parent=None):
+        super().__init__(parent)
+        self.interval = interval_ms / 1000.0
+        self.hist = PERF.histogram("event_loop.lag")
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self._tick)
+        self.last = 0.0
+
+    def start(self):
+        self.last = time.perf_counter()
+        self.timer.start(int(self.interval * 1000))
+
+    def stop(self):
+        self.timer.stop()
+
+    def _tick(self):
+        now = time.perf_counter()
+        self.hist.add(max(0.0, now - self.last - self.interval))
+        self.last = now
+
+
+class CoreHeatmap(QWidget):
+    """Time x core CPU heatmap.
+
+    Each sample is one scanline of an 8-bit indexed image used as a ring
+    buffer, so pushing a sample is a single row copy and painting is two
+    scaled blits, whatever the core count or history length.
+    """
+
+    def __init__(self, cores, columns=HEATMAP_COLUMNS):
+        super().__init__()
+        self.cores = cores
+        self.columns = columns
+        self.img = QImage(cores, columns, QImage.Format_Indexed8)
+        self.img.setColorTable(heat_color_table())
+        self.img.fill(HEAT_NO_DATA)
+        self.head = 0
+        self.ts = array("d", bytes(8 * columns))
+        self.detail = bytearray(columns * cores * 3)  # user, system, wait
+        self.wait_label = "iowait"
+        self.setMouseTracking(True)
+        self.setMinimumHeight(140)
+
+    def push(self, busy, times=None):
+        """busy: per-core load %; times: cpu_times_percent(percpu=True)."""
+        n = min(len(busy), self.cores)
+        row = self.head
+        ptr = self.img.scanLine(row)
+        ptr.setsize(self.img.bytesPerLine())
+        ptr[0:n] = bytes(max(0, min(100, int(v))) for v in busy[:n])
+        self.ts[row] = time.time()
+        if times:
+            first = times[0]
+            if not hasattr(first, "iowait"):
+                self.wait_label = "irq"
+            base = row * self.cores * 3
+            cells = []
+            for t in times[:n]:
+                wait = getattr(t, "iowait", None)
+                if wait is None:
+                    wait = getattr(t, "interrupt", 0) + getattr(t, "dpc", 0)
+                cells += (min(255, int(t.user)), min(255, int(t.system)), min(255, int(wait)))
+            self.detail[base:base + len(cells)] = bytes(cells)
+        self.head = (row + 1) % self.columns
+        self.update()
+
+    @instrumented("heatmap.paint")
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        w, h = self.width(), self.height()
+        sx, sy = w / self.columns, h / self.cores
+        # Image rows are samples; map row -> x and pixel column (core) -> y.
+        # Oldest rows [head, end) go left, newest [0, head) right.
+        split = self.columns - self.head
+        for start, length, x_off in ((self.head, split, 0.0),
+                                     (0, self.head, split * sx)):
+            if length:
+                painter.setTransform(QTransform(0, sy, sx, 0, x_off, 0))
+                painter.drawImage(QPointF(0, 0), self.img,
+                                  QRectF(0, start, self.cores, length))
+        painter.resetTransform()
+        painter.setPen(QColor("white"))
+        painter.setFont(QFont("Consolas", 10, QFont.Bold))
+        painter.drawText(8, 16, f"PER-CORE CPU ({self.cores} cores)")
+
+    def mouseMoveEvent(self, event):
+        col = int(event.x() * self.columns / max(1, self.width()))
+        core = int(event.y() * self.cores / max(1, self.height()))
+        row = (self.head + col) % self.columns
+        if not (0 <= core < self.cores) or not self.ts[row]:
+            QToolTip.hideText()
+            return
+        load = self.img.pixelIndex(core, row)
+        base = (row * self.cores + core) * 3
+        user, system, wait = self.detail[base:base + 3]
+        when = datetime.datetime.fromtimestamp(self.ts[row]).strftime("%H:%M:%S")
+        QToolTip.showText(event.globalPos(),
+                          f"Core {core} @ {when}: {load}%\n"
+                          f"user {user}%  system {system}%  {self.wait_label} {wait}%", self)
+
+
+class ProcessTableModel(QAbstractTableModel):
+    """Virtual process table over a columnar ProcessSnapshot.
+
+    The view only requests visible cells, so cost scales with the viewport,
+    not the process count. Sorting permutes row indices by column keys.
+    """
+    # (header, initial width, sort key)
+    COLUMNS = [("PID", 70, "pid"), ("Name", 220, "name"), ("CPU %", 70, "cpu"),
+               ("CPU Trend", 170, "cpu"), ("Memory (MB)", 100, "rss"),
+               ("Δ MB", 80, "rss_delta"), ("Mem Trend", 170, "rss"),
+               ("I/O (KB/s)", 90, "io"), ("Status", 90, "status")]
+    NUMERIC = {0, 2, 4, 5, 7}
+
+    def __init__(self, history=None):
+        super().__init__()
+        self.history = history
+        self.snap = ProcessSnapshot()
+        self.rows = []          # Visible snapshot row indices, in display order
+        self._pos = None        # pid -> display row, built on demand
+        self.filter_fn = None
+        self.sort_col = 2
+        self.sort_order = Qt.DescendingOrder
+
+    # --- Qt model interface ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section][0]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        col = index.column()
+        if role == Qt.DisplayRole:
+            return self._render(self.rows[index.row()], col)
+        if role == Qt.TextAlignmentRole and col in self.NUMERIC:
+            return Qt.AlignRight | Qt.AlignVCenter
+        return None
+
+    def _render(self, i, col):
+        s = self.snap
+        if col == 0:
+            return s.pid[i]
+        if col == 1:
+            return s.name[i]
+        if col == 2:
+            return f"{s.cpu[i]:.1f}"
+        if col == 3:
+            return sparkline(self.history.cpu_history(s.pid[i])[-20:], hi=100) if self.history else ""
+        if col == 4:
+            return f"{s.rss[i] / 1048576:.1f}"
+        if col == 5:
+            return f"{s.rss_delta[i] / 1048576:+.2f}"
+        if col == 6:
+            return sparkline(self.history.rss_history(s.pid[i])[-20:]) if self.history else ""
+        if col == 7:
+            return f"{(s.read_bps[i] + s.write_bps[i]) / 1024:.1f}"
+        return s.status[i]
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sort_col, self.sort_order = column, order
+        self.layoutAboutToBeChanged.emit()
+        old = self.persistentIndexList()
+        old_pids = [self.pid_at(ix.row()) for ix in old]
+        self._sort(self.snap, self.rows)
+        if old:
+            self.changePersistentIndexList(
+                old, [self.index(self.row_of(p), ix.column()) for ix, p in zip(old, old_pids)])
+        self.layoutChanged.emit()
+
+    # --- Data updates ---
+    def _sort(self, snap, rows):
+        key = self.COLUMNS[self.sort_col][2]
+        if key == "io":
+            keys = [r + w for r, w in zip(snap.read_bps, snap.write_bps)]
+        elif key == "name":
+            keys = [n.lower() for n in snap.name]
+        else:
+            keys = getattr(snap, key)
+        rows.sort(key=keys.__getitem__,
+                  reverse=self.sort_order == Qt.DescendingOrder)
+        self._pos = None
+
+    def _visible(self, snap):
+        fn = self.filter_fn
+        rows = list(range(len(snap))) if fn is None else fn(snap)
+        self._sort(snap, rows)
+        return rows
+
+    @instrumented("processes.model")
+    def set_snapshot(self, snap):
+        """Swap in a new sample. Returns True if the model had to be reset."""
+        rows = self._visible(snap)
+        old_pid, new_pid = self.snap.pid, snap.pid
+        if rows and len(rows) == len(self.rows) and \
+                all(old_pid[a] == new_pid[b] for a, b in zip(self.rows, rows)):
+            # Same processes in the same order: just repaint the visible cells
+            self.snap, self.rows = snap, rows
+            self.dataChanged.emit(self.index(0, 0),
+                                  self.index(len(rows) - 1, len(self.COLUMNS) - 1))
+            return False
+        self.beginResetModel()
+        self.snap, self.rows = snap, rows
+        self.endResetModel()
+        return True
+
+    def set_filter(self, fn):
+        """`fn(snapshot) -> [row indices]`, or None to show everything."""
+        self.beginResetModel()
+        self.filter_fn = fn
+        self.rows = self._visible(self.snap)
+        self.endResetModel()
+
+    def remove_pids(self, pids):
+        """Drop rows in place (e.g. after a kill) without waiting for a rescan."""
+        drop = sorted((r for r in map(self.row_of, pids) if r >= 0), reverse=True)
+        while drop:
+            last = first = drop.pop(0)
+            while drop and drop[0] == first - 1:
+                first = drop.pop(0)
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.rows[first:last + 1]
+            self.endRemoveRows()
+        self._pos = None
+
+    def set_status(self, pids, status):
+        col = len(self.COLUMNS) - 1
+        index = self.snap.index()
+        for pid in pids:
+            row = self.row_of(pid)
+            if row >= 0:
+                self.snap.set("status", index[pid], status)
+                ix = self.index(row, col)
+                self.dataChanged.emit(ix, ix)
+
+    def pid_at(self, row):
+        return self.snap.pid[self.rows[row]]
+
+    def row_of(self, pid):
+        if self._pos is None:
+            pid_col = self.snap.pid
+            self._pos = {pid_col[r]: k for k, r in enumerate(self.rows)}
+        return self._pos.get(pid, -1)
+
+
+class ConnectionTableModel(QAbstractTableModel):
+    """Socket table updated by diffs: rows are inserted, removed or
+    changed individually, never reset, so views keep scroll and selection."""
+    HEADERS = ["Process", "PID", "Proto", "Local Address", "Remote Address", "Status"]
+    FRESH_POLLS = 3  # New rows stay highlighted this many polls
+
+    def __init__(self, tracker):
+        super().__init__()
+        self.tracker = tracker
+        self.rows = []   # [record, key, poll number first seen]
+        self.pos = {}    # key -> row
+        self.poll_no = 0
+        self.fresh = set()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
 
-        prev_x, prev_y = 0, h
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
 
-        # Draw lines
-        for i in range(len(self.data)):
-            val = self.data[i]
-            x = int(i * step)
-            y = int(h - (val / max_val * (h - 10)))  # Bottom margin
-            y = max(0, min(h, y))
+    def data(self, index, role=Qt.DisplayRole):
+        rec, key, born = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            return rec[index.column()]
+        if role == Qt.BackgroundRole and self.poll_no - born < self.FRESH_POLLS:
+            return QBrush(QColor(THEME['accent_low']))
+        return None
 
-            if i > 0:
-                painter.drawLine(prev_x, prev_y, x, y)
-            prev_x, prev_y = x, y
+    def _row_changed(self, row):
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+
+    def refresh(self):
+        added, removed, changed = self.tracker.poll()
+        self.poll_no += 1
+        first_poll = self.poll_no == 1
+
+        # Removals, highest rows first so lower indices stay valid
+        drop = sorted((self.pos[k] for k in removed if k in self.pos), reverse=True)
+        while drop:
+            last = first = drop.pop(0)
+            while drop and drop[0] == first - 1:
+                first = drop.pop(0)
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.rows[first:last + 1]
+            self.endRemoveRows()
+        if removed:
+            self.pos = {row[1]: i for i, row in enumerate(self.rows)}
+
+        for key, status in changed:
+            row = self.pos.get(key)
+            if row is not None:
+                self.rows[row][0][5] = status
+                self._row_changed(row)
+
+        # Expire highlights
+        expired = {k for k in self.fresh if k not in self.pos
+                   or self.poll_no - self.rows[self.pos[k]][2] >= self.FRESH_POLLS}
+        for k in expired:
+            if k in self.pos:
+                self._row_changed(self.pos[k])
+        self.fresh -= expired
+
+        if added:
+            start = len(self.rows)
+            # The initial listing is not "new" and shouldn't light up
+            born = -self.FRESH_POLLS if first_poll else self.poll_no
+            self.beginInsertRows(QModelIndex(), start, start + len(added) - 1)
+            for i, (key, status) in enumerate(added, start):
+                self.rows.append([self.tracker.record(key, status), key, born])
+                self.pos[key] = i
+            self.endInsertRows()
+            if not first_poll:
+                self.fresh.update(k for k, _ in added)
+        return len(added), len(removed), len(changed)
 
 
 class DownloadWorker(QThread):
@@ -453,10 +4829,11 @@ class DownloadWorker(QThread):
     finished = pyqtSignal(str)
     error = pyqtSignal(str)
 
-    def __init__(self, tool, dest_folder):
+    def __init__(self, tool, dest_folder, update=False):
         super().__init__()
         self.tool = tool
         self.dest_folder = dest_folder
+        self.update = update  # Re-download even if installed
 
     def find_executable(self, search_path, exe_name):
         if os.path.isfile(os.path.join(search_path, exe_name)):
@@ -479,7 +4856,7 @@ class DownloadWorker(QThread):
         os.makedirs(tool_dir, exist_ok=True)
 
         # 1. Check existence
-        existing = self.find_executable(tool_dir, target_exe)
+        existing = None if self.update else self.find_executable(tool_dir, target_exe)
         if existing:
             self.log.emit(f"Launching {tool['name']} (Cache)...", "INFO")
             self.finished.emit(existing)
@@ -517,8 +4894,11 @@ class DownloadWorker(QThread):
             self.log.emit("Extracting/Installing...", "INFO")
             if tool['type'] == 'zip':
                 try:
-                    with zipfile.ZipFile(temp_file, 'r') as z:
-                        z.extractall(tool_dir)
+                    stats = delta_extract(temp_file, tool_dir)
+                    self.log.emit(
+                        f"{stats.added} new, {stats.changed} changed, {stats.removed} removed, "
+                        f"{stats.unchanged} unchanged ({stats.written / 1048576:.1f} MB written)",
+                        "INFO")
                 except zipfile.BadZipFile:
                     self.error.emit("Corrupt ZIP file.")
                     return
@@ -550,17 +4930,26 @@ class SystemWorker(QThread):
     """Consolidated Worker for System Tasks (CMD and Python)."""
     log = pyqtSignal(str, str)  # Msg, Type
     progress = pyqtSignal(int)
+    task_done = pyqtSignal(str, float, bool)  # Task id, seconds not paused, ok
 
-    def __init__(self, tasks):
+    def __init__(self, tasks, profile=None, gated=False):
         super().__init__()
         self.tasks = tasks
+        self.profile = profile
+        self.gated = gated  # Scheduled run: heavy tasks pause under load
+        self.ctl = TaskControl()
+        self.current = None
+        self.started = time.time()
 
     def run(self):
         sys_encoding = locale.getpreferredencoding()
         total = len(self.tasks)
 
         for i, task in enumerate(self.tasks):
+            self.current = task
+            self.ctl.checkpoint()
             self.log.emit(f"Task {i+1}/{total}: {task['name']}", "INFO")
+            t0, paused0, ok = time.monotonic(), self.ctl.paused_total, False
 
             try:
                 if task['type'] == 'cmd':
@@ -570,7 +4959,7 @@ class SystemWorker(QThread):
                     startupinfo = subprocess.STARTUPINFO()
                     startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
 
-                    process = subprocess.Popen(
+                    process = self.ctl.spawn(
                         task['cmd'], shell=True,
                         stdout=subprocess.PIPE, stderr=subprocess.PIPE,
                         stdin=subprocess.DEVNULL, text=True,
@@ -591,7 +4980,8 @@ class SystemWorker(QThread):
                                     self.progress.emit(int(match.group(1)))
                                 self.log.emit(clean, "PROCESS")
 
-                    if process.returncode == 0:
+                    ok = process.returncode == 0
+                    if ok:
                         self.log.emit("Task finished successfully.", "SUCCESS")
                     else:
                         err = process.stderr.read()
@@ -600,79 +4990,135 @@ class SystemWorker(QThread):
                 elif task['type'] == 'py':
                     self.progress.emit(-1)
                     # Pass lambda compatible with (msg, type)
-                    task['func'](lambda m, t="PROCESS": self.log.emit(m, t))
+                    task['func'](lambda m, t="PROCESS": self.log.emit(m, t), self.ctl)
                     self.log.emit("Script finished.", "SUCCESS")
+                    ok = True
 
             except Exception as e:
                 self.log.emit(f"CRITICAL ERROR: {e}", "ERROR")
 
+            elapsed = time.monotonic() - t0 - (self.ctl.paused_total - paused0)
+            self.task_done.emit(task['id'], elapsed, ok)
             self.log.emit("-" * 30, "INFO")
+        self.current = None
 
         self.progress.emit(100)
         self.log.emit("Maintenance completed.", "SUCCESS")
 
 
+class ProcessActionWorker(QThread):
+    """Bulk kill/suspend/resume off the GUI thread."""
+    done = pyqtSignal(str, object, object)  # action, ok pids, {pid: error}
+
+    def __init__(self, pids, action, tree=False):
+        super().__init__()
+        self.pids = pids
+        self.action = action
+        self.tree = tree
+
+    def run(self):
+        ok, failures = signal_processes(self.pids, self.action, self.tree)
+        self.done.emit(self.action, ok, failures)
+
+
+class WifiWorker(QThread):
+    """Reveals saved WLAN keys, querying profiles through a bounded pool."""
+    profile_ready = pyqtSignal(str, str)  # SSID, key
+    scan_done = pyqtSignal(int, str)      # Profile count, error
+
+    def __init__(self, runner=run_command, max_workers=8):
+        super().__init__()
+        self.runner = runner
+        self.max_workers = max_workers
+
+    def run(self):
+        try:
+            profiles = parse_wlan_profiles(self.runner(WLAN_LIST_CMD))
+        except Exception as e:
+            self.scan_done.emit(0, str(e))
+            return
+        if profiles:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(profiles))) as pool:
+                futures = {pool.submit(self.runner, WLAN_KEY_CMD.format(name=p)): p
+                           for p in profiles}
+                for fut in as_completed(futures):
+                    try:
+                        key = parse_wlan_key(fut.result())
+                    except Exception:
+                        continue
+                    self.profile_ready.emit(futures[fut], key)
+        self.scan_done.emit(len(profiles), "")
+
+
+class DnsWorker(QThread):
+    """Applies a DNS preset to all active adapters at once."""
+    log = pyqtSignal(str, str)
+    done = pyqtSignal(object)  # Failed interfaces
+
+    def __init__(self, interfaces, servers):
+        super().__init__()
+        self.interfaces = interfaces
+        self.servers = servers
+
+    def run(self):
+        failed = asyncio.run(apply_dns(AsyncCommandRunner(), self.interfaces,
+                                       self.servers, self.log.emit))
+        self.done.emit(failed)
+
+
+class DnsBenchWorker(QThread):
+    """Ranks candidate resolvers by query latency."""
+    done = pyqtSignal(object)
+
+    def __init__(self, servers):
+        super().__init__()
+        self.servers = servers
+
+    def run(self):
+        self.done.emit(benchmark_resolvers(self.servers))
+
+
 class HardwareWorker(QThread):
     """Hardware and Battery Scan."""
     info_ready = pyqtSignal(str)
+    inventory_ready = pyqtSignal(dict)
+
+    def __init__(self, inventory, force=False):
+        super().__init__()
+        self.inventory = inventory
+        self.force = force
 
     def run(self):
-        lines = []
         try:
-            lines.append("=== OPERATING SYSTEM ===")
-            lines.append(
-                f"OS: {platform.system()} {platform.release()} ({platform.version()})")
-            lines.append(f"Hostname: {platform.node()}")
-            lines.append(f"Arch: {platform.machine()}")
-
-            lines.append("\n=== PROCESSOR ===")
-            lines.append(f"CPU: {platform.processor()}")
-            lines.append(
-                f"Cores: {psutil.cpu_count(logical=False)} Physical / {psutil.cpu_count(logical=True)} Logical")
-            lines.append(f"Frequency: {psutil.cpu_freq().current:.2f} Mhz")
-
-            lines.append("\n=== MEMORY (RAM) ===")
-            mem = psutil.virtual_memory()
-            lines.append(f"Total: {mem.total / (1024**3):.2f} GB")
-            lines.append(f"Used: {mem.percent}%")
-            lines.append(f"Available: {mem.available / (1024**3):.2f} GB")
-
-            # Battery
-            if hasattr(psutil, "sensors_battery"):
-                batt = psutil.sensors_battery()
-                if batt:
-                    lines.append("\n=== BATTERY ===")
-                    lines.append(f"Charge: {batt.percent}%")
-                    lines.append(
-                        f"Status: {'Charging' if batt.power_plugged else 'Discharging'}")
-                    if batt.secsleft != psutil.POWER_TIME_UNLIMITED:
-                        m, s = divmod(batt.secsleft, 60)
-                        h, m = divmod(m, 60)
-                        lines.append(f"Time remaining: {h}h {m}m")
-
-            if HAS_WMI:
-                try:
-                    c = wmi.WMI()
-                    lines.append("\n=== GPU & VIDEO ===")
-                    for gpu in c.Win32_VideoController():
-                        lines.append(f"- {gpu.Name}")
-                        lines.append(f"  Driver: {gpu.DriverVersion}")
-                        lines.append(
-                            f"  Resolution: {gpu.CurrentHorizontalResolution}x{gpu.CurrentVerticalResolution}")
-
-                    lines.append("\n=== BIOS & BOARD ===")
-                    for board in c.Win32_BaseBoard():
-                        lines.append(
-                            f"Board: {board.Manufacturer} {board.Product}")
-                    for bios in c.Win32_BIOS():
-                        lines.append(
-                            f"BIOS: {bios.Manufacturer} v{bios.Version}")
-                except:
-                    lines.append("\n[!] WMI Query Error.")
+            inv = self.inventory.collect(force=self.force)
         except Exception as e:
-            lines.append(f"\nScan Error: {e}")
+            self.info_ready.emit(f"Scan Error: {e}")
+            return
+        self.inventory_ready.emit(inv)
+        self.info_ready.emit(format_inventory(inv))
+
+
+class HistoryExportWorker(QThread):
+    """Streams a history range to a file off the GUI thread."""
+    done = pyqtSignal(bool, str)
+
+    def __init__(self, store, kind, path, start=None, end=None):
+        super().__init__()
+        self.store = store
+        self.kind = kind
+        self.path = path
+        self.start_ts = start
+        self.end_ts = end
+
+    def run(self):
+        try:
+            rows = export_history(self.store, self.kind, self.path,
+                                  self.start_ts, self.end_ts)
+        except (OSError, ValueError) as e:
+            self.done.emit(False, f"Export failed: {e}")
+            return
+        self.done.emit(True, f"Exported {rows} {self.kind} rows to {self.path}")
 
-        self.info_ready.emit("\n".join(lines))
 
 # ============================================================================
 # MAIN WINDOW
@@ -680,19 +5126,83 @@ class HardwareWorker(QThread):
 
 
 class UltimateMainWindow(QMainWindow):
-    def __init__(self):
+    MAINT_MIN_PAUSE = 30.0  # Seconds a paused maintenance task stays paused
+    HOUSEKEEPING_MS = 60000  # Worker reaping, RSS budget check, allocation report
+    FILTER_DEBOUNCE_MS = 150
+    PROC_EVERY = 4  # Ticks between process samples while the PROCESSES tab is hidden
+    IDLE_SAMPLE_EVERY = 10  # Ticks between telemetry samples nothing is waiting for
+    LEAK_COLUMNS = ("Process", "PID", "Handles", "Handles/h", "Threads", "Threads/h",
+                    "Files", "Handle trend")
+
+    def __init__(self, metrics_port=None, metrics_host="127.0.0.1", diagnostics=False,
+                 catalog_path=None, lazy_tabs=True, memory_mb=None, trace=None, recorder=None,
+                 bus=None, record_history=False):
         super().__init__()
-        self.setWindowTitle("WindowsTweak - MAINTENANCE SUITE")
+        self.setWindowTitle("WindowsTweak - MAINTENANCE SUITE" +
+                            (f" - REPLAY {os.path.basename(trace.path)}" if trace else ""))
         self.setWindowIcon(QIcon("icon.ico"))
         self.resize(1300, 850)
         self.base_path = os.path.join(os.getcwd(), "DeckTools")
-
-        self.init_ui()
-
-        # Global Timer
+        self.hw_inventory = HardwareInventory(WmiProvider() if HAS_WMI else None)
+        self.catalog_path = catalog_path
+        self.hw_last = None
+        self.metrics_port = metrics_port or METRICS_PORT
+        self.metrics_host = metrics_host
+        self.exporter = None
+        # A replay (TracePlayer) stands in for the samplers and is not recorded
+        self.trace = trace
+        self.recorder = recorder
+        self.replay_done = False
+        self.bus = None if trace else bus  # TelemetryBus to read instead of sampling
+        self.history = HistoryStore(None if trace else HISTORY_DIR, recording=False)
+        self.export_worker = None
+        self.scheduler = AdaptiveScheduler()
+        self.self_mon = SelfMonitor()
+        self.budget = MemoryBudget(memory_mb)
+        # One process sampler for the PROCESSES tab, /metrics, history and traces
+        history = ProcessHistory(self.budget.proc_history)
+        self.proc_sampler = trace.processes(history) if trace else ProcessSampler(history)
+        self.proc_snap = None
+        self.tick = 0
+        self.alloc = AllocationTracker(self.budget.alloc_reports)
+        self.over_budget = False
+        self.downloads = []  # Running DownloadWorkers; reaped by housekeeping()
+
+        # Global Timer. The current tab's periodic work is connected to it
+        # only while that tab is shown (see on_tab_changed).
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_monitor)
-        self.timer.start(1500)
+        self.housekeeping_timer = QTimer()
+        self.housekeeping_timer.timeout.connect(self.housekeeping)
+        self.tab_tick = None
+        self.tray = None
+        self.maint_worker = None
+        self.maint_slot = None
+
+        self.init_ui()
+        self.load_maintenance()
+        self.load_leak_watch()
+        if not lazy_tabs:
+            for widget in list(self.tab_builders):
+                if widget is not self.tab_diag:
+                    self.tab_builders.pop(widget)()
+        # Nothing below is needed for the first frame
+        QTimer.singleShot(0, lambda: self.start_background(metrics_port, diagnostics,
+                                                           record_history))
+
+    def start_background(self, metrics_port, diagnostics, record_history=False):
+        if QSystemTrayIcon.isSystemTrayAvailable():
+            self.tray = QSystemTrayIcon(
+                self.style().standardIcon(QStyle.SP_ComputerIcon), self)
+            self.tray.show()
+        self.timer.start(AdaptiveScheduler.WATCHING_MS)
+        self.housekeeping_timer.start(self.HOUSEKEEPING_MS)
+        if metrics_port:
+            self.chk_metrics.setChecked(True)
+        if record_history and not self.trace:
+            self.chk_history.setChecked(True)
+        if diagnostics:
+            self.toggle_diagnostics()
 
     def init_ui(self):
         main = QWidget()
@@ -705,8 +5215,14 @@ class UltimateMainWindow(QMainWindow):
         header = QHBoxLayout()
         header.addWidget(QLabel(f"<b>HOST:</b> {platform.node()}"))
         header.addStretch()
-
-        is_admin = ctypes.windll.shell32.IsUserAnAdmin()
+        self.lbl_self = QLabel()
+        self.lbl_self.setStyleSheet("color: #888;")
+        self.lbl_self.setToolTip("WindowsTweak's own CPU and memory, share of wall time "
+                                 "spent in periodic work, and the current sampling interval")
+        header.addWidget(self.lbl_self)
+
+        windll = getattr(ctypes, "windll", None)  # Absent off Windows (bench/soak runs)
+        is_admin = bool(windll and windll.shell32.IsUserAnAdmin())
         lbl = QLabel(" ADMINISTRATOR " if is_admin else " LIMITED USER ")
         lbl.setStyleSheet(
             f"background: {'#004d2f' if is_admin else '#330000'}; color: white; border-radius: 4px; padding: 4px; font-weight: bold;")
@@ -722,18 +5238,27 @@ class UltimateMainWindow(QMainWindow):
         self.tab_repair = QWidget()
         self.tab_process = QWidget()
         self.tab_info = QWidget()
+        self.tab_conn = QWidget()
+        self.tab_diag = QWidget()  # Hidden until Ctrl+Shift+D
 
         self.tabs.addTab(self.tab_monitor, "📊 MONITOR")
         self.tabs.addTab(self.tab_tools, "🛠 TOOLS")
         self.tabs.addTab(self.tab_repair, "🔧 REPAIR")
         self.tabs.addTab(self.tab_process, "⚙ PROCESSES")
         self.tabs.addTab(self.tab_info, "ℹ HARDWARE")
-
-        self.setup_monitor()
-        self.setup_tools()
-        self.setup_repair()
-        self.setup_process()
-        self.setup_info()
+        self.tabs.addTab(self.tab_conn, "🔌 CONNECTIONS")
+
+        # Each tab builds its widgets and workers on first activation
+        self.tab_builders = {
+            self.tab_monitor: self.setup_monitor,
+            self.tab_tools: self.setup_tools,
+            self.tab_repair: self.setup_repair,
+            self.tab_process: self.setup_process,
+            self.tab_info: self.setup_info,
+            self.tab_conn: self.setup_connections,
+            self.tab_diag: self.setup_diagnostics,
+        }
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self, self.toggle_diagnostics)
 
         # CONSOLE
         grp_console = QGroupBox("ACTIVITY LOG")
@@ -742,6 +5267,8 @@ class UltimateMainWindow(QMainWindow):
 
         self.console = QTextEdit()
         self.console.setReadOnly(True)
+        # Oldest lines are dropped once the budget's line count is reached
+        self.console.document().setMaximumBlockCount(self.budget.console_lines)
         self.console.setStyleSheet(
             "background: #000; border: none; font-family: Consolas; font-size: 10pt;")
 
@@ -755,8 +5282,32 @@ class UltimateMainWindow(QMainWindow):
 
         self.log_msg(
             "System initialized. Welcome to WindowsTweak", "INFO")
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+        self.on_tab_changed()
+
+    def on_tab_changed(self, *_):
+        """Build the shown tab if needed and move the timer hook to it.
+
+        The timer calls the tab's refresh plainly (throttled); switching to
+        the tab forces one.
+        """
+        widget = self.tabs.currentWidget()
+        builder = self.tab_builders.pop(widget, None)
+        if builder:
+            with PERF.span("ui.build_tab"):
+                builder()
+        tick = {self.tab_process: self.refresh_processes,
+                self.tab_conn: self.refresh_connections,
+                self.tab_diag: self.refresh_diagnostics}.get(widget)
+        if self.tab_tick:
+            self.timer.timeout.disconnect(self.tab_tick)
+        self.tab_tick = tick
+        if tick:
+            self.timer.timeout.connect(tick)
+            QTimer.singleShot(0, lambda: tick(force=True))  # Fresh data now, not a tick later
 
     # --- LOGGER ---
+    @instrumented("ui.log_msg")
     def log_msg(self, msg, mtype="INFO"):
         colors = {
             "INFO": "#e0e0e0", "CMD": "#00d4ff", "SUCCESS": "#00ff9d",
@@ -779,25 +5330,382 @@ class UltimateMainWindow(QMainWindow):
     # --- TAB 1: MONITOR ---
     def setup_monitor(self):
         layout = QGridLayout(self.tab_monitor)
+        if self.trace:
+            self.telemetry = self.trace.telemetry()
+        elif self.bus:
+            self.telemetry = BusTelemetry(self.bus)
+        else:
+            self.telemetry = TelemetrySampler()
         self.g_cpu = ModernGraph("CPU", "%", "#ff3e3e")
         self.g_ram = ModernGraph("RAM", "%", "#ffcc00")
         self.g_disk = ModernGraph("DISK", "%", "#00ff9d")
-        self.g_net = ModernGraph("NET", " KB/s", "#00d4ff")
+        self.g_disk.add_series("WRITE", "#ff8c00")
+        self.g_net = ModernGraph("NET", color="#00d4ff", fmt=fmt_rate, autoscale=True)
+        self.g_net.add_series("UP", "#ff8c00")
 
         layout.addWidget(self.g_cpu, 0, 0)
         layout.addWidget(self.g_ram, 0, 1)
         layout.addWidget(self.g_disk, 1, 0)
         layout.addWidget(self.g_net, 1, 1)
 
+        net_bar = QHBoxLayout()
+        self.combo_nic = QComboBox()
+        self.combo_nic.addItem(NetTelemetry.ALL)
+        self.combo_nic.currentTextChanged.connect(self.select_nic)
+        self.lbl_net = QLabel()
+        self.lbl_net.setStyleSheet("color: #888;")
+        net_bar.addWidget(QLabel("Interface:"))
+        net_bar.addWidget(self.combo_nic)
+        net_bar.addWidget(self.lbl_net, 1)
+        layout.addLayout(net_bar, 2, 0, 1, 2)
+
+        self.heatmap = CoreHeatmap(psutil.cpu_count() or 1, self.budget.heatmap_columns)
+        layout.addWidget(self.heatmap, 4, 0, 1, 2)
+
+        disk_bar = QHBoxLayout()
+        self.combo_disk = QComboBox()
+        self.combo_disk.addItem(DiskTelemetry.ALL)
+        self.combo_disk_metric = QComboBox()
+        self.combo_disk_metric.addItems(list(self.DISK_VIEWS))
+        self.combo_disk.currentTextChanged.connect(self.select_disk_view)
+        self.combo_disk_metric.currentTextChanged.connect(self.select_disk_view)
+        self.lbl_disk = QLabel()
+        self.lbl_disk.setStyleSheet("color: #888;")
+        disk_bar.addWidget(QLabel("Disk:"))
+        disk_bar.addWidget(self.combo_disk)
+        disk_bar.addWidget(self.combo_disk_metric)
+        disk_bar.addWidget(self.lbl_disk, 1)
+        layout.addLayout(disk_bar, 3, 0, 1, 2)
+        layout.setRowStretch(0, 2)
+        layout.setRowStretch(1, 2)
+        layout.setRowStretch(4, 1)
+        self.select_disk_view()
+
+        alert_bar = QHBoxLayout()
+        self.lbl_alerts = QLabel()
+        self.lbl_alerts.setStyleSheet("color: #888;")
+        btn_edit = QPushButton("EDIT RULES")
+        btn_edit.clicked.connect(self.edit_alert_rules)
+        btn_reload = QPushButton("RELOAD")
+        btn_reload.clicked.connect(self.load_alert_rules)
+        btn_export = QPushButton("EXPORT HISTORY")
+        export_menu = QMenu(btn_export)
+        for kind in HistoryStore.KINDS:
+            sub = export_menu.addMenu(kind.capitalize())
+            for label, since in self.EXPORT_RANGES:
+                sub.addAction(label, lambda k=kind, s=since: self.export_history(k, s))
+        btn_export.setMenu(export_menu)
+        self.chk_metrics = QCheckBox(f"Serve /metrics :{self.metrics_port}")
+        self.chk_metrics.toggled.connect(self.toggle_exporter)
+        self.chk_history = QCheckBox("Record history")
+        self.chk_history.setToolTip(f"Telemetry and the top {HISTORY_TOP_PROCS} processes by "
+                                    f"CPU and by RAM to {HISTORY_DIR} "
+                                    f"({HISTORY_RETENTION_DAYS} days, {HISTORY_MAX_MB} MB max)")
+        self.chk_history.setEnabled(not self.trace)  # Replays are never recorded
+        self.chk_history.toggled.connect(self.toggle_history)
+        alert_bar.addWidget(self.lbl_alerts, 1)
+        alert_bar.addWidget(self.chk_history)
+        alert_bar.addWidget(self.chk_metrics)
+        alert_bar.addWidget(btn_edit)
+        alert_bar.addWidget(btn_reload)
+        alert_bar.addWidget(btn_export)
+        layout.addLayout(alert_bar, 5, 0, 1, 2)
+        self.load_alert_rules()
+
+    @instrumented("ui.update_monitor")
     def update_monitor(self):
-        if self.tabs.currentIndex() != 0:
+        # Telemetry is sampled every tick only while something uses it: the
+        # MONITOR graphs, alerts, history, /metrics, a trace or a running
+        # maintenance task. Otherwise every IDLE_SAMPLE_EVERY ticks, which
+        # is enough for the maintenance load profile and due schedules.
+        with self.self_mon.measure():
+            tick, self.tick = self.tick, self.tick + 1
+            if self.tabs.currentWidget() is self.tab_monitor or self.telemetry_wanted() \
+                    or tick % self.IDLE_SAMPLE_EVERY == 0:
+                self.sample_telemetry(tick)
+            if not self.trace:  # Acts on this machine, not on what a trace shows
+                self.leak_tick(time.time())
+        self.update_self_meter()
+
+    def telemetry_wanted(self):
+        running = self.maint_worker is not None and self.maint_worker.isRunning()
+        return bool(self.trace or self.recorder or self.exporter or self.history.recording
+                    or self.alerts.rules or running)
+
+    def sample_telemetry(self, tick):
+        sample = self.telemetry.sample()
+        if self.bus and self.telemetry.stale:
+            self.leave_bus()
+        self.scheduler.observe(sample["cpu"])
+        metrics = alert_metrics(sample)
+        self.history.record(sample["ts"], metrics)
+        if self.recorder:
+            self.recorder.system(sample)
+        if self.alerts.rules:
+            metrics.update(self.alerts.probe.sample())
+            for event in self.alerts.feed(sample["ts"], metrics):
+                self.on_alert(event)
+        # The PROCESSES tab samples for itself while shown (refresh_processes)
+        if self.tabs.currentWidget() is not self.tab_process and \
+                tick % self.PROC_EVERY == 0 and \
+                (self.exporter or self.recorder or self.history.recording):
+            self.sample_processes()
+        if self.exporter:
+            self.exporter.publish(sample, self.alerts, self.self_mon.last, self.proc_snap)
+        if self.trace:
+            self.replay_tick()
+        else:
+            self.maintenance_tick(sample)
+        if self.tabs.currentWidget() is self.tab_monitor:
+            self.g_cpu.update_value(sample["cpu"])
+            self.heatmap.push(sample["cpu_cores"], sample["cpu_core_times"])
+            self.g_ram.update_value(sample["ram"])
+            self.update_disk_graph()
+            self.update_net_graph(sample["net"])
+
+    def apply_interval(self):
+        visible = self.isVisible() and not self.isMinimized()
+        ms = self.scheduler.interval(visible, visible and self.isActiveWindow(),
+                                     bool(self.alerts.active))
+        if self.trace and self.trace.speed <= 0:
+            ms = 0  # Replay as fast as the event loop allows
+        if ms != self.timer.interval():
+            self.timer.setInterval(ms)
+        return ms
+
+    def update_self_meter(self):
+        own = self.self_mon.sample()
+        ms = self.apply_interval()
+        self.lbl_self.setText(
+            f"SELF: CPU {own['cpu']:.1f}% | RSS {own['rss'] / 1048576:.0f} MB | "
+            f"busy {own['duty']:.1f}% | every {ms / 1000:.1f} s")
+
+    def closeEvent(self, event):
+        # Never leave a paused maintenance command suspended behind us
+        if self.maint_worker and self.maint_worker.ctl.paused:
+            self.maint_worker.ctl.resume()
+        self.save_maintenance_state()
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+        if self.bus:
+            self.telemetry.close()
+            self.bus = None
+        super().closeEvent(event)
+
+    def leave_bus(self):
+        """The publisher stopped: go back to sampling in this process."""
+        self.log_msg("Telemetry bus stopped publishing; sampling locally.", "WARNING")
+        self.telemetry.close()
+        self.bus = None
+        self.telemetry = TelemetrySampler()
+
+    def replay_tick(self):
+        if self.trace.finished and not self.replay_done:
+            self.replay_done = True
+            self.log_msg(f"Replay of {self.trace.path} finished.", "SUCCESS")
+
+    def reap_workers(self):
+        """Drop finished download workers (the only open-ended worker list)."""
+        done = [w for w in self.downloads if w.isFinished()]
+        for w in done:
+            w.deleteLater()
+        self.downloads = [w for w in self.downloads if not w.isFinished()]
+
+    def housekeeping(self):
+        self.reap_workers()
+        rss = self.self_mon.last["rss"]
+        if self.budget.over(rss) and not self.over_budget:
+            gc.collect()
+            hint = ("See the growing sites in Diagnostics." if self.alloc.active else
+                    "Enable allocation tracing in Diagnostics to find out what is growing.")
+            self.log_msg(f"Memory {rss / 1048576:.0f} MB is above the {self.budget.mb} MB "
+                         f"budget. {hint}", "WARNING")
+        self.over_budget = self.budget.over(rss)
+        if self.alloc.active:
+            self.alloc.sample()
+            self.refresh_allocations()
+
+    def changeEvent(self, event):
+        # React to minimize/restore and focus changes without waiting a tick
+        if event.type() in (event.WindowStateChange, event.ActivationChange):
+            self.apply_interval()
+        super().changeEvent(event)
+
+    def load_alert_rules(self):
+        try:
+            self.alerts = AlertEngine.load()
+        except (OSError, ValueError) as e:
+            self.alerts = AlertEngine()
+            self.log_msg(f"Alert rules not loaded: {e}", "ERROR")
+        self.update_alert_label()
+
+    def edit_alert_rules(self):
+        if not os.path.exists(ALERT_RULES_FILE):
+            os.makedirs(DATA_DIR, exist_ok=True)
+            with open(ALERT_RULES_FILE, "w", encoding="utf-8") as f:
+                json.dump(ALERT_RULES_TEMPLATE, f, indent=2)
+            self.log_msg(f"Alert rule template written to {ALERT_RULES_FILE}", "INFO")
+        subprocess.Popen(["notepad.exe", ALERT_RULES_FILE])
+
+    def update_alert_label(self):
+        active = self.alerts.active
+        text = f"Alerts: {len(self.alerts.rules)} rules"
+        if active:
+            text += " | ACTIVE: " + ", ".join(r.name for r in active)
+        self.lbl_alerts.setText(text)
+        self.lbl_alerts.setStyleSheet(f"color: {'#ff3e3e' if active else '#888'};")
+
+    def on_alert(self, event):
+        rule = event.rule
+        if event.kind == "FIRED":
+            msg = f"ALERT {rule.name}: {rule.metric} = {event.value:.1f}"
+            self.log_msg(msg, "ERROR")
+        else:
+            msg = f"Alert cleared {rule.name}: {rule.metric} = {event.value:.1f}"
+            self.log_msg(msg, "SUCCESS")
+        if rule.notify and self.tray:
+            self.tray.showMessage(
+                "WindowsTweak", msg, QSystemTrayIcon.Warning
+                if event.kind == "FIRED" else QSystemTrayIcon.Information)
+        if rule.command:
+            env = dict(os.environ, WT_ALERT_NAME=rule.name, WT_ALERT_STATE=event.kind,
+                       WT_ALERT_METRIC=rule.metric, WT_ALERT_VALUE=f"{event.value:.2f}")
+            try:
+                subprocess.Popen(rule.command, shell=True, env=env,
+                                 creationflags=NO_WINDOW)
+            except OSError as e:
+                self.log_msg(f"Alert command failed: {e}", "ERROR")
+        self.update_alert_label()
+
+    EXPORT_RANGES = (("Last hour", "1h"), ("Last 24 hours", "24h"),
+                     ("Last 7 days", "7d"), ("Everything", None))
+
+    def export_history(self, kind, since):
+        if self.export_worker and self.export_worker.isRunning():
+            self.log_msg("An export is already running.", "WARNING")
             return
-        self.g_cpu.update_value(psutil.cpu_percent())
-        self.g_ram.update_value(psutil.virtual_memory().percent)
-        self.g_disk.update_value(psutil.disk_usage('/').percent)
-        net = psutil.net_io_counters().bytes_recv / 1024
-        # Modulo for visual effect on spikes
-        self.g_net.update_value(round(net % 5000, 1))
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M")
+        path, _ = QFileDialog.getSaveFileName(
+            self, f"Export {kind} history", f"{kind}_{platform.node()}_{stamp}.csv",
+            "CSV (*.csv);;Columnar (*.wtc)")
+        if not path:
+            return
+        self.log_msg(f"Exporting {kind} history to {path}...", "PROCESS")
+        self.history.flush()
+        self.export_worker = HistoryExportWorker(
+            self.history, kind, path, parse_when(since))
+        self.export_worker.done.connect(
+            lambda ok, msg: self.log_msg(msg, "SUCCESS" if ok else "ERROR"))
+        self.export_worker.start()
+
+    def toggle_history(self, on):
+        self.history.set_recording(on)
+        self.log_msg(f"History recording {'started' if on else 'stopped'}", "INFO")
+
+    def toggle_exporter(self, on):
+        if self.exporter:
+            self.exporter.close()
+            self.exporter = None
+            self.log_msg("Metrics endpoint stopped", "INFO")
+        if not on:
+            return
+        try:
+            self.exporter = MetricsExporter(self.metrics_port, self.metrics_host)
+            self.log_msg(f"Serving OpenMetrics on {self.exporter.url}", "SUCCESS")
+        except OSError as e:
+            self.log_msg(f"Cannot serve metrics on port {self.metrics_port}: {e}", "ERROR")
+            self.chk_metrics.blockSignals(True)
+            self.chk_metrics.setChecked(False)
+            self.chk_metrics.blockSignals(False)
+
+    # View name -> (DiskTelemetry.METRICS fields, formatter, autoscale)
+    DISK_VIEWS = {
+        "Busy %": (("busy",), lambda v: f"{v:.0f}%", False),
+        "Throughput": (("read_bps", "write_bps"), fmt_rate, True),
+        "IOPS": (("read_iops", "write_iops"), lambda v: f"{v:.0f} IOPS", True),
+        "Latency": (("latency_ms",), lambda v: f"{v:.1f} ms", True),
+    }
+    USAGE_SUFFIX = " (usage)"
+
+    def _disk_points(self):
+        """Graph points for the current selection, from telemetry history."""
+        src = self.combo_disk.currentText()
+        hist = self.telemetry.disk.history
+        if src.endswith(self.USAGE_SUFFIX):
+            return list(hist.get(src[:-len(self.USAGE_SUFFIX)], []))
+        fields = self.DISK_VIEWS[self.combo_disk_metric.currentText()][0]
+        idx = [DiskTelemetry.METRICS.index(f) for f in fields]
+        return [tuple(p[i] for i in idx) for p in hist.get(src, [])]
+
+    def select_disk_view(self, *_):
+        is_usage = self.combo_disk.currentText().endswith(self.USAGE_SUFFIX)
+        self.combo_disk_metric.setEnabled(not is_usage)
+        if is_usage:
+            self.g_disk.configure(lambda v: f"{v:.1f}%", False, 1)
+        else:
+            fields, fmt, autoscale = self.DISK_VIEWS[self.combo_disk_metric.currentText()]
+            self.g_disk.configure(fmt, autoscale, len(fields))
+        self.g_disk.load(self._disk_points())
+        self._disk_caption()
+
+    def _disk_caption(self):
+        points = self._disk_points()
+        last = points[-1] if points else (0,)
+        g = self.g_disk
+        g.caption = g.fmt(last[0]) if len(last) == 1 else \
+            f"R {g.fmt(last[0])} W {g.fmt(last[1])}"
+        g.update()
+
+    def update_disk_graph(self):
+        disk = self.telemetry.disk
+        items = disk.disks() + [m + self.USAGE_SUFFIX for m in sorted(disk.partitions)]
+        if items != [self.combo_disk.itemText(i) for i in range(self.combo_disk.count())]:
+            current = self.combo_disk.currentText()
+            self.combo_disk.blockSignals(True)
+            self.combo_disk.clear()
+            self.combo_disk.addItems(items)
+            self.combo_disk.setCurrentText(current if current in items else DiskTelemetry.ALL)
+            self.combo_disk.blockSignals(False)
+            if self.combo_disk.currentText() != current:
+                self.select_disk_view()
+
+        points = self._disk_points()
+        if points:
+            self.g_disk.update_value(*points[-1])
+            self._disk_caption()
+        r = disk.rates.get(DiskTelemetry.ALL)
+        if r:
+            self.lbl_disk.setText(
+                f"All disks: busy {r['busy']:.0f}%  R {fmt_rate(r['read_bps'])}  "
+                f"W {fmt_rate(r['write_bps'])}  {r['read_iops'] + r['write_iops']:.0f} IOPS  "
+                f"{r['latency_ms']:.1f} ms")
+
+    def update_net_graph(self, rates):
+        nics = self.telemetry.net.interfaces()
+        if nics != [self.combo_nic.itemText(i) for i in range(self.combo_nic.count())]:
+            current = self.combo_nic.currentText()
+            self.combo_nic.blockSignals(True)
+            self.combo_nic.clear()
+            self.combo_nic.addItems(nics)
+            self.combo_nic.setCurrentText(current if current in nics else NetTelemetry.ALL)
+            self.combo_nic.blockSignals(False)
+
+        r = rates.get(self.combo_nic.currentText())
+        if not r:
+            return
+        down, up = r["bytes_recv"], r["bytes_sent"]
+        self.g_net.caption = f"↓{fmt_rate(down)} ↑{fmt_rate(up)}"
+        self.g_net.update_value(down, up)
+        self.lbl_net.setText(
+            f"Packets/s in {r['packets_recv']:.0f} out {r['packets_sent']:.0f}  |  "
+            f"Errors/s {r['errin'] + r['errout']:.1f}  |  Drops/s {r['dropin'] + r['dropout']:.1f}")
+
+    def select_nic(self, nic):
+        self.g_net.load(self.telemetry.net.history.get(nic, []))
+        rates = self.telemetry.net.smooth.get(nic)
+        if rates:
+            self.g_net.caption = f"↓{fmt_rate(rates['bytes_recv'])} ↑{fmt_rate(rates['bytes_sent'])}"
 
     # --- TAB 2: TOOLS ---
     def setup_tools(self):
@@ -810,23 +5718,29 @@ class UltimateMainWindow(QMainWindow):
         clayout = QVBoxLayout(container)
         clayout.setSpacing(15)
 
+        try:
+            self.catalog = ToolCatalog.load(self.catalog_path)
+            if self.catalog.source != "built-in":
+                self.log_msg(f"Loaded {len(self.catalog)} tools from {self.catalog.source}"
+                             f"{' (cached)' if self.catalog.cached else ''}", "INFO")
+        except (OSError, ValueError) as e:
+            self.catalog = ToolCatalog.builtin()
+            self.log_msg(f"Tool catalog rejected, using built-in list: {e}", "ERROR")
         self.tool_btns = {}
+        self.tool_sections = []
 
-        for cat, tools in TOOLS_DB.items():
-            gb = QGroupBox(cat)
-            gl = QGridLayout(gb)
-            for i, tool in enumerate(tools):
-                installed = self.check_installed(tool)
-                btn = HoverButton(tool, installed)
-                btn.on_hover.connect(self.update_tool_info)
-                btn.clicked.connect(lambda ch, t=tool,
-                                    b=btn: self.launch_tool(t, b))
-                gl.addWidget(btn, i//2, i % 2)
-                self.tool_btns[tool['id']] = btn
-            clayout.addWidget(gb)
+        for cat, tools in self.catalog.categories.items():
+            section = ToolSection(cat, tools, self.make_tool_button)
+            section.header.toggled.connect(self.build_visible_tool_sections)
+            clayout.addWidget(section)
+            self.tool_sections.append(section)
 
         clayout.addStretch()
         scroll.setWidget(container)
+        self.tool_scroll = scroll
+        scroll.verticalScrollBar().valueChanged.connect(self.build_visible_tool_sections)
+        self.tabs.currentChanged.connect(self.build_visible_tool_sections)
+        QTimer.singleShot(0, self.build_visible_tool_sections)  # Once laid out
 
         # Panel Right Info
         info_panel = QFrame()
@@ -847,12 +5761,40 @@ class UltimateMainWindow(QMainWindow):
 
         layout.addWidget(scroll)
         layout.addWidget(info_panel)
-        self.downloads = []  # Keep refs
+
+    def make_tool_button(self, tool):
+        btn = HoverButton(tool, self.check_installed(tool))
+        btn.on_hover.connect(self.update_tool_info)
+        btn.clicked.connect(lambda ch, t=tool, b=btn: self.launch_tool(t, b))
+        if tool['type'] != 'cmd':
+            btn.setContextMenuPolicy(Qt.CustomContextMenu)
+            btn.customContextMenuRequested.connect(
+                lambda pos, t=tool, b=btn: self.tool_menu(t, b, pos))
+        self.tool_btns[tool['id']] = btn
+        return btn
+
+    def tool_menu(self, tool, btn, pos):
+        menu = QMenu()
+        act_update = menu.addAction("⟳ Update (re-download, write only changed files)")
+        if menu.exec_(btn.mapToGlobal(pos)) is act_update:
+            self.launch_tool(tool, btn, update=True)
+
+    def build_visible_tool_sections(self, *_):
+        """Build the buttons of every section inside the scroll viewport."""
+        if self.tabs.currentWidget() is not self.tab_tools:
+            return
+        viewport = self.tool_scroll.viewport()
+        top = self.tool_scroll.verticalScrollBar().value()
+        bottom = top + viewport.height()
+        for section in self.tool_sections:
+            if not section.built and section.y() < bottom and \
+                    section.y() + section.height() > top:
+                section.ensure_built()
 
     def check_installed(self, tool):
         if tool['type'] == 'cmd':
             return True
-        exe = tool['exe_64'] if sys.maxsize > 2**32 else tool['exe_32']
+        exe = tool['exe']
         # Preliminary check path
         path = os.path.join(self.base_path, tool['id'])
         # Use simple exist check or deep check
@@ -861,27 +5803,30 @@ class UltimateMainWindow(QMainWindow):
     def update_tool_info(self, html):
         self.txt_tool_info.setHtml(html)
 
-    def launch_tool(self, tool, btn):
-        self.log_msg(f"Preparing {tool['name']}...", "INFO")
+    def launch_tool(self, tool, btn, update=False):
+        self.log_msg(f"{'Updating' if update else 'Preparing'} {tool['name']}...", "INFO")
         btn.setEnabled(False)
         btn.setText("⏳ Processing...")
 
-        worker = DownloadWorker(tool, self.base_path)
+        worker = DownloadWorker(tool, self.base_path, update)
         worker.log.connect(self.log_msg)
         worker.progress.connect(self.progress_bar.setValue)
-        worker.finished.connect(lambda p: self.on_tool_ready(p, btn, tool))
+        worker.finished.connect(lambda p: self.on_tool_ready(p, btn, tool, not update))
         worker.error.connect(lambda e: self.on_tool_error(e, btn, tool))
 
+        self.reap_workers()
         self.downloads.append(worker)
         worker.start()
 
-    def on_tool_ready(self, path, btn, tool):
+    def on_tool_ready(self, path, btn, tool, launch=True):
         btn.setEnabled(True)
         btn.setText(tool['name'])
         btn.update_style(True)
         self.progress_bar.setValue(100)
 
-        if path == "CMD_MODE":
+        if not launch:
+            self.log_msg(f"{tool['name']} is up to date.", "SUCCESS")
+        elif path == "CMD_MODE":
             subprocess.Popen(tool['cmd'], shell=True)
         else:
             self.log_msg(f"Running: {path}", "SUCCESS")
@@ -912,39 +5857,7 @@ class UltimateMainWindow(QMainWindow):
 
         self.repair_checks = []
 
-        tasks_db = {
-            "🔧 System & Disk Integrity": [
-                {"name": "SFC /Scannow (System File Checker)",
-                 "type": "cmd", "cmd": "sfc /scannow"},
-                {"name": "DISM RestoreHealth (Repair Image)", "type": "cmd",
-                    "cmd": "DISM /Online /Cleanup-Image /RestoreHealth"},
-                {"name": "CHKDSK (Scan Only)", "type": "py",
-                 "func": self.task_chkdsk},
-                {"name": "Clean Temporary Files", "type": "py",
-                    "func": self.task_clean_temp}
-            ],
-            "🌐 Network & Internet": [
-                {"name": "Flush DNS & Reset IP", "type": "py",
-                    "func": self.task_net_reset},
-                {"name": "Reset Winsock (Requires Restart)", "type": "cmd",
-                    "cmd": "netsh winsock reset"}
-            ],
-            "🎨 UI & Applications": [
-                {"name": "Reset Icon Cache", "type": "py",
-                    "func": self.task_icon_cache},
-                {"name": "Reset Windows Store", "type": "cmd", "cmd": "wsreset.exe"}
-            ],
-            "⚙️ Advanced System": [
-                {"name": "Reset Windows Update Components", "type": "py",
-                    "func": self.task_reset_update},
-                {"name": "Restart Print Spooler", "type": "cmd",
-                    "cmd": "net stop spooler && net start spooler"},
-                {"name": "Generate Battery Report", "type": "py",
-                    "func": self.task_battery_report}
-            ]
-        }
-
-        for cat, tasks in tasks_db.items():
+        for cat, tasks in self.maintenance_tasks().items():
             gb = QGroupBox(cat)
             gl = QVBoxLayout(gb)
             for t in tasks:
@@ -963,6 +5876,30 @@ class UltimateMainWindow(QMainWindow):
         btn_run.clicked.connect(self.run_maintenance)
         l_layout.addWidget(btn_run)
 
+        gb_sched = QGroupBox("Scheduled Maintenance")
+        gs = QGridLayout(gb_sched)
+        self.combo_profiles = QComboBox()
+        btn_run_profile = QPushButton("▶ RUN NOW")
+        btn_run_profile.clicked.connect(self.run_profile_now)
+        btn_save_profile = QPushButton("💾 SAVE SELECTION AS PROFILE")
+        btn_save_profile.clicked.connect(self.save_profile)
+        btn_edit_profiles = QPushButton("✎ EDIT")
+        btn_edit_profiles.clicked.connect(self.edit_maintenance)
+        btn_reload_profiles = QPushButton("⟳ RELOAD")
+        btn_reload_profiles.clicked.connect(self.load_maintenance)
+        self.lbl_maint = QLabel()
+        self.lbl_maint.setWordWrap(True)
+        self.lbl_maint.setStyleSheet("color: #888;")
+        gs.addWidget(self.combo_profiles, 0, 0)
+        gs.addWidget(btn_run_profile, 0, 1)
+        gs.addWidget(btn_save_profile, 0, 2)
+        gs.addWidget(btn_edit_profiles, 0, 3)
+        gs.addWidget(btn_reload_profiles, 0, 4)
+        gs.addWidget(self.lbl_maint, 1, 0, 1, 5)
+        gs.setColumnStretch(0, 1)
+        l_layout.addWidget(gb_sched)
+        self.update_profile_list()
+
         # --- RIGHT COLUMN: NETWORK UTILITIES ---
         right_widget = QWidget()
         right_widget.setFixedWidth(320)
@@ -972,12 +5909,17 @@ class UltimateMainWindow(QMainWindow):
         gb_dns = QGroupBox("Quick DNS Switcher")
         gl_dns = QVBoxLayout(gb_dns)
         self.combo_dns = QComboBox()
-        self.combo_dns.addItems(
-            ["-- Select --", "Google (8.8.8.8)", "Cloudflare (1.1.1.1)", "Automatic (DHCP)"])
-        btn_set_dns = QPushButton("Apply DNS")
-        btn_set_dns.clicked.connect(self.set_dns)
+        self.combo_dns.addItems(["-- Select --"] + list(DNS_PRESETS))
+        self.btn_set_dns = QPushButton("Apply DNS")
+        self.btn_set_dns.clicked.connect(self.set_dns)
+        self.btn_bench_dns = QPushButton("⏱ Benchmark Resolvers")
+        self.btn_bench_dns.clicked.connect(self.benchmark_dns)
+        self.lbl_dns_bench = QLabel()
+        self.lbl_dns_bench.setWordWrap(True)
         gl_dns.addWidget(self.combo_dns)
-        gl_dns.addWidget(btn_set_dns)
+        gl_dns.addWidget(self.btn_set_dns)
+        gl_dns.addWidget(self.btn_bench_dns)
+        gl_dns.addWidget(self.lbl_dns_bench)
         r_layout.addWidget(gb_dns)
 
         # 2. Wi-Fi Passwords
@@ -985,6 +5927,7 @@ class UltimateMainWindow(QMainWindow):
         gl_wifi = QVBoxLayout(gb_wifi)
         self.txt_wifi = QTextEdit()
         self.txt_wifi.setReadOnly(True)
+        self.wifi_worker = None
         btn_get_wifi = QPushButton("🔍 Reveal Keys")
         btn_get_wifi.clicked.connect(self.get_wifi_keys)
         gl_wifi.addWidget(btn_get_wifi)
@@ -994,27 +5937,226 @@ class UltimateMainWindow(QMainWindow):
         layout.addWidget(left_widget)
         layout.addWidget(right_widget)
 
+    def maintenance_tasks(self):
+        """Repair tasks by category. Profiles refer to them by "id"; "heavy"
+        ones keep the disk or CPU busy for minutes and only start (or keep
+        running) in scheduled runs while the machine is quiet."""
+        return {
+            "🔧 System & Disk Integrity": [
+                {"id": "sfc", "name": "SFC /Scannow (System File Checker)",
+                 "type": "cmd", "cmd": "sfc /scannow", "heavy": True},
+                {"id": "dism", "name": "DISM RestoreHealth (Repair Image)", "type": "cmd",
+                    "cmd": "DISM /Online /Cleanup-Image /RestoreHealth", "heavy": True},
+                {"id": "chkdsk", "name": "CHKDSK (Scan Only)", "type": "py",
+                 "func": self.task_chkdsk, "heavy": True},
+                {"id": "clean_temp", "name": "Clean Temporary Files", "type": "py",
+                    "func": self.task_clean_temp, "heavy": True}
+            ],
+            "🌐 Network & Internet": [
+                {"id": "net_reset", "name": "Flush DNS & Reset IP", "type": "py",
+                    "func": self.task_net_reset},
+                {"id": "winsock", "name": "Reset Winsock (Requires Restart)", "type": "cmd",
+                    "cmd": "netsh winsock reset"}
+            ],
+            "🎨 UI & Applications": [
+                {"id": "icon_cache", "name": "Reset Icon Cache", "type": "py",
+                    "func": self.task_icon_cache},
+                {"id": "wsreset", "name": "Reset Windows Store", "type": "cmd",
+                    "cmd": "wsreset.exe"}
+            ],
+            "⚙️ Advanced System": [
+                {"id": "update_reset", "name": "Reset Windows Update Components",
+                    "type": "py", "func": self.task_reset_update},
+                {"id": "spooler", "name": "Restart Print Spooler", "type": "cmd",
+                    "cmd": "net stop spooler && net start spooler"},
+                {"id": "battery_report", "name": "Generate Battery Report", "type": "py",
+                    "func": self.task_battery_report}
+            ]
+        }
+
     def run_maintenance(self):
         selected = [t for chk, t in self.repair_checks if chk.isChecked()]
         if not selected:
             QMessageBox.information(
                 self, "Info", "Select at least one task.")
             return
-
-        self.sys_worker = SystemWorker(selected)
-        self.sys_worker.log.connect(self.log_msg)
-        self.sys_worker.progress.connect(self.progress_bar.setValue)
-        self.sys_worker.start()
-
-    # Python Tasks
-    def task_chkdsk(self, log_func):
+        self.start_maintenance(selected)
+
+    def start_maintenance(self, tasks, profile=None, gated=False):
+        if self.maint_worker and self.maint_worker.isRunning():
+            self.log_msg("A maintenance run is already in progress.", "WARNING")
+            return False
+        self.maint_worker = SystemWorker(tasks, profile, gated)
+        self.maint_worker.log.connect(self.log_msg)
+        self.maint_worker.progress.connect(self.progress_bar.setValue)
+        self.maint_worker.task_done.connect(self.on_task_timed)
+        self.maint_worker.finished.connect(self.on_maintenance_finished)
+        self.maint_worker.start()
+        return True
+
+    # --- Scheduled maintenance ---
+    def load_maintenance(self):
+        try:
+            self.maint = MaintenanceScheduler.load_files()
+        except (OSError, ValueError) as e:
+            self.maint = MaintenanceScheduler()
+            self.log_msg(f"Maintenance profiles not loaded: {e}", "ERROR")
+        self.maint_waiting = None
+        self.update_profile_list()
+
+    def edit_maintenance(self):
+        if not os.path.exists(MAINTENANCE_FILE):
+            os.makedirs(DATA_DIR, exist_ok=True)
+            with open(MAINTENANCE_FILE, "w", encoding="utf-8") as f:
+                json.dump(MAINTENANCE_TEMPLATE, f, indent=2, ensure_ascii=False)
+            self.log_msg(f"Maintenance template written to {MAINTENANCE_FILE}", "INFO")
+        subprocess.Popen(["notepad.exe", MAINTENANCE_FILE])
+
+    def save_profile(self):
+        ids = [t['id'] for chk, t in self.repair_checks if chk.isChecked()]
+        if not ids:
+            QMessageBox.information(self, "Info", "Select at least one task.")
+            return
+        name, ok = QInputDialog.getText(self, "Save Profile", "Profile name:")
+        if not ok or not name.strip():
+            return
+        config = {"profiles": {}, "thresholds": MAINTENANCE_TEMPLATE["thresholds"]}
+        try:
+            with open(MAINTENANCE_FILE, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except FileNotFoundError:
+            os.makedirs(DATA_DIR, exist_ok=True)
+        except (OSError, ValueError) as e:
+            self.log_msg(f"Cannot update {MAINTENANCE_FILE}: {e}", "ERROR")
+            return
+        config.setdefault("profiles", {})[name.strip()] = {
+            "tasks": ids, "every_hours": 168, "jitter_minutes": 30,
+            "window_hours": 24, "enabled": True}
+        with open(MAINTENANCE_FILE, "w", encoding="utf-8") as f:
+            json.dump(config, f, indent=2, ensure_ascii=False)
+        self.log_msg(f"Profile '{name.strip()}' saved: weekly, in the quietest "
+                     f"window of the day it falls due. Edit the file to change.", "SUCCESS")
+        self.load_maintenance()
+
+    def update_profile_list(self):
+        if self.tab_repair in self.tab_builders:
+            return  # Tab not built yet
+        current = self.combo_profiles.currentText()
+        self.combo_profiles.clear()
+        self.combo_profiles.addItems(list(self.maint.profiles))
+        self.combo_profiles.setCurrentText(current)
+        self.update_maintenance_label()
+
+    def profile_tasks(self, name):
+        by_id = {t['id']: t for tasks in self.maintenance_tasks().values() for t in tasks}
+        unknown = [i for i in self.maint.profiles[name]["tasks"] if i not in by_id]
+        if unknown:
+            self.log_msg(f"Profile '{name}': unknown task ids {unknown}", "WARNING")
+        return [by_id[i] for i in self.maint.profiles[name]["tasks"] if i in by_id]
+
+    def run_profile_now(self):
+        name = self.combo_profiles.currentText()
+        if name in self.maint.profiles:
+            self.start_maintenance(self.profile_tasks(name), name)
+
+    def on_task_timed(self, task_id, seconds, ok):
+        if ok:  # Failures end early and would skew the estimate
+            self.maint.record_task(task_id, seconds)
+
+    def on_maintenance_finished(self):
+        worker = self.maint_worker
+        if worker.ctl.paused:
+            worker.ctl.resume()
+        if worker.profile:
+            self.maint.finish_run(worker.profile, worker.started)
+            nxt = self.maint.next_run.get(worker.profile)
+            if nxt:
+                self.log_msg(f"Next '{worker.profile}' run: "
+                             f"{time.strftime('%a %d %b %H:%M', time.localtime(nxt))}", "INFO")
+        self.save_maintenance_state()
+        self.update_maintenance_label()
+
+    def save_maintenance_state(self):
+        try:
+            self.maint.save_state()
+        except OSError as e:
+            self.log_msg(f"Maintenance state not saved: {e}", "ERROR")
+
+    def maintenance_tick(self, sample):
+        """Start due profiles and pause/resume heavy tasks from load."""
+        worker = self.maint_worker
+        running = worker is not None and worker.isRunning()
+        own_cpu, own_io = worker.ctl.usage() if running else (0.0, 0.0)
+        disk = sample["disk_io"].get(DiskTelemetry.ALL, {})
+        disk_bps = disk.get("read_bps", 0.0) + disk.get("write_bps", 0.0)
+        slot = self.maint.slot(sample["ts"])
+        self.maint.observe(sample["ts"], max(0.0, sample["cpu"] - own_cpu),
+                           max(0.0, disk_bps - own_io))
+        if slot != self.maint_slot:  # Persist the load profile hourly
+            if self.maint_slot is not None:
+                self.save_maintenance_state()
+            self.maint_slot = slot
+        if not self.maint.profiles and not running:
+            return
+        reason = self.maint.blocked(user_idle_seconds())
+
+        if running:
+            ctl = worker.ctl
+            heavy = worker.gated and bool(worker.current and worker.current.get("heavy"))
+            if reason and heavy and not ctl.paused:
+                ctl.pause()
+                self.log_msg(f"Maintenance paused: {reason}", "WARNING")
+            elif ctl.paused and (not heavy or not reason and
+                                 time.monotonic() - ctl.paused_at >= self.MAINT_MIN_PAUSE):
+                ctl.resume()
+                self.log_msg("Maintenance resumed.", "INFO")
+        else:
+            waiting = None
+            for name in self.maint.due(sample["ts"]):
+                tasks = self.profile_tasks(name)
+                if reason and any(t.get("heavy") for t in tasks):
+                    waiting = f"'{name}' postponed: {reason}"
+                    continue
+                self.log_msg(f"Starting scheduled maintenance '{name}'", "INFO")
+                self.start_maintenance(tasks, name, gated=True)
+                break
+            if waiting and not self.maint_waiting:
+                self.log_msg(waiting, "WARNING")
+            self.maint_waiting = waiting
+        self.update_maintenance_label(reason)
+
+    def update_maintenance_label(self, reason=None):
+        if self.tab_repair in self.tab_builders:
+            return
+        worker = self.maint_worker
+        if worker is not None and worker.isRunning():
+            text = f"Running '{worker.profile or 'selected tasks'}'"
+            if worker.ctl.paused:
+                text += f" - PAUSED ({reason or 'waiting'})"
+        elif self.maint_waiting:
+            text = self.maint_waiting
+        else:
+            plans = []
+            for name, p in self.maint.profiles.items():
+                nxt = self.maint.next_run.get(name)
+                if not p.get("enabled", True):
+                    plans.append(f"{name}: disabled")
+                elif nxt:
+                    est = self.maint.expected_duration(p["tasks"]) / 60
+                    plans.append(f"{name}: {time.strftime('%a %H:%M', time.localtime(nxt))}"
+                                 f" (~{est:.0f} min)")
+            text = " | ".join(plans) or "No profiles. Tick tasks and save them as a profile."
+        self.lbl_maint.setText(text)
+
+    # Python Tasks. `ctl` pauses them while a scheduled run is held back.
+    def task_chkdsk(self, log_func, ctl):
         drives = [p.device.replace("\\", "")
                   for p in psutil.disk_partitions() if 'fixed' in p.opts]
         for d in drives:
             log_func(f"Scanning {d}...", "CMD")
-            subprocess.run(f"chkdsk {d} /scan", shell=True)
+            ctl.run(f"chkdsk {d} /scan", shell=True)
 
-    def task_clean_temp(self, log_func):
+    def task_clean_temp(self, log_func, ctl):
         folders = [os.environ.get(
             "TEMP"), r"C:\Windows\Temp", r"C:\Windows\Prefetch"]
         for folder in folders:
@@ -1022,19 +6164,23 @@ class UltimateMainWindow(QMainWindow):
                 continue
             log_func(f"Cleaning: {folder}", "INFO")
             try:
-                shutil.rmtree(folder, ignore_errors=True)
-                os.makedirs(folder, exist_ok=True)
-            except:
-                pass
+                entries = list(os.scandir(folder))
+            except OSError:
+                continue
+            for entry in entries:
+                ctl.checkpoint()
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                    else:
+                        os.remove(entry.path)
+                except OSError:
+                    pass  # In use
 
-    def task_net_reset(self, log_func):
-        cmds = ["ipconfig /release", "ipconfig /renew",
-                "ipconfig /flushdns", "netsh int ip reset"]
-        for c in cmds:
-            log_func(f"Exec: {c}", "CMD")
-            subprocess.run(c, shell=True)
+    def task_net_reset(self, log_func, ctl):
+        asyncio.run(reset_network_stack(AsyncCommandRunner(), log_func))
 
-    def task_icon_cache(self, log_func):
+    def task_icon_cache(self, log_func, ctl):
         log_func("Restarting Explorer and clearing cache...", "WARNING")
         subprocess.run("taskkill /IM explorer.exe /F", shell=True)
         db = os.path.join(os.environ["LOCALAPPDATA"], "IconCache.db")
@@ -1042,35 +6188,10 @@ class UltimateMainWindow(QMainWindow):
             os.remove(db)
         subprocess.run("start explorer.exe", shell=True)
 
-    def task_reset_update(self, log_func):
-        log_func("Stopping Update Services...", "INFO")
-        subprocess.run("net stop wuauserv", shell=True)
-        subprocess.run("net stop cryptSvc", shell=True)
-        subprocess.run("net stop bits", shell=True)
-        subprocess.run("net stop msiserver", shell=True)
-
-        log_func("Renaming SoftwareDistribution...", "INFO")
-        sw_dist = r"C:\Windows\SoftwareDistribution"
-        if os.path.exists(sw_dist):
-            try:
-                os.rename(sw_dist, sw_dist + ".old")
-            except:
-                pass
-
-        cat_root = r"C:\Windows\System32\catroot2"
-        if os.path.exists(cat_root):
-            try:
-                os.rename(cat_root, cat_root + ".old")
-            except:
-                pass
-
-        log_func("Restarting Services...", "INFO")
-        subprocess.run("net start wuauserv", shell=True)
-        subprocess.run("net start cryptSvc", shell=True)
-        subprocess.run("net start bits", shell=True)
-        subprocess.run("net start msiserver", shell=True)
+    def task_reset_update(self, log_func, ctl):
+        asyncio.run(reset_windows_update(AsyncCommandRunner(), log_func))
 
-    def task_battery_report(self, log_func):
+    def task_battery_report(self, log_func, ctl):
         path = os.path.join(os.getcwd(), "battery_report.html")
         log_func(f"Generating report at {path}", "INFO")
         subprocess.run(
@@ -1080,54 +6201,84 @@ class UltimateMainWindow(QMainWindow):
 
     # Right Panel Functions
     def set_dns(self):
-        sel = self.combo_dns.currentIndex()
-        if sel == 0:
+        sel = self.combo_dns.currentText()
+        if sel not in DNS_PRESETS:
+            return
+        interfaces = active_interfaces()
+        if not interfaces:
+            self.log_msg("No active network adapters found.", "WARNING")
+            return
+
+        if getattr(self, "dns_worker", None) and self.dns_worker.isRunning():
             return
+        self.log_msg(f"Changing DNS to {sel} on: {', '.join(interfaces)}", "CMD")
+        self.btn_set_dns.setEnabled(False)
+        self.dns_worker = DnsWorker(interfaces, DNS_PRESETS[sel])
+        self.dns_worker.log.connect(self.log_msg)
+        self.dns_worker.done.connect(
+            lambda failed: self.on_dns_applied(interfaces, failed))
+        self.dns_worker.start()
+
+    def on_dns_applied(self, interfaces, failed):
+        self.btn_set_dns.setEnabled(True)
+        if failed:
+            self.log_msg(f"DNS not applied on: {', '.join(failed)}", "WARNING")
+        else:
+            self.log_msg(
+                f"DNS configuration applied ({len(interfaces)} adapters).", "SUCCESS")
 
-        cmd = ""
-        desc = ""
-        if sel == 1:  # Google
-            cmd = 'netsh interface ip set dns "Wi-Fi" static 8.8.8.8 && netsh interface ip add dns "Wi-Fi" 8.8.4.4 index=2'
-            desc = "Google DNS"
-        elif sel == 2:  # Cloudflare
-            cmd = 'netsh interface ip set dns "Wi-Fi" static 1.1.1.1 && netsh interface ip add dns "Wi-Fi" 1.0.0.1 index=2'
-            desc = "Cloudflare DNS"
-        elif sel == 3:  # DHCP
-            cmd = 'netsh interface ip set dns "Wi-Fi" dhcp'
-            desc = "DHCP"
-
-        # Try for Ethernet too
-        cmd_eth = cmd.replace('"Wi-Fi"', '"Ethernet"')
-
-        self.log_msg(f"Changing DNS to {desc}...", "CMD")
-        subprocess.run(cmd, shell=True)
-        subprocess.run(cmd_eth, shell=True)
-        self.log_msg("DNS configuration applied (Wi-Fi/Ethernet).", "SUCCESS")
+    def benchmark_dns(self):
+        if getattr(self, "dns_bench_worker", None) and self.dns_bench_worker.isRunning():
+            return
+        servers = [(label, ips[0]) for label, ips in DNS_PRESETS.items() if ips]
+        servers += [(f"Current/DHCP ({ip})", ip) for ip in system_resolvers()]
+        self.btn_bench_dns.setEnabled(False)
+        self.lbl_dns_bench.setText("Querying resolvers...")
+        self.dns_bench_worker = DnsBenchWorker(servers)
+        self.dns_bench_worker.done.connect(self.on_dns_benchmark)
+        self.dns_bench_worker.start()
+
+    def on_dns_benchmark(self, results):
+        self.btn_bench_dns.setEnabled(True)
+        lines = []
+        for i, r in enumerate(results, 1):
+            if r["median"] is None:
+                lines.append(f"{i}. {r['label']}: no response")
+            else:
+                lines.append(f"{i}. {r['label']}: {r['median']:.0f} ms "
+                             f"(p95 {r['p95']:.0f}, lost {r['lost']}/{r['sent']})")
+        self.lbl_dns_bench.setText("<br>".join(lines))
+        self.log_msg("Resolver benchmark: " + " > ".join(r["label"] for r in results), "INFO")
+        # Preselect the winner; DHCP-provided servers map to the DHCP preset
+        best = results[0]["label"] if results and results[0]["median"] else None
+        if best:
+            self.combo_dns.setCurrentText(
+                best if best in DNS_PRESETS else "Automatic (DHCP)")
 
     def get_wifi_keys(self):
+        if self.wifi_worker and self.wifi_worker.isRunning():
+            return
         self.txt_wifi.setText("Scanning...")
         self.log_msg("Getting WLAN profiles...", "INFO")
-        try:
-            out = subprocess.check_output(
-                "netsh wlan show profiles", shell=True).decode('cp850', errors='ignore')
-            profiles = [line.split(":")[1].strip() for line in out.splitlines(
-            ) if "All User Profile" in line]
-
-            result = ""
-            for p in profiles:
-                try:
-                    p_info = subprocess.check_output(
-                        f'netsh wlan show profile name="{p}" key=clear', shell=True).decode('cp850', errors='ignore')
-                    match = re.search(
-                        r"Key Content\s*:\s*(.*)", p_info)
-                    key = match.group(1) if match else "N/A"
-                    result += f"SSID: {p}\nPASS: {key}\n{'-'*20}\n"
-                except:
-                    pass
-            self.txt_wifi.setText(
-                result if result else "No profiles found.")
-        except Exception as e:
-            self.txt_wifi.setText(f"Error: {e}")
+        self.wifi_found = 0
+        self.wifi_worker = WifiWorker()
+        self.wifi_worker.profile_ready.connect(self.on_wifi_key)
+        self.wifi_worker.scan_done.connect(self.on_wifi_done)
+        self.wifi_worker.start()
+
+    def on_wifi_key(self, ssid, key):
+        if not self.wifi_found:
+            self.txt_wifi.clear()
+        self.wifi_found += 1
+        self.txt_wifi.append(f"SSID: {ssid}\nPASS: {key}\n{'-'*20}")
+
+    def on_wifi_done(self, count, error):
+        if error:
+            self.txt_wifi.setText(f"Error: {error}")
+        elif not self.wifi_found:
+            self.txt_wifi.setText("No profiles found.")
+        else:
+            self.log_msg(f"{self.wifi_found}/{count} WLAN profiles read.", "SUCCESS")
 
     # --- TAB 4: PROCESSES ---
     def setup_process(self):
@@ -1135,96 +6286,279 @@ class UltimateMainWindow(QMainWindow):
 
         h = QHBoxLayout()
         self.txt_proc_filter = QLineEdit()
-        self.txt_proc_filter.setPlaceholderText("Filter name...")
-        self.txt_proc_filter.textChanged.connect(self.refresh_processes)
+        self.txt_proc_filter.setPlaceholderText(
+            "Filter: chrome   name~chrome|edge mem>500 cpu>=5 status:stopped user:svc_*")
+        self.txt_proc_filter.setToolTip(ProcessQuery.HELP)
+        # Recompile once typing pauses, not on every keystroke
+        self.proc_filter_timer = QTimer(self)
+        self.proc_filter_timer.setSingleShot(True)
+        self.proc_filter_timer.setInterval(self.FILTER_DEBOUNCE_MS)
+        self.proc_filter_timer.timeout.connect(self.apply_proc_filter)
+        self.txt_proc_filter.textChanged.connect(self.proc_filter_timer.start)
+        self.txt_proc_filter.returnPressed.connect(self.apply_proc_filter)
 
         btn_ref = QPushButton("Refresh")
-        btn_ref.clicked.connect(self.refresh_processes)
+        btn_ref.clicked.connect(lambda: self.refresh_processes(force=True))
 
         h.addWidget(self.txt_proc_filter)
         h.addWidget(btn_ref)
         layout.addLayout(h)
 
-        self.tbl_proc = QTableWidget()
-        self.tbl_proc.setColumnCount(4)
-        self.tbl_proc.setHorizontalHeaderLabels(
-            ["PID", "Name", "Memory (MB)", "Status"])
-        self.tbl_proc.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.tbl_proc.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.lbl_hogs = QLabel("Top CPU: -  |  Top RAM: -")
+        self.lbl_hogs.setStyleSheet(f"color: {THEME['accent']}; padding: 2px;")
+        layout.addWidget(self.lbl_hogs)
+
+        self.proc_model = ProcessTableModel(self.proc_sampler.history)
+        self.proc_workers = []
+        self.tbl_proc = self.build_process_view(self.proc_model)
+        self.tbl_proc.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.tbl_proc.setContextMenuPolicy(Qt.CustomContextMenu)
         self.tbl_proc.customContextMenuRequested.connect(self.proc_menu)
 
-        layout.addWidget(self.tbl_proc)
-        QTimer.singleShot(1000, self.refresh_processes)
-
-    def refresh_processes(self):
-        if self.tabs.currentIndex() != 3:
+        # Leak watch under the process table
+        leak_box = QGroupBox("LEAK WATCH")
+        leak_layout = QVBoxLayout(leak_box)
+        bar = QHBoxLayout()
+        self.txt_leak_patterns = QLineEdit(", ".join(self.leaks.patterns))
+        self.txt_leak_patterns.setPlaceholderText(
+            "Name patterns to watch, e.g. myservice*.exe, sqlservr.exe "
+            "(or right-click a process > Watch for Leaks)")
+        self.txt_leak_patterns.editingFinished.connect(self.apply_leak_patterns)
+        self.lbl_leaks = QLabel()
+        self.lbl_leaks.setStyleSheet("color: #888;")
+        bar.addWidget(self.txt_leak_patterns, 1)
+        bar.addWidget(self.lbl_leaks)
+        leak_layout.addLayout(bar)
+        self.tbl_leaks = QTableWidget(0, len(self.LEAK_COLUMNS))
+        self.tbl_leaks.setHorizontalHeaderLabels(self.LEAK_COLUMNS)
+        self.tbl_leaks.verticalHeader().hide()
+        self.tbl_leaks.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tbl_leaks.horizontalHeader().setStretchLastSection(True)
+        leak_layout.addWidget(self.tbl_leaks)
+
+        split = QSplitter(Qt.Vertical)
+        split.addWidget(self.tbl_proc)
+        split.addWidget(leak_box)
+        split.setStretchFactor(0, 3)
+        split.setStretchFactor(1, 1)
+        layout.addWidget(split)
+        self.refresh_leaks()
+
+    @staticmethod
+    def build_process_view(model):
+        view = QTableView()
+        view.setModel(model)
+        view.setWordWrap(False)
+        view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        # Uniform rows + non-content-based column sizing keep layout O(1)
+        vh = view.verticalHeader()
+        vh.setSectionResizeMode(QHeaderView.Fixed)
+        vh.setDefaultSectionSize(22)
+        vh.hide()
+        hh = view.horizontalHeader()
+        hh.setSectionResizeMode(QHeaderView.Interactive)
+        hh.setStretchLastSection(True)
+        for col, (_, width, _) in enumerate(model.COLUMNS):
+            view.setColumnWidth(col, width)
+        view.setSortingEnabled(True)
+        view.sortByColumn(model.sort_col, model.sort_order)
+        return view
+
+    def refresh_processes(self, force=False):
+        if self.tabs.currentWidget() is not self.tab_process \
+                or not self.scheduler.due("processes", force=force):
             return
-
-        filter_txt = self.txt_proc_filter.text().lower()
-        self.tbl_proc.setSortingEnabled(False)
-        self.tbl_proc.setRowCount(0)
-
-        for p in psutil.process_iter(['pid', 'name', 'memory_info', 'status']):
-            try:
-                if filter_txt and filter_txt not in p.info['name'].lower():
-                    continue
-
-                r = self.tbl_proc.rowCount()
-                self.tbl_proc.insertRow(r)
-
-                # PID
-                it_pid = QTableWidgetItem()
-                it_pid.setData(Qt.DisplayRole, p.info['pid'])
-                self.tbl_proc.setItem(r, 0, it_pid)
-
-                # Name
-                self.tbl_proc.setItem(r, 1, QTableWidgetItem(p.info['name']))
-
-                # Mem
-                mem = round(p.info['memory_info'].rss / 1024 / 1024, 1)
-                it_mem = QTableWidgetItem()
-                it_mem.setData(Qt.DisplayRole, mem)
-                self.tbl_proc.setItem(r, 2, it_mem)
-
-                # Status
-                self.tbl_proc.setItem(r, 3, QTableWidgetItem(p.info['status']))
-
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
-        self.tbl_proc.setSortingEnabled(True)
+        with self.self_mon.measure(), PERF.span("ui.refresh_processes"):
+            selected = self.selected_pids()
+            snap = self.sample_processes()
+            if self.proc_model.set_snapshot(snap) and selected:
+                self.select_pids(selected)
+            self.update_hogs()
+            self.refresh_leaks()
+
+    def sample_processes(self):
+        """Take a process snapshot and hand it to history, the trace and /metrics."""
+        snap = self.proc_snap = self.proc_sampler.sample()
+        self.history.record_processes(snap)
+        if self.recorder:
+            self.recorder.processes(snap)
+        return snap
+
+    def selected_pids(self):
+        model = self.proc_model
+        return [model.pid_at(ix.row())
+                for ix in self.tbl_proc.selectionModel().selectedRows()]
+
+    def select_pids(self, pids):
+        model = self.proc_model
+        sel = QItemSelection()
+        last = model.columnCount() - 1
+        for pid in pids:
+            row = model.row_of(pid)
+            if row >= 0:
+                sel.select(model.index(row, 0), model.index(row, last))
+        self.tbl_proc.selectionModel().select(sel, QItemSelectionModel.ClearAndSelect)
+
+    def apply_proc_filter(self):
+        self.proc_filter_timer.stop()
+        edit = self.txt_proc_filter
+        try:
+            query = ProcessQuery(edit.text())
+            error = ""
+        except ValueError as e:
+            query, error = None, str(e)
+        edit.setProperty("invalid", bool(error))
+        edit.style().unpolish(edit)
+        edit.style().polish(edit)
+        if error:
+            QToolTip.showText(edit.mapToGlobal(QPoint(0, edit.height())), error, edit)
+            return  # Keep the last valid filter
+        QToolTip.hideText()
+        self.proc_model.set_filter(query or None)
+
+    def load_leak_watch(self):
+        try:
+            self.leaks = LeakWatch.load()
+        except (OSError, ValueError) as e:
+            self.leaks = LeakWatch()
+            self.log_msg(f"Leak watch patterns not loaded: {e}", "ERROR")
+
+    def apply_leak_patterns(self):
+        patterns = self.txt_leak_patterns.text().replace(";", ",").split(",")
+        old = self.leaks.patterns
+        self.leaks.set_targets(patterns)
+        if self.leaks.patterns == old:
+            return
+        try:
+            self.leaks.save()
+        except OSError as e:
+            self.log_msg(f"Leak watch patterns not saved: {e}", "ERROR")
+        self.log_msg(f"Leak watch patterns: {', '.join(self.leaks.patterns) or 'none'}", "INFO")
+
+    def leak_tick(self, ts):
+        for state, metric in self.leaks.tick(ts):
+            rate, _ = state.rate(metric)
+            minutes = (ts - state.first) / 60
+            msg = (f"Possible {metric} leak: {state.name} (PID {state.proc.pid}) "
+                   f"+{rate:.0f}/h over {minutes:.0f} min, now {state.values[metric]}")
+            self.log_msg(msg, "WARNING")
+            if self.tray:
+                self.tray.showMessage("WindowsTweak", msg, QSystemTrayIcon.Warning)
+
+    def refresh_leaks(self):
+        if self.tab_process in self.tab_builders:
+            return
+        rows = self.leaks.rows()
+        suspects = sum(1 for s in rows if s.flagged)
+        self.lbl_leaks.setText(f"{len(rows)} watched | {suspects} suspect")
+        self.lbl_leaks.setStyleSheet(f"color: {'#ff3e3e' if suspects else '#888'};")
+        tbl = self.tbl_leaks
+        tbl.setRowCount(len(rows))
+        for r, state in enumerate(rows):
+            def rate(metric):
+                if metric in state.denied:
+                    return "denied"
+                per_h, r2 = state.rate(metric)
+                return f"{per_h:+.0f}" if r2 else "-"
+            cells = (state.name, state.proc.pid, state.values.get("handles", "-"),
+                     rate("handles"), state.values.get("threads", "-"), rate("threads"),
+                     state.values.get("files", "-"),
+                     sparkline(self.leak_trend(state.history["handles"])))
+            for c, value in enumerate(cells):
+                item = QTableWidgetItem(str(value))
+                if state.flagged:
+                    item.setForeground(QColor("#ff3e3e"))
+                tbl.setItem(r, c, item)
+
+    @staticmethod
+    def leak_trend(values):
+        # Relative to the lowest sample, or a +50 on 2000 handles is a flat line
+        lo = min(values, default=0)
+        return [v - lo for v in values]
+
+    def update_hogs(self, n=3):
+        hist, snap = self.proc_sampler.history, self.proc_model.snap
+        names = dict(zip(snap.pid, snap.name))
+
+        def fmt(top, unit):
+            # PID 0 is the idle pseudo-process on Windows
+            items = [f"{names[pid]} ({unit(v)})"
+                     for pid, v in top if pid != 0 and pid in names]
+            return ", ".join(items[:n]) or "-"
+        cpu = fmt(hist.top_cpu.top(n + 1), lambda v: f"{v:.1f}%")
+        ram = fmt(hist.top_mem.top(n + 1), lambda v: f"{v / 1048576:.0f} MB")
+        self.lbl_hogs.setText(f"Top CPU: {cpu}  |  Top RAM: {ram}")
 
     def proc_menu(self, pos):
         row = self.tbl_proc.rowAt(pos.y())
         if row < 0:
             return
+        if not self.tbl_proc.selectionModel().isRowSelected(row, QModelIndex()):
+            self.tbl_proc.selectRow(row)
 
-        pid = int(self.tbl_proc.item(row, 0).text())
-        name = self.tbl_proc.item(row, 1).text()
+        pids = self.selected_pids()
+        names = dict(zip(self.proc_model.snap.pid, self.proc_model.snap.name))
+        target = names.get(pids[0], "?") if len(pids) == 1 else f"{len(pids)} processes"
 
         menu = QMenu()
-        act_kill = menu.addAction("❌ Kill Process")
-        act_susp = menu.addAction("⏸ Suspend")
-        act_res = menu.addAction("▶ Resume")
+        menu.addSection(target)
+        actions = {
+            menu.addAction("❌ Kill Process"): ("kill", False),
+            menu.addAction("⏸ Suspend"): ("suspend", False),
+            menu.addAction("▶ Resume"): ("resume", False),
+        }
+        menu.addSeparator()
+        actions.update({
+            menu.addAction("❌ Kill Tree"): ("kill", True),
+            menu.addAction("⏸ Suspend Tree"): ("suspend", True),
+            menu.addAction("▶ Resume Tree"): ("resume", True),
+        })
+        menu.addSeparator()
+        act_watch = menu.addAction("👁 Watch for Leaks")
 
         action = menu.exec_(self.tbl_proc.viewport().mapToGlobal(pos))
+        if action is act_watch:
+            self.leaks.add_pids(pids)
+            self.log_msg(f"Watching {target} for handle/thread/file leaks.", "INFO")
+            self.refresh_leaks()
+            return
+        if action not in actions:
+            return
+        kind, tree = actions[action]
+        if kind == "kill" and (tree or len(pids) > 1):
+            scope = f"{target} and all child processes" if tree else target
+            if QMessageBox.question(self, "Confirm", f"Kill {scope}?") != QMessageBox.Yes:
+                return
+        self.run_process_action(pids, kind, tree, names)
+
+    def run_process_action(self, pids, action, tree, names):
+        self.log_msg(
+            f"{action.capitalize()}{' tree' if tree else ''}: {len(pids)} selected...", "CMD")
+        worker = ProcessActionWorker(pids, action, tree)
+        worker.done.connect(
+            lambda a, ok, failed: self.on_process_action_done(a, ok, failed, names))
+        worker.finished.connect(lambda: self.proc_workers.remove(worker))
+        self.proc_workers.append(worker)
+        worker.start()
 
-        try:
-            p = psutil.Process(pid)
-            if action == act_kill:
-                p.kill()
-                self.log_msg(f"Process {name} killed.", "WARNING")
-            elif action == act_susp:
-                p.suspend()
-                self.log_msg(f"Process {name} suspended.", "INFO")
-            elif action == act_res:
-                p.resume()
-                self.log_msg(f"Process {name} resumed.", "SUCCESS")
-
-            QTimer.singleShot(500, self.refresh_processes)
-        except Exception as e:
-            QMessageBox.critical(
-                self, "Error", f"Action failed: {e}")
+    def on_process_action_done(self, action, ok, failures, names):
+        past = {"kill": "killed", "suspend": "suspended", "resume": "resumed"}[action]
+        if action == "kill":
+            self.proc_model.remove_pids(ok)
+        else:
+            self.proc_model.set_status(
+                ok, "stopped" if action == "suspend" else "running")
+
+        self.log_msg(f"{len(ok)} process(es) {past}, {len(failures)} failed.",
+                     "WARNING" if failures else "SUCCESS")
+        if failures:
+            details = "\n".join(f"{pid} ({names.get(pid, '?')}): {err}"
+                                for pid, err in sorted(failures.items()))
+            box = QMessageBox(QMessageBox.Warning, "Process Action",
+                              f"{len(failures)} process(es) could not be {past}.",
+                              parent=self)
+            box.setDetailedText(details)
+            box.exec_()
 
     # --- TAB 5: HARDWARE ---
     def setup_info(self):
@@ -1234,25 +6568,1116 @@ class UltimateMainWindow(QMainWindow):
         self.txt_hw.setStyleSheet(
             "font-size:12pt; color: #fff; line-height: 1.5;")
 
+        btns = QHBoxLayout()
         btn = QPushButton("🔄 SCAN HARDWARE")
-        btn.clicked.connect(self.scan_hardware)
+        btn.clicked.connect(lambda: self.scan_hardware())
+        btn_full = QPushButton("♻ FULL RESCAN")
+        btn_full.setToolTip("Ignore the cached static data and query WMI again")
+        btn_full.clicked.connect(lambda: self.scan_hardware(force=True))
+        btn_export = QPushButton("💾 EXPORT JSON")
+        btn_export.clicked.connect(self.export_hardware)
+        btns.addWidget(btn)
+        btns.addWidget(btn_full)
+        btns.addWidget(btn_export)
 
         layout.addWidget(self.txt_hw)
-        layout.addWidget(btn)
-        QTimer.singleShot(2000, self.scan_hardware)
+        layout.addLayout(btns)
+        QTimer.singleShot(0, self.scan_hardware)  # Cached facts return quickly
 
-    def scan_hardware(self):
+    def scan_hardware(self, force=False):
+        if getattr(self, "hw_worker", None) and self.hw_worker.isRunning():
+            return
         self.txt_hw.setText("Scanning components... Please wait.")
-        self.hw_worker = HardwareWorker()
+        self.hw_worker = HardwareWorker(self.hw_inventory, force)
         self.hw_worker.info_ready.connect(self.txt_hw.setText)
+        self.hw_worker.inventory_ready.connect(self.on_inventory_ready)
         self.hw_worker.start()
 
+    def on_inventory_ready(self, inv):
+        self.hw_last = inv
+
+    def export_hardware(self):
+        if not self.hw_last:
+            QMessageBox.information(self, "Info", "Run a hardware scan first.")
+            return
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export Hardware Inventory",
+            f"hardware_{platform.node()}.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.hw_inventory.to_json(self.hw_last))
+            self.log_msg(f"Hardware inventory exported to {path}", "SUCCESS")
+        except OSError as e:
+            self.log_msg(f"Export failed: {e}", "ERROR")
+
+    # --- TAB 7: DIAGNOSTICS (hidden) ---
+    DIAG_COLUMNS = ("Hot path", "Calls", "Calls/s", "p50 ms", "p95 ms", "p99 ms",
+                    "Max ms", "Total ms")
+    ALLOC_COLUMNS = ("Allocation site", "Size KB", "Growth KB", "Blocks +/-", "Trend")
+
+    def setup_diagnostics(self):
+        layout = QVBoxLayout(self.tab_diag)
+        self.lag_probe = LoopLagProbe(parent=self)
+
+        h = QHBoxLayout()
+        self.chk_perf = QCheckBox("Record timings")
+        self.chk_perf.toggled.connect(self.set_instrumentation)
+        btn_reset = QPushButton("RESET")
+        btn_reset.clicked.connect(lambda: (PERF.reset(), self.refresh_diagnostics()))
+        btn_dump = QPushButton("DUMP TO FILE")
+        btn_dump.clicked.connect(self.dump_diagnostics)
+        h.addWidget(self.chk_perf)
+        h.addStretch()
+        h.addWidget(btn_reset)
+        h.addWidget(btn_dump)
+        layout.addLayout(h)
+
+        self.tbl_diag = QTableWidget(0, len(self.DIAG_COLUMNS))
+        self.tbl_diag.setHorizontalHeaderLabels(self.DIAG_COLUMNS)
+        self.tbl_diag.verticalHeader().setVisible(False)
+        self.tbl_diag.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tbl_diag.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.tbl_diag)
+
+        h = QHBoxLayout()
+        self.chk_alloc = QCheckBox("Trace allocations (tracemalloc, slows Python down)")
+        self.chk_alloc.toggled.connect(self.set_allocation_tracing)
+        btn_snap = QPushButton("SNAPSHOT NOW")
+        btn_snap.clicked.connect(self.snapshot_allocations)
+        self.lbl_alloc = QLabel()
+        h.addWidget(self.chk_alloc)
+        h.addWidget(self.lbl_alloc, 1)
+        h.addWidget(btn_snap)
+        layout.addLayout(h)
+
+        self.tbl_alloc = QTableWidget(0, len(self.ALLOC_COLUMNS))
+        self.tbl_alloc.setHorizontalHeaderLabels(self.ALLOC_COLUMNS)
+        self.tbl_alloc.verticalHeader().setVisible(False)
+        self.tbl_alloc.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tbl_alloc.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.tbl_alloc)
+
+    def toggle_diagnostics(self):
+        idx = self.tabs.indexOf(self.tab_diag)
+        if idx >= 0:
+            self.tabs.removeTab(idx)
+            self.chk_perf.setChecked(False)  # Nobody is looking: stop recording
+            return
+        self.tabs.addTab(self.tab_diag, "🩺 DIAGNOSTICS")
+        self.tabs.setCurrentWidget(self.tab_diag)
+        self.chk_perf.setChecked(True)
+
+    def set_instrumentation(self, on):
+        PERF.enabled = on
+        if on:
+            PERF.reset()
+            self.lag_probe.start()
+        else:
+            self.lag_probe.stop()
+        self.log_msg(f"Hot-path instrumentation {'enabled' if on else 'disabled'}", "INFO")
+        if on and not PERF_WRAP:
+            self.log_msg("Only spans are timed; start with WT_PERF=1 or --diagnostics "
+                         "to time decorated functions too", "WARNING")
+
+    def refresh_diagnostics(self, force=False):  # Not throttled, so `force` changes nothing
+        if self.tabs.currentWidget() is not self.tab_diag:
+            return
+        report = [(n, r) for n, r in PERF.report().items() if r["count"]]
+        self.tbl_diag.setRowCount(len(report))
+        for row, (name, r) in enumerate(report):
+            values = (name, str(r["count"]), f"{r['rate']:.1f}", f"{r['p50_ms']:.3f}",
+                      f"{r['p95_ms']:.3f}", f"{r['p99_ms']:.3f}", f"{r['max_ms']:.2f}",
+                      f"{r['total_ms']:.0f}")
+            for col, v in enumerate(values):
+                item = QTableWidgetItem(v)
+                if col:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.tbl_diag.setItem(row, col, item)
+
+    def set_allocation_tracing(self, on):
+        if on:
+            self.alloc.start()
+            self.log_msg("Allocation tracing started; sites are compared with this "
+                         "moment every minute.", "INFO")
+        else:
+            self.alloc.stop()
+        self.refresh_allocations()
+
+    def snapshot_allocations(self):
+        if not self.alloc.active:
+            self.chk_alloc.setChecked(True)
+            return
+        self.alloc.sample()
+        self.refresh_allocations()
+
+    def refresh_allocations(self):
+        if self.tab_diag in self.tab_builders:
+            return  # Tab not built yet
+        rss = self.self_mon.last["rss"] / 1048576
+        if not self.alloc.reports:
+            self.lbl_alloc.setText(f"RSS {rss:.0f} / {self.budget.mb} MB")
+            self.tbl_alloc.setRowCount(0)
+            return
+        ts, traced, rows = self.alloc.reports[-1]
+        self.lbl_alloc.setText(
+            f"RSS {rss:.0f} / {self.budget.mb} MB | Python heap {traced / 1048576:.1f} MB | "
+            f"{len(self.alloc.reports)} reports, last {time.strftime('%H:%M:%S', time.localtime(ts))}")
+        self.tbl_alloc.setRowCount(len(rows))
+        for row, (site, size, diff, count) in enumerate(rows):
+            values = (site, f"{size / 1024:.1f}", f"{diff / 1024:+.1f}", f"{count:+d}",
+                      sparkline(self.alloc.trend(site)))
+            for col, v in enumerate(values):
+                item = QTableWidgetItem(v)
+                if 0 < col < 4:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.tbl_alloc.setItem(row, col, item)
+
+    def dump_diagnostics(self):
+        path = os.path.join(
+            DATA_DIR, f"diagnostics_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+        try:
+            os.makedirs(DATA_DIR, exist_ok=True)
+            PERF.dump(path, {"rss": self.self_mon.last["rss"], "budget_mb": self.budget.mb,
+                             "allocations": self.alloc.dump()})
+        except OSError as e:
+            self.log_msg(f"Diagnostics dump failed: {e}", "ERROR")
+            return
+        self.log_msg(f"Diagnostics written to {path}", "SUCCESS")
+
+    # --- TAB 6: CONNECTIONS ---
+    def setup_connections(self):
+        layout = QVBoxLayout(self.tab_conn)
+
+        h = QHBoxLayout()
+        self.txt_conn_filter = QLineEdit()
+        self.txt_conn_filter.setPlaceholderText("Filter process, address or status...")
+        self.chk_conn_pause = QCheckBox("Pause")
+        self.chk_conn_pause.toggled.connect(
+            lambda paused: None if paused else self.refresh_connections(force=True))
+        self.lbl_conn = QLabel()
+        h.addWidget(self.txt_conn_filter)
+        h.addWidget(self.chk_conn_pause)
+        h.addWidget(self.lbl_conn)
+        layout.addLayout(h)
+
+        self.conn_model = ConnectionTableModel(ConnectionTracker())
+        proxy = QSortFilterProxyModel(self)
+        proxy.setSourceModel(self.conn_model)
+        proxy.setFilterKeyColumn(-1)
+        proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.txt_conn_filter.textChanged.connect(proxy.setFilterFixedString)
+
+        self.tbl_conn = QTableView()
+        self.tbl_conn.setModel(proxy)
+        self.tbl_conn.setWordWrap(False)
+        self.tbl_conn.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tbl_conn.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.tbl_conn.verticalHeader().setDefaultSectionSize(22)
+        self.tbl_conn.verticalHeader().hide()
+        hh = self.tbl_conn.horizontalHeader()
+        hh.setSectionResizeMode(QHeaderView.Interactive)
+        hh.setStretchLastSection(True)
+        for col, width in enumerate([180, 70, 60, 220, 220]):
+            self.tbl_conn.setColumnWidth(col, width)
+        self.tbl_conn.setSortingEnabled(True)
+        layout.addWidget(self.tbl_conn)
+
+    def refresh_connections(self, force=False):
+        if self.tabs.currentWidget() is not self.tab_conn or self.chk_conn_pause.isChecked() \
+                or not self.scheduler.due("connections", force=force):
+            return
+        try:
+            with self.self_mon.measure(), PERF.span("ui.refresh_connections"):
+                added, removed, changed = self.conn_model.refresh()
+        except psutil.AccessDenied:
+            self.lbl_conn.setText("Access denied (run as administrator)")
+            return
+        self.lbl_conn.setText(f"{self.conn_model.rowCount()} sockets  "
+                              f"+{added} -{removed} ~{changed}")
+
+
+# ============================================================================
+# BENCHMARKS (python WindowsTweak.py --benchmark [NAME ...])
+# ============================================================================
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def time_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return sorted(samples)
+
+
+def bench_report(label, samples):
+    p50 = samples[len(samples) // 2]
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"  {label:<34} p50 {p50:9.2f} ms   p95 {p95:9.2f} ms   (n={len(samples)})")
+
+
+@benchmark("processes")
+def bench_processes(rows=10000, repeat=20):
+    """Refresh and sort latency of the virtual process view."""
+    app = QApplication.instance() or QApplication(sys.argv)
+    provider = SyntheticProcessProvider(rows)
+    model = ProcessTableModel(provider.history)
+    view = UltimateMainWindow.build_process_view(model)
+    view.resize(1200, 700)
+    view.show()
+    app.processEvents()
+
+    snaps = []
+    bench_report(f"sample ({rows} synthetic rows)",
+                 time_ms(lambda: snaps.append(provider.sample()), repeat))
+
+    def refresh():
+        model.set_snapshot(snaps.pop())
+        view.viewport().grab()
+    bench_report("set_snapshot + repaint", time_ms(refresh, repeat))
+
+    for col, (header, _, _) in enumerate(model.COLUMNS):
+        order = [Qt.AscendingOrder, Qt.DescendingOrder]
+
+        def sort():
+            view.sortByColumn(col, order[0])
+            order.reverse()
+            view.viewport().grab()
+        bench_report(f"sort by {header}", time_ms(sort, 6))
+    view.close()
+
+
+def _uniform_sample(k, cores=16, nics=4, disks=4):
+    """Synthetic telemetry sample whose every value is k (bus tear checks)."""
+    k = float(k)
+    return {"ts": k, "cpu": k, "cpu_cores": [k] * cores, "cpu_core_times": [],
+            "ram": k, "ram_available": k,
+            "net": {f"nic{i}": dict.fromkeys(NetTelemetry.FIELDS, k) for i in range(nics)},
+            "disk_io": {f"disk{i}": dict.fromkeys(DiskTelemetry.METRICS, k)
+                        for i in range(disks)},
+            "partitions": {f"/mnt/{i}": k for i in range(disks)}}
+
+
+def _bus_stress_writer(name, seconds):
+    bus = TelemetryBus.attach(name)
+    end, k = time.monotonic() + seconds, 0
+    while time.monotonic() < end:
+        k += 1
+        bus.publish(_uniform_sample(k))
+    bus.close()
+
+
+@benchmark("bus")
+def bench_bus(seconds=2.0, repeat=200):
+    """Shared-memory bus: reader cost vs sampling in-process, and torn reads."""
+    name = f"wt_bench_{os.getpid()}"
+    bus = TelemetryBus.create(name)
+    try:
+        local = TelemetrySampler()
+        live = local.sample()
+        bench_report("TelemetrySampler.sample (in-process)", time_ms(local.sample, 30))
+        bench_report("publish", time_ms(lambda: bus.publish(live), repeat))
+        reader = BusTelemetry(TelemetryBus.attach(name))
+        bench_report(f"BusTelemetry.sample ({len(bus.keys)} values)",
+                     time_ms(reader.sample, repeat))
+        for _ in range(BUS_SLOTS):
+            bus.publish(live)
+        bench_report(f"history of one key ({BUS_SLOTS} rows)",
+                     time_ms(lambda: reader.bus.history(("cpu",)), 50))
+
+        # Writer flat out in a separate process (spawned, like a real
+        # publisher); every value of one of its samples is equal
+        first = reader.bus.read()[0]
+        writer = multiprocessing.get_context("spawn").Process(
+            target=_bus_stress_writer, args=(name, seconds))
+        writer.start()
+        reads = torn = 0
+        while writer.is_alive():
+            count, s = reader.bus.read()
+            if count == first:
+                continue  # Writer not started yet
+            reads += 1
+            values = {s["ts"], s["cpu"], s["ram"], *s["cpu_cores"],
+                      *(v for r in s["net"].values() for v in r.values()),
+                      *(v for r in s["disk_io"].values() for v in r.values())}
+            torn += len(values) != 1
+        writer.join()
+        published = reader.bus.read()[0] - first
+        print(f"  concurrent: {published / seconds:.0f} publishes/s, "
+              f"{reads / seconds:.0f} reads/s, {torn} torn of {reads} reads")
+        reader.close()
+    finally:
+        bus.close()
+
+
+@benchmark("replay")
+def bench_replay(rows=10000, snapshots=60):
+    """Record a 10k-process trace, then replay it as fast as possible."""
+    import tempfile
+    app = QApplication.instance() or QApplication(sys.argv)
+    provider = SyntheticProcessProvider(rows)
+    telemetry = TelemetrySampler()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.wtr")
+        recorder = TraceRecorder(path)
+        raw = 0
+        record = []
+        for _ in range(snapshots):
+            snap = provider.sample()
+            sample = telemetry.sample()
+            t0 = time.perf_counter()
+            recorder.system(sample)
+            recorder.processes(snap)
+            record.append((time.perf_counter() - t0) * 1000)
+            raw += sum(len(json.dumps(snap.row(i))) for i in range(0, len(snap), 100)) * 100
+        recorder.close()
+        size = os.path.getsize(path)
+        bench_report(f"record ({rows} processes + telemetry)", sorted(record))
+        print(f"  trace {size / 1048576:.1f} MB for {snapshots} snapshots = "
+              f"{size / snapshots / 1024:.0f} KB each ({raw / size:.0f}x smaller than "
+              f"JSON rows)")
+
+        def replay():
+            player = TracePlayer(path, speed=0)
+            telem, procs = player.telemetry(), player.processes()
+            model = ProcessTableModel(procs.history)
+            digest, steps = 0, []
+            while not player.finished:
+                t0 = time.perf_counter()
+                telem.sample()
+                snap = procs.sample()
+                model.set_snapshot(snap)
+                steps.append((time.perf_counter() - t0) * 1000)
+                digest = zlib.crc32(repr((snap.ts, snap.pid, snap.cpu, snap.rss)).encode(), digest)
+            return digest, sorted(steps)
+        first, steps = replay()
+        second, _ = replay()
+        bench_report("replay step (sample + set_snapshot)", steps)
+        print(f"  {len(steps) / (sum(steps) / 1000):.0f} snapshots/s at speed 0; two replays "
+              f"{'identical' if first == second else 'DIFFER'}")
+
+
+@benchmark("leaks")
+def bench_leaks(procs=400, hours=3.0, tick_s=2.0):
+    """Leak detection on scripted counters, and per-tick cost of the watch."""
+    rng = random.Random(7)
+    clock = [0.0]
+    kinds = ("flat", "leak", "step", "sawtooth")
+    fleet = [SyntheticLeakProcess(4 * i + 4, f"{kinds[i % 4]}_{i}.exe", kinds[i % 4],
+                                  clock, rng) for i in range(procs)]
+    watch = LeakWatch(["*"], process_iter=lambda attrs: fleet, budget_s=1.0)
+    first = {}
+    while clock[0] < hours * 3600:
+        for state, _ in watch.tick(clock[0]):
+            first.setdefault(state.proc.pid, clock[0])
+        clock[0] += tick_s
+    print(f"  {procs} scripted processes, {hours:g} h at one tick per {tick_s:g} s:")
+    for kind in kinds:
+        pids = [p.pid for p in fleet if p.kind == kind]
+        hits = [first[pid] for pid in pids if pid in first]
+        when = f", first after {min(hits) / 60:.0f} min" if hits else ""
+        print(f"    {kind:<9} flagged {len(hits):>3}/{len(pids)}{when}")
+
+    # Real processes: every process matches "*"
+    n = sum(1 for _ in psutil.process_iter())
+    for label, period in (("all at once", tick_s), ("staggered", LeakWatch.PERIOD)):
+        watch = LeakWatch(["*"], period=period, budget_s=1.0)
+        watch.tick(0.0)  # Scan and first round
+        t = [0.0]
+
+        def tick():
+            t[0] += tick_s
+            watch.tick(t[0])
+        bench_report(f"tick, {n} live processes, {label}", time_ms(tick, 30))
+    default = LeakWatch(["*"])
+    default.tick(0.0)
+    bench_report(f"first round, {LeakWatch.BUDGET_S * 1000:g} ms budget",
+                 time_ms(lambda: default.tick(default.last_tick + LeakWatch.PERIOD), 10))
+
+
+@benchmark("query")
+def bench_query(rows=10000, repeat=50):
+    """Process queries over a 10k-row snapshot: NumPy masks vs pure Python."""
+    snap = SyntheticProcessProvider(rows).sample()
+    queries = ["proc_1", "name~proc_1|proc_2 mem>500", "user:svc_* status:stopped",
+               "-status:sleeping cpu>=2 io>4", "pid=8|12|16|20"]
+    bench_report("parse + compile (5 queries)",
+                 time_ms(lambda: [ProcessQuery(q) for q in queries], repeat))
+    bench_report("old substring filter (proc_1)", time_ms(
+        lambda: [i for i, n in enumerate(snap.name) if "proc_1" in n.lower()], repeat))
+
+    def fresh(query):
+        snap._derived.clear()  # As on the first query after a refresh
+        return query(snap)
+    modes = [("py", False)] + ([("np", True)] if HAS_NUMPY else [])
+    for q in queries:
+        for label, vectorized in modes:
+            query = ProcessQuery(q, vectorized)
+            bench_report(f"{q[:20]:<20} {label} new", time_ms(lambda: fresh(query), repeat))
+            bench_report(f"{q[:20]:<20} {label} again", time_ms(lambda: query(snap), repeat))
+
+
+@benchmark("wifi")
+def bench_wifi(profiles=60, latency=0.05):
+    """WLAN key extraction, sequential vs pooled, with a recorded-output runner."""
+    names = [f"Office-AP {i}" for i in range(profiles)]
+    listing = "Profiles on interface Wi-Fi:\n\nUser profiles\n-------------\n" + \
+        "".join(f"    All User Profile     : {n}\n" for n in names)
+
+    def fake_netsh(cmd):
+        time.sleep(latency)  # Typical netsh start-up cost
+        if cmd == WLAN_LIST_CMD:
+            return listing
+        name = cmd.split('"')[1]
+        return f"Profile {name} on interface Wi-Fi:\n    Key Content            : pw-{name}\n"
+
+    t0 = time.perf_counter()
+    seq = [parse_wlan_key(fake_netsh(WLAN_KEY_CMD.format(name=n)))
+           for n in parse_wlan_profiles(fake_netsh(WLAN_LIST_CMD))]
+    print(f"  sequential ({profiles} profiles)          {(time.perf_counter() - t0) * 1000:9.1f} ms")
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    got = []
+    worker = WifiWorker(runner=fake_netsh)
+    worker.profile_ready.connect(lambda ssid, key: got.append(key))
+    t0 = time.perf_counter()
+    worker.start()
+    worker.wait()
+    app.processEvents()
+    print(f"  WifiWorker (pool of {worker.max_workers})             {(time.perf_counter() - t0) * 1000:9.1f} ms")
+    assert sorted(got) == sorted(seq)
+
+
+@benchmark("update-reset")
+def bench_update_reset(stop_time=0.6, start_time=0.4):
+    """Windows Update reset on simulated services: sequential net vs concurrent sc."""
+    def log(msg, mtype="INFO"):
+        pass
+
+    async def sequential(runner):
+        for verb in ("stop", "start"):
+            for svc in UPDATE_SERVICES:
+                await runner.run(f"net {verb} {svc}")
+
+    for label, job in (("sequential net stop/start", sequential),
+                       ("reset_windows_update", lambda r: reset_windows_update(r, log))):
+        runner = FakeCommandRunner(UPDATE_SERVICES, stop_time, start_time)
+        t0 = time.perf_counter()
+        asyncio.run(job(runner))
+        ms = (time.perf_counter() - t0) * 1000
+        assert all(runner._state(s.lower()) == "RUNNING" for s in UPDATE_SERVICES)
+        print(f"  {label:<34} {ms:9.1f} ms   ({len(runner.history)} commands)")
+
+
+class DnsStubServer(threading.Thread):
+    """Local stand-in resolver: answers every query after `delay` seconds."""
+
+    def __init__(self, delay=0.0, drop_every=0):
+        super().__init__(daemon=True)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self.delay = delay
+        self.drop_every = drop_every
+        self.count = 0
+
+    def run(self):
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(512)
+            except OSError:
+                return
+            self.count += 1
+            if self.drop_every and self.count % self.drop_every == 0:
+                continue
+            time.sleep(self.delay)
+            # Echo the question back as a response with no answers
+            try:
+                self.sock.sendto(data[:2] + b"\x81\x80" + data[4:], addr)
+            except OSError:
+                return  # Closed while delaying
+
+    def close(self):
+        self.sock.close()
+
+
+@benchmark("dns")
+def bench_dns():
+    """Resolver ranking against local stand-in DNS servers."""
+    stubs = [DnsStubServer(0.002), DnsStubServer(0.010), DnsStubServer(0.001, drop_every=4)]
+    for s in stubs:
+        s.start()
+    servers = [(f"stub {s.delay * 1000:.0f} ms" + (" lossy" if s.drop_every else ""),
+                "127.0.0.1", s.port) for s in stubs]
+    t0 = time.perf_counter()
+    results = benchmark_resolvers(servers, timeout=0.2)
+    print(f"  {len(servers)} resolvers probed in parallel in {(time.perf_counter() - t0) * 1000:.0f} ms")
+    for r in results:
+        print(f"  {r['label']:<20} median {r['median']:6.1f} ms   p95 {r['p95']:6.1f} ms   lost {r['lost']}/{r['sent']}")
+    for s in stubs:
+        s.close()
+
+
+@benchmark("connections")
+def bench_connections(sockets=5000, churn=0.02, polls=30):
+    """Incremental connection table update with a synthetic socket source."""
+    app = QApplication.instance() or QApplication(sys.argv)
+    Conn = namedtuple("Conn", "fd family type laddr raddr status pid")
+    rng = random.Random(7)
+    live = {}
+
+    def spawn():
+        port = rng.randrange(1024, 65535)
+        c = Conn(-1, socket.AF_INET, socket.SOCK_STREAM, ("10.0.0.5", port),
+                 (f"10.1.{rng.randrange(256)}.{rng.randrange(256)}", 443),
+                 "ESTABLISHED", 0)
+        live[(port, c.raddr)] = c
+
+    while len(live) < sockets:
+        spawn()
+
+    def source():
+        for k in rng.sample(list(live), int(sockets * churn)):
+            del live[k]
+        while len(live) < sockets:
+            spawn()
+        return list(live.values())
+
+    model = ConnectionTableModel(ConnectionTracker(source))
+    proxy = QSortFilterProxyModel()
+    proxy.setSourceModel(model)
+    proxy.sort(3)
+    view = QTableView()
+    view.setModel(proxy)
+    view.resize(1000, 600)
+    view.show()
+    bench_report(f"first poll ({sockets} sockets)", time_ms(model.refresh, 1))
+
+    def poll():
+        model.refresh()
+        view.viewport().grab()
+    bench_report(f"incremental poll ({churn:.0%} churn, sorted)", time_ms(poll, polls))
+    view.close()
+
+
+@benchmark("heatmap")
+def bench_heatmap(cores=128, columns=HEATMAP_COLUMNS):
+    """Per-core heatmap: 128 cores x 1 hour of samples."""
+    app = QApplication.instance() or QApplication(sys.argv)
+    Times = namedtuple("Times", "user system idle iowait")
+    rng = random.Random(3)
+    samples = []
+    for _ in range(64):
+        busy = [rng.random() * 100 for _ in range(cores)]
+        samples.append((busy, [Times(b * 0.7, b * 0.2, 100 - b, b * 0.1) for b in busy]))
+
+    hm = CoreHeatmap(cores, columns)
+    hm.resize(1200, 300)
+    hm.show()
+    it = iter(range(columns))
+    bench_report(f"push ({cores} cores, with breakdown)",
+                 time_ms(lambda: hm.push(*samples[next(it) % 64]), columns))
+    bench_report(f"paint {hm.width()}x{hm.height()} (full history)",
+                 time_ms(hm.grab, 50))
+    hm.close()
+
+
+@benchmark("alerts")
+def bench_alerts(rules=200, samples=20000):
+    """Alert engine: 200 rules with 10 min windows over 20k samples."""
+    rng = random.Random(5)
+    engine = AlertEngine(
+        AlertRule(f"r{i}", f"m{i % 20}", (">", "<", "growing")[i % 3],
+                  threshold=50, duration=600, clear=40, cooldown=60)
+        for i in range(rules))
+    level = [50.0] * 20
+    stream = []
+    for t in range(samples):  # Random walk, so rules actually fire and clear
+        level = [min(100.0, max(0.0, v + rng.uniform(-2, 2))) for v in level]
+        stream.append((t, {f"m{j}": v for j, v in enumerate(level)}))
+    t0 = time.perf_counter()
+    events = engine.replay(stream)
+    dt = time.perf_counter() - t0
+    print(f"  {samples} samples x {rules} rules: {dt * 1000:.0f} ms "
+          f"({dt / samples * 1e6:.1f} us/sample), {len(events)} events")
+
+
+@benchmark("metrics")
+def bench_metrics(procs=2000, scrapes=200):
+    """OpenMetrics: per-sample render and scrape latency (2k processes)."""
+    telemetry = TelemetrySampler()
+    sample = telemetry.sample()
+    snap = SyntheticProcessProvider(procs).sample()
+    exporter = MetricsExporter(0, top=0)
+    exporter.snap, exporter.top = snap, METRICS_TOP_N
+    bench_report("render", time_ms(lambda: exporter.publish(sample), 200))
+    url = exporter.url
+    with requests.Session() as s:
+        bench_report(f"scrape ({len(exporter.server.payload)} bytes)",
+                     time_ms(lambda: s.get(url, timeout=5).content, scrapes))
+    exporter.close()
+
+
+@benchmark("export")
+def bench_export(days=7, metrics=24):
+    """History export: a week of 1 Hz telemetry to CSV and columnar."""
+    import tempfile
+    import tracemalloc
+    rng = random.Random(9)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, "history"), retention_days=days + 1)
+        t0 = time.time() - days * 86400
+        names = [f"m{i}" for i in range(metrics)]
+        for t in range(days * 86400):
+            store.record(t0 + t, {n: rng.random() * 100 for n in names})
+        store.close()
+        size = sum(os.path.getsize(p) for p in store.segments("telemetry"))
+        print(f"  store: {days * 86400} samples, {size / 1048576:.0f} MB on disk")
+        for ext in ("csv", "wtc"):
+            out = os.path.join(tmp, f"export.{ext}")
+            start = time.perf_counter()
+            rows = export_history(store, "telemetry", out)
+            dt = time.perf_counter() - start
+            print(f"  {ext}: {rows} rows in {dt:.1f} s, {os.path.getsize(out) / 1048576:.0f} MB")
+        tracemalloc.start()
+        export_history(store, "telemetry", os.path.join(tmp, "traced.wtc"))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  peak Python memory during export: {peak / 1048576:.1f} MB")
+
+
+@benchmark("instrumentation")
+def bench_instrumentation(calls=1_000_000):
+    """Hot-path instrumentation overhead per call, disabled vs enabled."""
+    def raw():
+        pass
+
+    # What @instrumented returns without WT_PERF (raw itself) and with it
+    wrapped = _timed(raw, PERF.histogram("bench.call"))
+
+    def spanned():
+        with PERF.span("bench.span"):
+            pass
+
+    was = PERF.enabled
+    for enabled in (False, True):
+        PERF.enabled = enabled
+        for label, fn in (("no WT_PERF", raw), ("WT_PERF wrapper", wrapped),
+                          ("PERF.span()", spanned)):
+            t0 = time.perf_counter()
+            for _ in range(calls):
+                fn()
+            ns = (time.perf_counter() - t0) / calls * 1e9
+            print(f"  {'enabled ' if enabled else 'disabled'}  {label:<15} {ns:7.0f} ns/call")
+    PERF.enabled = was
+
+
+@benchmark("tools")
+def bench_tools(count=240):
+    """Tool catalog: 240 tools, cold vs cached load and TOOLS tab build."""
+    import tempfile
+    app = QApplication.instance() or QApplication(sys.argv)
+    app.setStyleSheet(STYLESHEET)
+    tools = [{"category": f"Category {i // 12}", "id": f"tool{i}", "name": f"Tool {i}",
+              "type": "zip", "url": f"https://example.invalid/t{i}.zip",
+              "exe_64": f"t{i}.exe", "desc": "Synthetic entry " * 4} for i in range(count)]
+    with tempfile.TemporaryDirectory() as tmp:
+        src, cache = os.path.join(tmp, "tools.json"), os.path.join(tmp, "cache.json")
+        with open(src, "w", encoding="utf-8") as f:
+            json.dump({"tools": tools}, f)
+
+        def cold():
+            os.path.exists(cache) and os.remove(cache)
+            return ToolCatalog.load(src, cache)
+
+        bench_report("load + validate + compile", time_ms(cold, 20))
+        bench_report("load from precompiled cache", time_ms(lambda: ToolCatalog.load(src, cache), 20))
+        catalog = ToolCatalog.load(src, cache)
+
+    def make(tool):
+        return HoverButton(tool, False)
+
+    def build(lazy):
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        container = QWidget()
+        layout = QVBoxLayout(container)
+        sections = [ToolSection(c, t, make) for c, t in catalog.categories.items()]
+        for sec in sections:
+            layout.addWidget(sec)
+        scroll.setWidget(container)
+        scroll.resize(900, 700)
+        scroll.show()
+        app.processEvents()
+        visible = sections[:2] if lazy else sections  # What fits in 700 px
+        for sec in visible:
+            sec.ensure_built()
+        scroll.grab()
+        scroll.close()
+        scroll.deleteLater()
+
+    bench_report(f"TOOLS tab, all {count} buttons", time_ms(lambda: build(False), 5))
+    bench_report("TOOLS tab, visible sections only", time_ms(lambda: build(True), 5))
+    btn = HoverButton(catalog.categories["Category 0"][0], False)
+    bench_report("installed-state restyle (property)",
+                 time_ms(lambda: btn.update_style(not btn.property("installed")), 500))
+
+
+@benchmark("startup")
+def bench_startup(idle_s=10):
+    """Startup: first paint with all tabs eager vs lazy; idle CPU by visible tab."""
+    app = QApplication.instance() or QApplication(sys.argv)
+    app.setStyleSheet(STYLESHEET)
+    me = psutil.Process()
+
+    class FirstPaint(QObject):
+        def __init__(self):
+            super().__init__()
+            self.at = None
+
+        def eventFilter(self, obj, event):
+            if self.at is None and event.type() == QEvent.Paint:
+                self.at = time.perf_counter()
+            return False
+
+    for lazy in (False, True):
+        probe = FirstPaint()
+        app.installEventFilter(probe)
+        t0 = time.perf_counter()
+        win = UltimateMainWindow(lazy_tabs=lazy)
+        win.show()
+        while probe.at is None:
+            app.processEvents()
+        app.removeEventFilter(probe)
+        ttfp = (probe.at - t0) * 1000
+        print(f"  {'lazy ' if lazy else 'eager'} tabs: first paint {ttfp:7.1f} ms")
+
+        # Lazy tabs only change startup; idle cost depends on what is shown.
+        # Off MONITOR (and with no alerts, history or /metrics) telemetry is
+        # sampled every IDLE_SAMPLE_EVERY ticks instead of every tick.
+        for tab, label in ((win.tab_monitor, "MONITOR"), (win.tab_repair, "REPAIR")):
+            if not lazy:
+                break
+            win.tabs.setCurrentWidget(tab)
+            app.processEvents()
+            cpu0, t1 = sum(me.cpu_times()[:2]), time.perf_counter()
+            loop = QEventLoop()
+            QTimer.singleShot(int(idle_s * 1000), loop.quit)
+            loop.exec_()
+            idle = (sum(me.cpu_times()[:2]) - cpu0) / (time.perf_counter() - t1) * 100
+            print(f"  idle on {label:<8} CPU {idle:.2f}% of one core")
+        if lazy and win.telemetry_wanted():
+            print("  (alert rules, history, /metrics or a trace keep sampling on every tab)")
+        if getattr(win, "hw_worker", None):
+            win.hw_worker.wait()
+        win.timer.stop()
+        win.history.close()
+        win.close()
+        win.deleteLater()
+        app.processEvents()
+
+
+def replay_alerts(samples_path, rules_path):
+    """Print the alerts a rule file would have raised over recorded metrics."""
+    engine = AlertEngine.load(rules_path)
+    if not engine.rules:
+        print(f"No rules in {rules_path}")
+        return
+    for event in engine.replay(read_metric_samples(samples_path)):
+        stamp = datetime.datetime.fromtimestamp(event.ts).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"{stamp}  {event.kind:<8} {event.rule.name}  "
+              f"({event.rule.metric} = {event.value:.2f})")
+
+
+def run_soak(seconds, memory_mb=None, tolerance_mb=8.0, warmup=0.2):
+    """Run the monitor's sampling, process/connection refreshes and a stream
+    of synthetic log lines back to back for `seconds`. Returns False if RSS
+    kept growing after the warm-up share of the run."""
+    app = QApplication.instance() or QApplication(sys.argv)
+    app.setStyleSheet(STYLESHEET)
+    win = UltimateMainWindow(memory_mb=memory_mb, lazy_tabs=False)
+    win.show()
+    win.timer.stop()  # Driven below, as fast as the sampler allows
+    win.alloc.start()
+    me = psutil.Process()
+    tabs = (win.tab_monitor, win.tab_process, win.tab_conn)
+    every = min(60.0, seconds / 20)
+    points, i = [], 0
+    t0 = time.monotonic()
+    next_report = t0 + every
+    while time.monotonic() - t0 < seconds:
+        i += 1
+        win.tabs.setCurrentWidget(tabs[(i // 100) % len(tabs)])
+        win.update_monitor()
+        if win.tab_tick:
+            win.tab_tick()
+        win.log_msg(f"soak line {i}: " + "x" * (i % 120), ("INFO", "PROCESS", "CMD")[i % 3])
+        app.processEvents()
+        now = time.monotonic()
+        if now >= next_report:
+            next_report += every
+            gc.collect()
+            win.housekeeping()
+            rss = me.memory_info().rss / 1048576
+            points.append((now - t0, rss))
+            print(f"  {now - t0:7.0f} s  {i:8d} ticks  RSS {rss:6.1f} MB  "
+                  f"Python heap {tracemalloc.get_traced_memory()[0] / 1048576:5.1f} MB", flush=True)
+
+    steady = [p for p in points if p[0] >= warmup * seconds]
+    growth = 0.0
+    if len(steady) >= 3:
+        # Least-squares slope over the steady part, projected over its length
+        n = len(steady)
+        mt = sum(t for t, _ in steady) / n
+        mr = sum(r for _, r in steady) / n
+        var = sum((t - mt) ** 2 for t, _ in steady)
+        slope = sum((t - mt) * (r - mr) for t, r in steady) / var if var else 0.0
+        growth = slope * (steady[-1][0] - steady[0][0])
+    print("  Top growing allocation sites:")
+    for site, size, diff, count in win.alloc.sample()[:5]:
+        print(f"    {site:<40} {diff / 1024:+9.1f} KB  {count:+7d} blocks")
+    win.alloc.stop()
+    win.housekeeping_timer.stop()
+    win.history.close()
+    win.close()
+    win.deleteLater()
+    app.processEvents()
+    ok = growth <= tolerance_mb
+    print(f"  RSS trend after warm-up: {growth:+.1f} MB over "
+          f"{(steady[-1][0] - steady[0][0]) if steady else 0:.0f} s "
+          f"(limit {tolerance_mb:g} MB): {'PASS' if ok else 'FAIL'}")
+    return ok
+
+
+@benchmark("soak")
+def bench_soak(seconds=180, memory_mb=40):
+    """Soak: 3 min of back-to-back sampling and logging on a 40 MB budget."""
+    run_soak(seconds, memory_mb)
+
+
+@benchmark("tool-update")
+def bench_tool_update(files=150, changed=5):
+    """Tool update: full extractall vs delta extraction of a 150-file bundle."""
+    import tempfile
+    rng = random.Random(11)
+    members = {f"bin/tool{i:03d}.exe": rng.randbytes(rng.randint(20_000, 400_000))
+               for i in range(files)}
+    with tempfile.TemporaryDirectory() as tmp:
+        def bundle(name, contents):
+            path = os.path.join(tmp, name)
+            with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as z:
+                for member, data in contents.items():
+                    z.writestr(member, data)
+            return path
+        v1 = bundle("v1.zip", members)
+        names = sorted(members)
+        for n in names[:changed]:
+            members[n] = rng.randbytes(len(members[n]))
+        for n in names[-3:]:
+            del members[n]
+        members["bin/new1.dll"] = rng.randbytes(100_000)
+        members["bin/new2.dll"] = rng.randbytes(100_000)
+        v2 = bundle("v2.zip", members)
+        total = sum(len(d) for d in members.values())
+
+        full, delta, legacy = (os.path.join(tmp, d) for d in ("full", "delta", "legacy"))
+        with zipfile.ZipFile(v1) as z:
+            z.extractall(full)
+            z.extractall(legacy)  # Installed before indexes existed
+        delta_extract(v1, delta)
+
+        t0 = time.perf_counter()
+        with zipfile.ZipFile(v2) as z:
+            z.extractall(full)
+        t_full = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        stats = delta_extract(v2, delta)
+        t_delta = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        delta_extract(v2, legacy)
+        t_legacy = time.perf_counter() - t0
+        print(f"  extractall           {t_full * 1000:8.1f} ms  {total / 1048576:6.1f} MB written")
+        print(f"  delta (indexed)      {t_delta * 1000:8.1f} ms  {stats.written / 1048576:6.1f} MB "
+              f"written  {stats}")
+        print(f"  delta (no index)     {t_legacy * 1000:8.1f} ms  (existing files CRC-checked)")
+
+
+@benchmark("maintenance")
+def bench_maintenance(weeks=4, days=7):
+    """Maintenance: quiet-window placement and pausing a busy child tree."""
+    sched = MaintenanceScheduler(
+        {"health": {"tasks": ["sfc", "dism"], "every_hours": 24, "window_hours": 24}},
+        rng=random.Random(1))
+    sched.record_task("sfc", 2400)
+    sched.record_task("dism", 2700)
+
+    def office(ts):
+        t = time.localtime(ts)
+        if t.tm_wday < 5 and 9 <= t.tm_hour < 18:
+            return 70.0
+        return 30.0 if 18 <= t.tm_hour < 23 else 5.0
+    monday = time.mktime((2024, 1, 1, 10, 0, 0, 0, 0, -1))
+    for ts in range(int(monday - weeks * 7 * 86400), int(monday), 60):
+        sched.observe(ts, office(ts), 0.0)
+    hours = math.ceil(sched.expected_duration(["sfc", "dism"]) / 3600)
+    naive = placed = 0.0
+    for d in range(days):
+        earliest = monday + d * 86400
+        start = sched.plan("health", earliest)
+        load = [office(start + h * 3600) for h in range(hours)]
+        placed += sum(load) / hours
+        naive += sum(office(earliest + h * 3600) for h in range(hours)) / hours
+        print(f"  due {time.strftime('%a %H:%M', time.localtime(earliest))} -> "
+              f"start {time.strftime('%a %H:%M', time.localtime(start))} "
+              f"(load {sum(load) / hours:.0f}%)")
+    print(f"  mean load during run: {placed / days:.1f}% placed vs "
+          f"{naive / days:.1f}% starting when due")
+
+    ctl = TaskControl()
+    child = ctl.spawn([sys.executable, "-c", "while True: pass"])
+    try:
+        time.sleep(0.5)
+        ctl.usage()
+        time.sleep(0.5)
+        running = ctl.usage()[0]
+        ctl.pause()
+        ctl.usage()
+        time.sleep(0.5)
+        paused = ctl.usage()[0]
+        ctl.resume()
+        print(f"  child CPU: {running:.1f}% running, {paused:.1f}% paused")
+        bench_report("pause + resume", time_ms(lambda: (ctl.pause(), ctl.resume()), 50))
+    finally:
+        ctl.resume()
+        child.kill()
+        child.wait()
+
+
+def run_benchmarks(names):
+    for name in names or list(BENCHMARKS):
+        fn = BENCHMARKS.get(name)
+        if fn is None:
+            print(f"Unknown benchmark: {name} (available: {', '.join(BENCHMARKS)})")
+            continue
+        print(f"[{name}] {fn.__doc__}")
+        fn()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="WindowsTweak", description="WindowsTweak maintenance suite")
+    parser.add_argument("--benchmark", nargs="*", metavar="NAME",
+                        help=f"run benchmarks and exit ({', '.join(BENCHMARKS)})")
+    parser.add_argument("--replay-alerts", metavar="SAMPLES",
+                        help="evaluate alert rules over recorded JSON-lines metrics and exit")
+    parser.add_argument("--rules", default=ALERT_RULES_FILE, metavar="FILE",
+                        help="alert rule file for --replay-alerts and --headless")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help=f"serve OpenMetrics on /metrics (default port {METRICS_PORT})")
+    parser.add_argument("--metrics-bind", default="127.0.0.1", metavar="ADDR",
+                        help="address for the metrics endpoint (0.0.0.0 for remote scrapers)")
+    parser.add_argument("--export", metavar="PATH",
+                        help="export recorded history to PATH (.csv or .wtc) and exit")
+    parser.add_argument("--kind", choices=HistoryStore.KINDS, default="telemetry",
+                        help="history to export (default: telemetry); processes holds "
+                             f"the top {HISTORY_TOP_PROCS} by CPU and by RAM per sample")
+    parser.add_argument("--since", metavar="WHEN",
+                        help="export start: 24h, 7d, ... ago or an ISO date/time")
+    parser.add_argument("--until", metavar="WHEN", help="export end (default: now)")
+    parser.add_argument("--catalog", metavar="FILE",
+                        help="tool catalog (.json or .toml) instead of WindowsTweakData/tools.*")
+    parser.add_argument("--diagnostics", action="store_true",
+                        help="start with hot-path timings on and the DIAGNOSTICS tab open "
+                             "(Ctrl+Shift+D toggles it)")
+    parser.add_argument("--history", action="store_true",
+                        help=f"record telemetry and the top {HISTORY_TOP_PROCS} processes by "
+                             "CPU and by RAM to WindowsTweakData/history")
+    parser.add_argument("--headless", action="store_true",
+                        help="no window: sample, evaluate alerts and serve metrics")
+    parser.add_argument("--memory-budget", type=int, metavar="MB",
+                        help=f"RSS target; console and history buffers shrink to fit "
+                             f"(default {MemoryBudget.DEFAULT_MB})")
+    parser.add_argument("--soak", type=float, metavar="HOURS",
+                        help="run sampling and logging flat out for HOURS and exit "
+                             "non-zero if memory keeps growing")
+    parser.add_argument("--record", metavar="TRACE",
+                        help="record sampled metrics and process snapshots to TRACE (.wtr)")
+    parser.add_argument("--replay", metavar="TRACE",
+                        help="feed a recorded trace to the window or --headless "
+                             "instead of sampling this machine")
+    parser.add_argument("--replay-speed", type=float, default=1.0, metavar="X",
+                        help="replay at X times the recorded pace; 0 = as fast as possible")
+    parser.add_argument("--bus", action="store_true",
+                        help="read telemetry from the shared-memory bus (starting its "
+                             "publisher if needed) instead of sampling in this process")
+    parser.add_argument("--bus-serve", action="store_true",
+                        help="run the bus publisher (exits a minute after the last reader)")
+    parser.add_argument("--bus-watch", action="store_true",
+                        help="print each sample published on the bus")
+    parser.add_argument("--bus-name", default=BUS_NAME, metavar="NAME",
+                        help=f"shared memory name of the bus (default {BUS_NAME})")
+    # Anything unknown (e.g. -style) is left for Qt
+    return parser.parse_known_args(argv[1:])
+
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    args, qt_args = parse_args(sys.argv)
+    if args.benchmark is not None:
+        run_benchmarks(args.benchmark)
+        sys.exit(0)
+    if args.replay_alerts:
+        replay_alerts(args.replay_alerts, args.rules)
+        sys.exit(0)
+    if args.export:
+        try:
+            n = export_history(HistoryStore(), args.kind, args.export,
+                               parse_when(args.since), parse_when(args.until))
+        except (OSError, ValueError) as e:
+            sys.exit(f"Export failed: {e}")
+        print(f"Exported {n} {args.kind} rows to {args.export}")
+        sys.exit(0)
+    if args.soak:
+        sys.exit(0 if run_soak(args.soak * 3600, args.memory_budget) else 1)
+    if args.bus_serve:
+        run_bus(args.bus_name)
+        sys.exit(0)
+    if args.bus_watch:
+        try:
+            watch_bus(args.bus_name)
+        except (OSError, ValueError) as e:
+            sys.exit(f"Bus: {e}")
+        sys.exit(0)
+    try:
+        trace = TracePlayer(args.replay, args.replay_speed) if args.replay else None
+        recorder = TraceRecorder(args.record) if args.record else None
+    except (OSError, ValueError) as e:
+        sys.exit(f"Trace: {e}")
+    try:
+        bus = connect_bus(args.bus_name) if args.bus and not trace else None
+    except (OSError, ValueError) as e:
+        sys.exit(f"Bus: {e}")
+    if args.headless:
+        run_headless(args.metrics_port or METRICS_PORT, args.metrics_bind, rules_path=args.rules,
+                     trace=trace, recorder=recorder, bus=bus, record_history=args.history)
+        sys.exit(0)
+
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setStyle("Fusion")
     app.setStyleSheet(STYLESHEET)
 
-    win = UltimateMainWindow()
+    win = UltimateMainWindow(args.metrics_port, args.metrics_bind, args.diagnostics,
+                             args.catalog, memory_mb=args.memory_budget, trace=trace,
+                             recorder=recorder, bus=bus, record_history=args.history)
     win.show()
     sys.exit(app.exec_())
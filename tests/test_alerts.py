@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+import WindowsTweak as wt
+
+
+def feed(rule, points):
+    """[(ts, value)] -> [(ts, event)] for the non-empty events."""
+    out = []
+    for ts, value in points:
+        kind = rule.feed(ts, value)
+        if kind:
+            out.append((ts, kind))
+    return out
+
+
+def test_fires_only_after_the_whole_window():
+    rule = wt.AlertRule("hot", "cpu", ">", 90, duration=10)
+    events = feed(rule, [(t, 95) for t in range(0, 12)])
+    assert events == [(10, "FIRED")]
+    assert rule.active
+
+
+def test_dip_restarts_the_window():
+    rule = wt.AlertRule("hot", "cpu", ">", 90, duration=10)
+    points = [(t, 95) for t in range(0, 8)] + [(8, 50)] + [(t, 95) for t in range(9, 20)]
+    assert feed(rule, points) == [(19, "FIRED")]  # First window without the dip
+
+
+def test_hysteresis_and_cooldown():
+    rule = wt.AlertRule("hot", "cpu", ">", 90, duration=0, clear=80, cooldown=60)
+    assert feed(rule, [(0, 95), (1, 85), (2, 79)]) == [(0, "FIRED"), (2, "CLEARED")]
+    # Back over the threshold inside the cooldown: stays quiet
+    assert feed(rule, [(30, 95), (40, 79)]) == []
+    assert feed(rule, [(61, 95)]) == [(61, "FIRED")]
+
+
+def test_below_threshold_rule():
+    rule = wt.AlertRule("low ram", "ram_available_mb", "<", 1024, duration=5, clear=1500)
+    events = feed(rule, [(0, 900), (3, 800), (5, 700), (6, 1200), (7, 1600)])
+    assert events == [(5, "FIRED"), (7, "CLEARED")]
+
+
+def test_growing_rule():
+    rule = wt.AlertRule("leak", "proc_rss_mb:app.exe", "growing", 100, duration=60)
+    rising = [(t, 500 + t * 2) for t in range(0, 121, 10)]
+    assert feed(rule, rising) == [(60, "FIRED")]
+    assert feed(rule, [(130, 400)]) == [(130, "CLEARED")]
+
+
+def test_engine_clears_when_metric_disappears():
+    rule = wt.AlertRule("rss", "proc_rss_mb:app.exe", ">", 100, cooldown=0)
+    engine = wt.AlertEngine([rule])
+    assert [e.kind for e in engine.feed(0, {"proc_rss_mb:app.exe": 200})] == ["FIRED"]
+    gone = engine.feed(1, {})
+    assert [(e.kind, e.value) for e in gone] == [("CLEARED", 200)]
+    assert engine.active == []
+    assert engine.feed(2, {}) == []
+
+
+def test_process_pattern_is_case_insensitive():
+    rule = wt.AlertRule("chrome", "proc_rss_mb:Chrome*", ">", 1)
+    engine = wt.AlertEngine([rule])
+    assert rule.metric == "proc_rss_mb:chrome*"
+    assert engine.probe.patterns == ["chrome*"]
+    events = engine.feed(0, {"proc_rss_mb:chrome*": 50})
+    assert [e.kind for e in events] == ["FIRED"]
+
+
+def test_replay_matches_live_feed():
+    rules = lambda: [wt.AlertRule("hot", "cpu", ">", 90, duration=2, cooldown=0)]
+    samples = [(t, {"cpu": 95 if 5 <= t < 10 else 10}) for t in range(15)]
+    live = wt.AlertEngine(rules())
+    fed = [e for ts, m in samples for e in live.feed(ts, m)]
+    replayed = wt.AlertEngine(rules()).replay(samples)
+    assert [(e.kind, e.ts) for e in fed] == [(e.kind, e.ts) for e in replayed] \
+        == [("FIRED", 7), ("CLEARED", 10)]
+
+
+def test_load_rules(tmp_path):
+    assert wt.AlertEngine.load(str(tmp_path / "missing.json")).rules == []
+    path = tmp_path / "alerts.json"
+    path.write_text(json.dumps({"rules": [
+        {"name": "hot", "metric": "cpu", "op": ">", "threshold": 90, "for": 60}]}))
+    rule, = wt.AlertEngine.load(str(path)).rules
+    assert (rule.name, rule.duration, rule.cooldown) == ("hot", 60.0, 300.0)
+
+
+@pytest.mark.parametrize("rule, message", [
+    ({"name": "x", "metric": "cpu", "op": ">="}, "unknown op"),
+    ({"name": "x", "op": ">"}, "missing 'metric'"),
+    ({"name": "x", "metric": "cpu", "op": ">", "threshold": "high"}, "Alert rule 'x'"),
+])
+def test_invalid_rules(rule, message):
+    with pytest.raises(ValueError, match=message):
+        wt.AlertRule.from_dict(rule)
@@ -0,0 +1,129 @@
+import math
+import os
+import struct
+import time
+
+import pytest
+
+import WindowsTweak as wt
+
+
+@pytest.fixture
+def bus_pair():
+    """Factory for a (writer, reader) pair on a fresh segment."""
+    opened = []
+
+    def make(**kwargs):
+        name = f"wt_test_{os.getpid()}_{len(opened)}"
+        writer = wt.TelemetryBus.create(name, **kwargs)
+        opened.append(writer)
+        reader = wt.TelemetryBus.attach(name)
+        opened.insert(0, reader)  # Readers close before the owner unlinks
+        return writer, reader
+
+    yield make
+    for bus in opened:
+        bus.close()
+
+
+def seq(bus):
+    return struct.unpack_from("<Q", bus.buf, bus.SEQ)[0]
+
+
+def nan_as_none(values):
+    return [None if math.isnan(v) else v for v in values]
+
+
+def test_read_before_and_after_publish(bus_pair):
+    writer, reader = bus_pair()
+    assert reader.read() == (0, None)
+    writer.publish(wt._uniform_sample(7))
+    count, s = reader.read()
+    assert count == 1
+    assert s["cpu"] == 7 and s["cpu_cores"] == [7.0] * 16
+    assert s["net"]["nic3"]["bytes_sent"] == 7
+    assert s["disk_io"]["disk0"]["latency_ms"] == 7
+    assert s["partitions"] == {f"/mnt/{i}": 7 for i in range(4)}
+    assert seq(writer) == 2
+
+
+def test_history_wraps_around(bus_pair):
+    writer, reader = bus_pair(slots=4)
+    for k in range(1, 7):
+        writer.publish(wt._uniform_sample(k))
+    assert reader.history(("cpu",)) == [3.0, 4.0, 5.0, 6.0]
+    assert reader.history(("cpu",), n=2) == [5.0, 6.0]
+    assert reader.history(("no", "such key")) == []
+
+
+def test_absent_keys_read_back_as_nan(bus_pair):
+    writer, reader = bus_pair(slots=4)
+    for k, nics in ((1, 4), (2, 2), (3, 3)):
+        writer.publish(wt._uniform_sample(k, nics=nics))
+    assert nan_as_none(reader.history(("net", "nic3", "bytes_recv"))) == [1.0, None, None]
+    assert "nic3" not in reader.read()[1]["net"]
+
+
+def test_late_keys_have_no_history_before_they_appeared(bus_pair):
+    writer, reader = bus_pair(slots=4)
+    for k, nics in ((1, 1), (2, 1), (3, 2)):
+        writer.publish(wt._uniform_sample(k, nics=nics))
+    assert nan_as_none(reader.history(("net", "nic1", "bytes_recv"))) == [None, None, 3.0]
+
+
+def test_exhausted_columns_start_over(bus_pair):
+    writer, reader = bus_pair(capacity=100)
+    writer.publish(wt._uniform_sample(1))  # 80 values
+    assert reader.read()[0] == 1
+    renamed = wt._uniform_sample(2)
+    renamed["net"] = {f"wlan{i}": v for i, v in enumerate(renamed["net"].values())}
+    writer.publish(renamed)  # 32 new columns do not fit next to the old 80
+    count, s = reader.read()
+    assert count == 1  # The history restarted with the new schema
+    assert sorted(s["net"]) == ["wlan0", "wlan1", "wlan2", "wlan3"]
+    assert reader.history(("cpu",)) == [2.0]
+    assert len(reader.keys) == 80
+    renamed["disk_io"]["disk9"] = dict.fromkeys(wt.DiskTelemetry.METRICS, 3.0)
+    writer.publish(renamed)  # Its column held a value from before the reset
+    assert nan_as_none(reader.history(("disk", "disk9", "busy"))) == [None, 3.0]
+
+
+def test_oversized_sample_leaves_the_bus_usable(bus_pair):
+    writer, reader = bus_pair(capacity=64)
+    writer.publish(wt._uniform_sample(1, nics=1, disks=1))
+    with pytest.raises(ValueError, match="80 values"):
+        writer.publish(wt._uniform_sample(2))
+    assert seq(writer) == 2  # Never left odd
+    assert reader.read()[1]["cpu"] == 1
+    assert not reader.dead
+    writer.publish(wt._uniform_sample(3, nics=1, disks=1))
+    assert reader.read()[0] == 2
+
+
+def test_reader_gives_up_on_a_stuck_writer(bus_pair):
+    writer, reader = bus_pair()
+    writer.publish(wt._uniform_sample(1))
+    last = reader.read()
+    writer._set("<Q", writer.SEQ, seq(writer) + 1)  # Died mid-write
+    t0 = time.monotonic()
+    assert reader.read() == last
+    assert reader.dead
+    assert time.monotonic() - t0 < wt.BUS_RETRY_S + 0.5
+    assert reader.history(("cpu",)) == []
+    writer._set("<Q", writer.SEQ, seq(writer) + 1)
+    writer.publish(wt._uniform_sample(2))
+    assert reader.read()[1]["cpu"] == 2
+    assert not reader.dead
+
+
+def test_bus_telemetry_replays_rates(bus_pair):
+    writer, reader = bus_pair()
+    telemetry = wt.BusTelemetry(reader)
+    with pytest.raises(ValueError, match="not published"):
+        telemetry.sample()
+    writer.publish(dict(wt._uniform_sample(5), ts=time.time()))
+    s = telemetry.sample()
+    assert s["ram"] == 5 and not telemetry.stale
+    assert list(telemetry.net.history["nic0"]) == [(5.0, 5.0)]
+    telemetry.sample()  # Same sample: graphs do not grow
+    assert len(telemetry.net.history["nic0"]) == 1
@@ -0,0 +1,112 @@
+import json
+import os
+
+import pytest
+
+import WindowsTweak as wt
+
+ZIP_TOOL = {"id": "cpuz", "name": "CPU-Z", "type": "zip",
+            "url": "https://example.invalid/cpuz.zip", "exe_64": "cpuz_x64.exe",
+            "exe_32": "cpuz_x32.exe"}
+CMD_TOOL = {"id": "flushdns", "name": "Flush DNS", "type": "cmd", "cmd": "ipconfig /flushdns"}
+
+
+def write_catalog(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return str(path)
+
+
+def test_builtin_catalog_is_valid():
+    catalog = wt.ToolCatalog.builtin()
+    assert len(catalog) == sum(len(tools) for tools in wt.TOOLS_DB.values())
+    assert catalog.source == "built-in" and not catalog.cached
+
+
+def test_both_catalog_shapes_compile_alike():
+    by_category = wt.validate_tools({"Hardware": [ZIP_TOOL], "Network": [CMD_TOOL]})
+    flat = wt.validate_tools({"tools": [dict(ZIP_TOOL, category="Hardware"),
+                                        dict(CMD_TOOL, category="Network")]})
+    assert by_category == flat
+    cmd = by_category["Network"][0]
+    assert cmd["desc"] == "" and cmd["exe"] == ""
+    assert "Flush DNS" in cmd["html"]
+
+
+def test_arch_specific_exe():
+    assert wt.compile_tool(ZIP_TOOL, is_64=True)["exe"] == "cpuz_x64.exe"
+    assert wt.compile_tool(ZIP_TOOL, is_64=False)["exe"] == "cpuz_x32.exe"
+    only_64 = {k: v for k, v in ZIP_TOOL.items() if k != "exe_32"}
+    assert wt.compile_tool(only_64, is_64=False)["exe"] == "cpuz_x64.exe"
+
+
+@pytest.mark.parametrize("tools, problem", [
+    ([{"id": "x", "name": "X", "type": "zip"}], "missing url, exe_64"),
+    ([{"id": "x", "name": "X", "type": "cmd"}], "missing cmd"),
+    ([{"id": "x", "name": "X", "type": "msi"}], "unknown type 'msi'"),
+    ([CMD_TOOL, dict(CMD_TOOL, name="Again")], "duplicate id 'flushdns'"),
+    (["not a tool"], "expected a table/object"),
+])
+def test_invalid_tools(tools, problem):
+    with pytest.raises(ValueError, match=problem):
+        wt.validate_tools({"Tools": tools})
+
+
+def test_every_problem_is_reported_and_capped():
+    with pytest.raises(ValueError) as err:
+        wt.validate_tools({"Tools": [{"id": f"t{i}"} for i in range(12)]})
+    assert str(err.value).count("missing") == 10
+    assert str(err.value).endswith("(+2 more)")
+    with pytest.raises(ValueError, match="must be a list"):
+        wt.validate_tools({"Tools": CMD_TOOL})
+
+
+def test_load_caches_until_the_source_changes(tmp_path):
+    path = write_catalog(tmp_path / "tools.json", {"Network": [CMD_TOOL]})
+    cache = str(tmp_path / "cache" / "tools_cache.json")
+    first = wt.ToolCatalog.load(path, cache_path=cache)
+    assert not first.cached and os.path.exists(cache)
+    second = wt.ToolCatalog.load(path, cache_path=cache)
+    assert second.cached and second.categories == first.categories
+
+    write_catalog(path, {"Network": [CMD_TOOL, dict(CMD_TOOL, id="flush2")]})
+    third = wt.ToolCatalog.load(path, cache_path=cache)
+    assert not third.cached and len(third) == 2
+
+
+def test_touched_source_and_corrupt_cache_are_reparsed(tmp_path):
+    path = write_catalog(tmp_path / "tools.json", {"Network": [CMD_TOOL]})
+    cache = str(tmp_path / "tools_cache.json")
+    wt.ToolCatalog.load(path, cache_path=cache)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert not wt.ToolCatalog.load(path, cache_path=cache).cached
+    with open(cache, "w") as f:
+        f.write("{not json")
+    assert not wt.ToolCatalog.load(path, cache_path=cache).cached
+    assert wt.ToolCatalog.load(path, cache_path=cache).cached
+
+
+def test_invalid_source_raises_and_keeps_no_cache(tmp_path):
+    path = write_catalog(tmp_path / "tools.json", {"Network": [{"id": "x"}]})
+    cache = str(tmp_path / "tools_cache.json")
+    with pytest.raises(ValueError, match="missing name, type"):
+        wt.ToolCatalog.load(path, cache_path=cache)
+    assert not os.path.exists(cache)
+    with open(path, "w") as f:
+        f.write("{")
+    with pytest.raises(ValueError, match="tools.json"):
+        wt.ToolCatalog.load(path, cache_path=cache)
+
+
+def test_toml_catalog(tmp_path):
+    path = tmp_path / "tools.toml"
+    path.write_text('[[tools]]\ncategory = "Network"\nid = "flushdns"\nname = "Flush DNS"\n'
+                    'type = "cmd"\ncmd = "ipconfig /flushdns"\n', encoding="utf-8")
+    catalog = wt.ToolCatalog.load(str(path), cache_path=str(tmp_path / "cache.json"))
+    assert catalog.categories == wt.validate_tools({"Network": [CMD_TOOL]})
+
+
+def test_missing_catalog_falls_back_to_builtin(tmp_path, monkeypatch):
+    monkeypatch.setattr(wt, "TOOL_CATALOG_FILES", [str(tmp_path / "absent.json")])
+    assert wt.ToolCatalog.load().source == "built-in"
@@ -0,0 +1,93 @@
+import socket
+from collections import namedtuple
+
+import WindowsTweak as wt
+
+Conn = namedtuple("Conn", "pid family type laddr raddr status")
+
+
+def tcp(pid, lport, rport=None, status="ESTABLISHED"):
+    raddr = ("10.0.0.1", rport) if rport else ()
+    return Conn(pid, socket.AF_INET, socket.SOCK_STREAM, ("127.0.0.1", lport), raddr, status)
+
+
+def key(conn):
+    return conn.pid, conn.family, conn.type, tuple(conn.laddr), tuple(conn.raddr)
+
+
+def tracker_for(polls, names=None):
+    feed = iter(polls)
+    tracker = wt.ConnectionTracker(source=lambda: next(feed))
+    names = names or {}
+    tracker.name = lambda pid: names.get(pid, "?")
+    return tracker
+
+
+def test_first_poll_adds_everything():
+    tracker = tracker_for([[tcp(1, 80), tcp(2, 443, 5000)]])
+    added, removed, changed = tracker.poll()
+    assert [status for _, status in added] == ["ESTABLISHED", "ESTABLISHED"]
+    assert (removed, changed) == ([], [])
+
+
+def test_diff_reports_added_removed_and_changed():
+    a, b, c = tcp(1, 80), tcp(2, 443, 5000), tcp(3, 8080)
+    tracker = tracker_for([[a, b], [a._replace(status="CLOSE_WAIT"), c]])
+    tracker.poll()
+    added, removed, changed = tracker.poll()
+    assert added == [(key(c), "ESTABLISHED")]
+    assert removed == [key(b)]
+    assert changed == [(key(a), "CLOSE_WAIT")]
+
+
+def test_unchanged_poll_is_empty():
+    conns = [tcp(1, 80), tcp(2, 443, 5000)]
+    tracker = tracker_for([conns, list(conns)])
+    tracker.poll()
+    assert tracker.poll() == ([], [], [])
+
+
+def test_name_cache_forgets_pids_without_sockets(monkeypatch):
+    looked_up = []
+
+    class Process:
+        def __init__(self, pid):
+            looked_up.append(pid)
+            if pid == 3:
+                raise wt.psutil.NoSuchProcess(pid)
+            self.pid = pid
+
+        def name(self):
+            return f"p{self.pid}.exe"
+
+    monkeypatch.setattr(wt.psutil, "Process", Process)
+    feed = iter([[tcp(1, 80), tcp(3, 81)], [tcp(1, 80)]])
+    tracker = wt.ConnectionTracker(source=lambda: next(feed))
+    tracker.poll()
+    assert [tracker.name(1), tracker.name(1), tracker.name(3), tracker.name(None)] == \
+        ["p1.exe", "p1.exe", "?", "?"]
+    assert looked_up == [1, 3]
+    tracker.poll()
+    assert set(tracker.names) == {1}
+
+
+def test_record_formats_ipv6_and_listening():
+    tracker = tracker_for([], names={7: "svc.exe"})
+    udp6 = (7, socket.AF_INET6, socket.SOCK_DGRAM, ("::1", 53), ())
+    assert tracker.record(udp6, "NONE") == ["svc.exe", 7, "UDP6", "[::1]:53", "", "NONE"]
+
+
+def test_model_applies_diffs_in_place(qapp):
+    a, b, c, d = tcp(1, 80), tcp(2, 81), tcp(3, 82), tcp(4, 83)
+    tracker = tracker_for([[a, b, c], [a, c._replace(status="TIME_WAIT"), d], [a, c, d]])
+    model = wt.ConnectionTableModel(tracker)
+    assert model.refresh() == (3, 0, 0)
+    assert not model.fresh  # The initial listing is not highlighted
+    assert model.refresh() == (1, 1, 1)
+    assert [row[0][1] for row in model.rows] == [1, 3, 4]
+    assert model.pos == {row[1]: i for i, row in enumerate(model.rows)}
+    assert model.rows[1][0][5] == "TIME_WAIT"
+    assert model.data(model.index(2, 0), wt.Qt.BackgroundRole) is not None
+    model.refresh()
+    assert model.rows[1][0][5] == "ESTABLISHED"
+    assert model.rowCount() == 3
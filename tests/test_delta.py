@@ -0,0 +1,136 @@
+import json
+import os
+import zipfile
+import zlib
+
+import pytest
+
+import WindowsTweak as wt
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, "w") as z:
+        for name, data in members.items():
+            z.writestr(name, data)
+    return str(path)
+
+
+def tree(root):
+    """{relative path: bytes} of every file under `root`, index excluded."""
+    out = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            if name == wt.TOOL_INDEX_FILE:
+                continue
+            path = os.path.join(dirpath, name)
+            with open(path, "rb") as f:
+                out[os.path.relpath(path, root).replace(os.sep, "/")] = f.read()
+    return out
+
+
+def index(dest):
+    with open(os.path.join(dest, wt.TOOL_INDEX_FILE), encoding="utf-8") as f:
+        return json.load(f)["files"]
+
+
+V1 = {"tool.exe": b"exe v1" * 100, "lib/a.dll": b"a" * 500, "lib/old.dll": b"old",
+      "readme.txt": b"hello"}
+V2 = {"tool.exe": b"exe v2" * 100, "lib/a.dll": b"a" * 500, "readme.txt": b"hello",
+      "lib/new.dll": b"new"}
+
+
+@pytest.fixture
+def installed(tmp_path):
+    dest = str(tmp_path / "tool")
+    wt.delta_extract(make_zip(tmp_path / "v1.zip", V1), dest)
+    return dest
+
+
+def test_first_install(tmp_path, installed):
+    assert tree(installed) == V1
+    assert set(index(installed)) == set(V1)
+
+
+def test_update_writes_only_what_changed(tmp_path, installed):
+    with open(os.path.join(installed, "settings.ini"), "wb") as f:
+        f.write(b"user data")
+    stats = wt.delta_extract(make_zip(tmp_path / "v2.zip", V2), installed)
+    assert stats == wt.DeltaStats(added=1, changed=1, removed=1, unchanged=2,
+                                  written=len(V2["tool.exe"]) + len(V2["lib/new.dll"]))
+    assert tree(installed) == dict(V2, **{"settings.ini": b"user data"})
+    assert set(index(installed)) == set(V2)
+
+
+def test_unchanged_archive_writes_nothing(tmp_path, installed):
+    stats = wt.delta_extract(make_zip(tmp_path / "again.zip", V1), installed)
+    assert (stats.unchanged, stats.written) == (len(V1), 0)
+
+
+def test_removal_prunes_emptied_directories(tmp_path, installed):
+    wt.delta_extract(make_zip(tmp_path / "flat.zip", {"tool.exe": V1["tool.exe"]}), installed)
+    assert tree(installed) == {"tool.exe": V1["tool.exe"]}
+    assert not os.path.exists(os.path.join(installed, "lib"))
+
+
+def test_unsafe_names_are_skipped(tmp_path):
+    dest = tmp_path / "tool"
+    stats = wt.delta_extract(make_zip(tmp_path / "evil.zip", {
+        "../escape.txt": b"x", "sub/../../up.txt": b"x", "ok.txt": b"fine"}), str(dest))
+    assert stats.added == 1
+    assert tree(str(dest)) == {"ok.txt": b"fine"}
+    assert not (tmp_path / "escape.txt").exists() and not (tmp_path / "up.txt").exists()
+
+
+def test_legacy_folder_without_index_is_crc_checked(tmp_path):
+    dest = str(tmp_path / "tool")
+    v1 = make_zip(tmp_path / "v1.zip", V1)
+    with zipfile.ZipFile(v1) as z:
+        z.extractall(dest)  # Unpacked by an older version
+    with open(os.path.join(dest, "readme.txt"), "wb") as f:
+        f.write(b"HELLO")  # Same size, different content
+    stats = wt.delta_extract(make_zip(tmp_path / "v2.zip", V2), dest)
+    assert (stats.changed, stats.unchanged, stats.removed) == (2, 1, 0)
+    assert tree(dest)["readme.txt"] == b"hello"
+    assert "lib/old.dll" in tree(dest)  # Not ours to remove without an index
+    assert set(index(dest)) == set(V2)
+
+
+def test_failed_write_cleans_up_and_keeps_the_index_true(tmp_path, installed, monkeypatch):
+    real_replace = os.replace
+
+    def replace(src, dst):
+        if dst.endswith("tool.exe"):
+            raise PermissionError(13, "Access is denied", dst)  # Tool still running
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(wt.os, "replace", replace)
+    # lib/new.dll is written before tool.exe fails
+    v2 = make_zip(tmp_path / "v2.zip", {"lib/new.dll": V2["lib/new.dll"],
+                                        "tool.exe": V2["tool.exe"]})
+    with pytest.raises(PermissionError):
+        wt.delta_extract(v2, installed)
+    files = tree(installed)
+    assert not [name for name in files if name.endswith(".wt-new")]
+    assert files["tool.exe"] == V1["tool.exe"] and files["lib/new.dll"] == b"new"
+    assert index(installed) == {
+        name: [zlib.crc32(data), len(data)]
+        for name, data in dict(V1, **{"lib/new.dll": V2["lib/new.dll"]}).items()}
+
+    monkeypatch.setattr(wt.os, "replace", real_replace)
+    stats = wt.delta_extract(v2, installed)
+    assert (stats.added, stats.changed, stats.unchanged, stats.removed) == (0, 1, 1, 3)
+    assert tree(installed) == {"lib/new.dll": b"new", "tool.exe": V2["tool.exe"]}
+
+
+def test_bad_crc_is_not_left_half_written(tmp_path, installed):
+    path = make_zip(tmp_path / "v2.zip", dict(V1, **{"lib/a.dll": b"b" * 500}))
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data.replace(b"b" * 500, b"b" * 499 + b"c"))
+    with pytest.raises(zipfile.BadZipFile):
+        wt.delta_extract(path, installed)
+    files = tree(installed)
+    assert files["lib/a.dll"] == V1["lib/a.dll"]
+    assert "lib/a.dll.wt-new" not in files
+    assert index(installed)["lib/a.dll"][1] == 500
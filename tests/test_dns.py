@@ -0,0 +1,88 @@
+import asyncio
+import socket
+import struct
+
+import pytest
+
+import WindowsTweak as wt
+
+
+@pytest.fixture
+def stubs():
+    started = []
+
+    def make(delay=0.0, drop_every=0):
+        s = wt.DnsStubServer(delay, drop_every)
+        s.start()
+        started.append(s)
+        return s
+    yield make
+    for s in started:
+        s.close()
+
+
+def dead_port():
+    # Bound but never read: queries to it are lost
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    return sock
+
+
+def test_query_encoding():
+    q = wt.build_dns_query("www.example.com", 0x1234)
+    qid, flags, qd, an, ns, ar = struct.unpack(">HHHHHH", q[:12])
+    assert (qid, flags, qd, an, ns, ar) == (0x1234, 0x0100, 1, 0, 0, 0)
+    assert q[12:] == b"\x03www\x07example\x03com\x00" + struct.pack(">HH", 1, 1)
+
+
+def test_ranking_prefers_fast_then_clean(stubs):
+    slow, fast, lossy = stubs(0.02), stubs(0.0), stubs(0.0, drop_every=2)
+    sink = dead_port()
+    try:
+        servers = [("slow", "127.0.0.1", slow.port), ("dead", "127.0.0.1", sink.getsockname()[1]),
+                   ("lossy", "127.0.0.1", lossy.port), ("fast", "127.0.0.1", fast.port)]
+        ranked = wt.benchmark_resolvers(servers, names=["a.test", "b.test"], rounds=2,
+                                        timeout=0.1)
+    finally:
+        sink.close()
+    assert [r["label"] for r in ranked] == ["fast", "slow", "lossy", "dead"]
+    assert ranked[0]["lost"] == 0 and ranked[0]["sent"] == 4
+    assert ranked[2]["lost"] == 2
+    assert ranked[3]["median"] is None and ranked[3]["lost"] == 4
+
+
+def test_probe_ignores_late_answers(stubs):
+    late = stubs(0.15)
+    samples = wt.probe_resolver("127.0.0.1", late.port, names=["a.test"], rounds=3,
+                                timeout=0.1)
+    # Each late answer arrives while the next query waits and must not count for it
+    assert samples == [None, None, None]
+
+
+class ScriptedRunner:
+    def __init__(self, fail=()):
+        self.fail = fail
+        self.history = []
+
+    async def run(self, cmd, timeout=None):
+        self.history.append(cmd)
+        bad = any(f'name="{n}"' in cmd for n in self.fail)
+        return wt.CommandResult(cmd, 1 if bad else 0, "Element not found." if bad else "", False)
+
+
+def test_apply_dns_configures_every_interface():
+    r = ScriptedRunner(fail={"Ethernet 2"})
+    log = []
+    failed = asyncio.run(wt.apply_dns(r, ["Wi-Fi", "Ethernet 2"], ("1.1.1.1", "1.0.0.1"),
+                                      lambda msg, mtype: log.append((mtype, msg))))
+    assert failed == ["Ethernet 2"]
+    wifi = [c for c in r.history if 'name="Wi-Fi"' in c]
+    assert "source=static address=1.1.1.1" in wifi[0]
+    assert "address=1.0.0.1 index=2" in wifi[1]
+    assert ("WARNING", "Ethernet 2: Element not found.") in log
+
+
+def test_apply_dhcp():
+    r = ScriptedRunner()
+    assert asyncio.run(wt.apply_dns(r, ["Wi-Fi"], None, lambda *a: None)) == []
+    assert r.history == ['netsh interface ipv4 set dnsservers name="Wi-Fi" source=dhcp']
@@ -0,0 +1,88 @@
+import json
+
+import WindowsTweak as wt
+
+
+class FakeWmi:
+    """HardwareInventory provider that counts queries instead of calling WMI."""
+
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = set(fail)
+
+    def query(self, wmi_class, fields):
+        self.calls.append(wmi_class)
+        if wmi_class in self.fail:
+            raise OSError("RPC server unavailable")
+        if wmi_class == "Win32_Processor":
+            return [{"Name": "  Fake CPU 9000 ", "MaxClockSpeed": 4200}]
+        return [dict.fromkeys(fields, "x")]
+
+
+def inventory(tmp_path, provider, **kwargs):
+    return wt.HardwareInventory(provider, cache_path=str(tmp_path / "hw.json"), **kwargs)
+
+
+def test_queries_run_once_then_come_from_disk(tmp_path):
+    first = FakeWmi()
+    static, hit = inventory(tmp_path, first).static_facts()
+    assert not hit
+    assert sorted(first.calls) == sorted(c for c, _ in wt.HW_WMI_QUERIES.values())
+    assert static["cpu"]["name"] == "Fake CPU 9000"
+    assert static["cpu"]["max_clock_mhz"] == 4200
+
+    second = FakeWmi()
+    static2, hit = inventory(tmp_path, second).static_facts()
+    assert hit and second.calls == []
+    assert static2["cpu"]["name"] == "Fake CPU 9000"
+
+
+def test_reboot_invalidates_cache(tmp_path, monkeypatch):
+    inventory(tmp_path, FakeWmi()).static_facts()
+    boot = wt.psutil.boot_time()
+    monkeypatch.setattr(wt.psutil, "boot_time", lambda: boot + 3600)
+    provider = FakeWmi()
+    _, hit = inventory(tmp_path, provider).static_facts()
+    assert not hit and provider.calls
+
+
+def test_expired_cache_is_requeried(tmp_path):
+    inventory(tmp_path, FakeWmi()).static_facts()
+    path = tmp_path / "hw.json"
+    data = json.loads(path.read_text(encoding="utf-8"))
+    data["collected_at"] -= wt.HW_CACHE_TTL + 1
+    path.write_text(json.dumps(data), encoding="utf-8")
+    provider = FakeWmi()
+    _, hit = inventory(tmp_path, provider).static_facts()
+    assert not hit and provider.calls
+
+
+def test_force_bypasses_cache(tmp_path):
+    inv = inventory(tmp_path, FakeWmi())
+    inv.static_facts()
+    inv.provider = provider = FakeWmi()
+    assert inv.static_facts(force=True)[1] is False
+    assert provider.calls
+
+
+def test_partial_result_is_not_cached(tmp_path):
+    static, _ = inventory(tmp_path, FakeWmi(fail={"Win32_BIOS"})).static_facts()
+    assert "bios" in static["wmi_error"]
+    assert "board" in static
+    assert not (tmp_path / "hw.json").exists()
+
+
+def test_corrupt_cache_is_ignored(tmp_path):
+    (tmp_path / "hw.json").write_text("{not json", encoding="utf-8")
+    provider = FakeWmi()
+    _, hit = inventory(tmp_path, provider).static_facts()
+    assert not hit and provider.calls
+
+
+def test_without_wmi_only_portable_facts(tmp_path):
+    inv = inventory(tmp_path, None)
+    data = inv.collect()
+    assert data["static"]["wmi_error"] is None
+    assert "gpu" not in data["static"]
+    assert data["static"]["memory"]["total"] > 0
+    assert json.loads(inv.to_json(data))["cache_hit"] is False
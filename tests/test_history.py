@@ -0,0 +1,166 @@
+import csv
+import math
+import time
+
+import pytest
+
+import WindowsTweak as wt
+
+DAY = 86400
+# Local noon three days back, so the samples span four day segments
+T0 = time.mktime(time.localtime(time.time() - 3 * DAY)[:3] + (12, 0, 0, 0, 0, -1))
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = wt.HistoryStore(root=str(tmp_path / "history"))
+    yield s
+    s.close()
+
+
+def telemetry(store):
+    """Samples every 6 h over three days; "temp" only appears on the second day."""
+    written = []
+    for k in range(13):
+        ts = T0 + k * 6 * 3600
+        metrics = {"cpu": k * 1.5, "ram": 40.0 + k}
+        if 4 <= k < 8:
+            metrics["temp"] = 60.0 + k
+        store.record(ts, metrics)
+        written.append((ts, metrics))
+    store.flush()
+    return written
+
+
+def processes(store, n=3, rows=100):
+    provider = wt.SyntheticProcessProvider(rows, seed=5)
+    snaps = []
+    for k in range(n):
+        snap = provider.sample()
+        snap.ts = T0 + k * DAY
+        store.record_processes(snap)
+        store.record_processes(snap)  # Same snapshot again: stored once
+        snaps.append(snap)
+    store.flush()
+    return snaps
+
+
+def kept(snap, top=wt.HISTORY_TOP_PROCS):
+    """Expected export rows: the top `top` by CPU plus by RSS, in snapshot order."""
+    by_cpu = sorted(range(len(snap)), key=snap.cpu.__getitem__, reverse=True)[:top]
+    by_rss = sorted(range(len(snap)), key=snap.rss.__getitem__, reverse=True)[:top]
+    return [(round(snap.ts, 3), snap.pid[i], snap.name[i], snap.cpu[i], snap.rss[i],
+             round(snap.read_bps[i]), round(snap.write_bps[i]))
+            for i in sorted(set(by_cpu) | set(by_rss))]
+
+
+def test_processes_keep_only_the_top_by_cpu_and_rss(store):
+    snaps = processes(store)
+    recs = list(store.records("processes"))
+    assert len(recs) == len(snaps)
+    for rec, snap in zip(recs, snaps):
+        assert wt.HISTORY_TOP_PROCS <= len(rec["rows"]) <= 2 * wt.HISTORY_TOP_PROCS
+    assert list(wt.history_rows(store, "processes")) == [
+        tuple(row) for snap in snaps for row in kept(snap)]
+
+
+def test_telemetry_csv_round_trip(store, tmp_path):
+    written = telemetry(store)
+    path = str(tmp_path / "t.csv")
+    assert wt.export_history(store, "telemetry", path) == len(written)
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["ts", "cpu", "ram", "temp"]
+    for row, (ts, metrics) in zip(rows[1:], written):
+        assert float(row[0]) == round(ts, 3)
+        assert float(row[1]) == metrics["cpu"] and float(row[2]) == metrics["ram"]
+        assert row[3] == (str(metrics["temp"]) if "temp" in metrics else "")
+
+
+def test_telemetry_columnar_round_trip(store, tmp_path):
+    written = telemetry(store)
+    path = str(tmp_path / "t.wtc")
+    assert wt.export_history(store, "telemetry", path) == len(written)
+    header, blocks = wt.read_columnar(path)
+    assert header["kind"] == "telemetry"
+    assert [c["name"] for c in header["columns"]] == ["ts", "cpu", "ram", "temp"]
+    temps = [v for b in blocks for v in b["temp"]]
+    assert [v for b in blocks for v in b["ts"]] == [round(ts, 3) for ts, _ in written]
+    for temp, (_, metrics) in zip(temps, written):
+        if "temp" in metrics:
+            assert temp == metrics["temp"]
+        else:
+            assert math.isnan(temp)
+
+
+@pytest.mark.parametrize("ext", [".csv", ".wtc"])
+def test_processes_export_round_trip(store, tmp_path, ext, monkeypatch):
+    monkeypatch.setattr(wt._chunked, "__defaults__", (7,))  # Several blocks per export
+    snaps = processes(store)
+    expected = [row for snap in snaps for row in kept(snap)]
+    path = str(tmp_path / f"p{ext}")
+    assert wt.export_history(store, "processes", path) == len(expected)
+    names = [n for n, _ in wt.PROC_EXPORT_COLUMNS]
+    if ext == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            assert next(reader) == names
+            got = [(float(r[0]), int(r[1]), r[2], float(r[3]), float(r[4]),
+                    float(r[5]), float(r[6])) for r in reader]
+    else:
+        header, blocks = wt.read_columnar(path)
+        assert header["kind"] == "processes" and len(blocks) > 1
+        got = [row for b in blocks for row in zip(*(b[n] for n in names))]
+    assert len(got) == len(expected)
+    for row, want in zip(got, expected):
+        assert row[:3] == want[:3]
+        # .wtc stores cpu and I/O as float32
+        assert row[3:] == pytest.approx(want[3:], rel=1e-6)
+
+
+def test_since_until_stream_only_the_range(store, tmp_path):
+    written = telemetry(store)
+    now = T0 + 3 * DAY
+    start = wt.parse_when("66h", now=now)       # T0 + 6 h
+    end = wt.parse_when(time.strftime("%Y-%m-%dT%H:%M:%S",
+                                      time.localtime(T0 + 2 * DAY)))
+    inside = [(ts, m) for ts, m in written if start <= ts <= end]
+    assert 0 < len(inside) < len(written)
+    # Segments for days outside the range are not even opened
+    assert len(store.segments("telemetry", start, end)) == 3
+    assert len(store.segments("telemetry")) == 4
+
+    path = str(tmp_path / "range.csv")
+    assert wt.export_history(store, "telemetry", path, start, end) == len(inside)
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert [float(r[0]) for r in rows[1:]] == [round(ts, 3) for ts, _ in inside]
+
+    names = store.metric_names(T0 + 2 * DAY, None)  # "temp" stopped on day two
+    assert names == ["cpu", "ram"]
+
+
+def test_since_until_processes(store, tmp_path):
+    snaps = processes(store)
+    path = str(tmp_path / "range.wtc")
+    n = wt.export_history(store, "processes", path, T0 + DAY / 2, T0 + 3 * DAY / 2)
+    assert n == len(kept(snaps[1]))
+    _, blocks = wt.read_columnar(path)
+    assert {ts for b in blocks for ts in b["ts"]} == {round(snaps[1].ts, 3)}
+
+
+def test_torn_last_line_is_skipped(store):
+    written = telemetry(store)
+    path = store.segments("telemetry")[-1]
+    store.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"ts":%r,"metrics":{"cpu":' % (T0 + 4 * DAY))
+    assert len(list(store.records("telemetry"))) == len(written)
+
+
+def test_parse_when():
+    assert wt.parse_when(None) is None
+    assert wt.parse_when("90m", now=10000.0) == 10000.0 - 5400
+    assert wt.parse_when("1.5d", now=0.0) == -1.5 * DAY
+    with pytest.raises(ValueError, match="Invalid time"):
+        wt.parse_when("yesterday")
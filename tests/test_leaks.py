@@ -0,0 +1,135 @@
+import contextlib
+import json
+import random
+
+import pytest
+
+import WindowsTweak as wt
+
+
+def trend_of(points, tau=3600.0):
+    trend = wt.OnlineTrend(tau)
+    for t, y in points:
+        trend.add(t, y)
+    return trend
+
+
+def test_trend_needs_three_points():
+    assert trend_of([(0, 1), (10, 2)]).fit() == (0.0, 0.0)
+
+
+def test_trend_fits_an_exact_line():
+    slope, r2 = trend_of([(t, 5 + 2 * t) for t in range(0, 600, 30)]).fit()
+    assert slope == pytest.approx(2.0)
+    assert r2 == pytest.approx(1.0)
+
+
+def test_trend_stays_accurate_far_from_the_epoch():
+    start = 1.7e9
+    slope, r2 = trend_of([(start + t, 100 + t / 60) for t in range(0, 86400, 60)]).fit()
+    assert slope * 3600 == pytest.approx(60.0, rel=1e-6)
+    assert r2 == pytest.approx(1.0)
+
+
+def test_trend_of_noise_is_flat_and_unexplained():
+    rng = random.Random(3)
+    slope, r2 = trend_of([(t, 500 + rng.uniform(-10, 10)) for t in range(0, 7200, 60)]).fit()
+    assert abs(slope * 3600) < 10
+    assert r2 < 0.2
+
+
+def test_old_points_fade():
+    # Steep start, flat for many time constants afterwards
+    points = [(t, 10 * t) for t in range(0, 100, 10)] + [(t, 990) for t in range(100, 5000, 10)]
+    slope, _ = trend_of(points, tau=300.0).fit()
+    assert abs(slope) < 1e-3
+
+
+def run_fleet(kinds, hours=3.0, tick_s=2.0, **kwargs):
+    """{kind: minutes until first flagged, or None} for scripted processes."""
+    rng = random.Random(7)
+    clock = [0.0]
+    fleet = [wt.SyntheticLeakProcess(i + 4, f"{kind}.exe", kind, clock, rng)
+             for i, kind in enumerate(kinds)]
+    watch = wt.LeakWatch(["*"], process_iter=lambda attrs: fleet, budget_s=1.0, **kwargs)
+    first = {}
+    while clock[0] < hours * 3600:
+        for state, metric in watch.tick(clock[0]):
+            first.setdefault(state.proc.kind, (clock[0] / 60, metric))
+        clock[0] += tick_s
+    return watch, first
+
+
+def test_only_steady_growth_is_flagged():
+    watch, first = run_fleet(["flat", "leak", "step", "sawtooth"])
+    assert set(first) == {"leak"}
+    minutes, metric = first["leak"]
+    assert metric == "handles"
+    assert wt.LeakWatch.MIN_SPAN / 60 <= minutes < 60
+    assert [s.proc.kind for s in watch.suspects()] == ["leak"]
+    assert watch.rows()[0].proc.kind == "leak"
+    rate, r2 = watch.rows()[0].rate("handles")
+    assert rate == pytest.approx(120, rel=0.1) and r2 >= wt.LeakWatch.MIN_R2
+
+
+class Proc:
+    def __init__(self, pid, name):
+        self.pid = pid
+        self.info = {"name": name, "create_time": 1.0}
+        self.samples = 0
+        self.alive = True
+
+    def oneshot(self):
+        return contextlib.nullcontext()
+
+    def num_threads(self):
+        if not self.alive:
+            raise wt.psutil.NoSuchProcess(self.pid)
+        self.samples += 1
+        return 4
+
+    def num_fds(self):
+        return 40
+
+    num_handles = num_fds
+
+    def open_files(self):
+        return []
+
+
+def test_work_is_spread_over_the_period():
+    fleet = [Proc(i, "app.exe") for i in range(30)]
+    watch = wt.LeakWatch(["APP.EXE"], period=60.0, budget_s=1.0,
+                         process_iter=lambda attrs: fleet)
+    watch.tick(0.0)  # First round samples everyone
+    assert [p.samples for p in fleet] == [1] * 30
+    for t in range(2, 62, 2):
+        watch.tick(float(t))
+        assert sum(p.samples for p in fleet) == 30 + t // 2  # One process per 2 s tick
+    assert [p.samples for p in fleet] == [2] * 30
+
+
+def test_exited_and_unmatched_processes_are_dropped():
+    fleet = [Proc(1, "app.exe"), Proc(2, "other.exe"), Proc(3, "App.exe")]
+    watch = wt.LeakWatch(["app.exe"], pids=[2], period=1.0, budget_s=1.0,
+                         process_iter=lambda attrs: fleet)
+    watch.tick(0.0)
+    assert sorted(pid for pid, _ in watch.watched) == [1, 2, 3]
+    fleet[0].alive = False
+    watch.tick(1.0)
+    assert sorted(pid for pid, _ in watch.watched) == [2, 3]
+    del fleet[1]
+    watch.tick(1.0 + wt.LeakWatch.RESCAN)
+    assert watch.pids == set()  # Hand-picked PIDs go once they are gone
+    assert [pid for pid, _ in watch.watched] == [3]
+
+
+def test_load_and_save(tmp_path):
+    path = str(tmp_path / "leakwatch.json")
+    assert not wt.LeakWatch.load(path)
+    wt.LeakWatch([" Chrome*.exe ", "", "svc.exe"]).save(path)
+    assert wt.LeakWatch.load(path).patterns == ["chrome*.exe", "svc.exe"]
+    with open(path, "w") as f:
+        json.dump({"patterns": "chrome.exe"}, f)
+    with pytest.raises(ValueError, match="must be a list"):
+        wt.LeakWatch.load(path)
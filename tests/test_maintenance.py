@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+import WindowsTweak as wt
+
+HOUR = 3600
+T0 = 1_700_000_000 - 1_700_000_000 % HOUR + 600  # Ten minutes past an hour
+
+
+def scheduler(load=None, jitter=0, window=6, tasks=("trim",), durations=None):
+    profile = {"tasks": list(tasks), "every_hours": 24, "window_hours": window,
+               "jitter_minutes": jitter}
+    state = {"load": load, "durations": durations or {}}
+    return wt.MaintenanceScheduler({"nightly": profile}, state=state, rng=random.Random(1))
+
+
+def busy_week(quiet=(), level=80.0, quiet_level=5.0):
+    """Load profile at `level` except the hours starting at `quiet` timestamps."""
+    load = [level] * wt.MaintenanceScheduler.SLOTS
+    for ts in quiet:
+        load[wt.MaintenanceScheduler.slot(ts)] = quiet_level
+    return load
+
+
+def test_without_history_runs_at_earliest():
+    assert scheduler().plan("nightly", T0) == T0
+
+
+def test_picks_the_quietest_hour_in_the_window():
+    quiet = T0 - 600 + 4 * HOUR
+    s = scheduler(busy_week([quiet]))
+    assert s.plan("nightly", T0) == quiet
+    assert s.next_run["nightly"] == quiet
+
+
+def test_quiet_hour_outside_the_window_is_ignored():
+    s = scheduler(busy_week([T0 - 600 + 8 * HOUR]), window=6)
+    assert s.plan("nightly", T0) == T0
+
+
+def test_current_hour_never_starts_before_earliest():
+    s = scheduler(busy_week([T0 - 600]))
+    assert s.plan("nightly", T0) == T0
+
+
+def test_long_runs_need_a_quiet_stretch():
+    base = T0 - 600
+    # One very quiet hour at +1, but a two-hour job fits better at +3..+4
+    load = busy_week([base + HOUR])
+    for k in (3, 4):
+        load[wt.MaintenanceScheduler.slot(base + k * HOUR)] = 20.0
+    durations = {"trim": [5400.0]}
+    assert scheduler(load, durations=durations).plan("nightly", T0) == base + 3 * HOUR
+    assert scheduler(load).plan("nightly", T0) == base + HOUR
+
+
+def test_unknown_hours_score_as_average():
+    load = [None] * wt.MaintenanceScheduler.SLOTS
+    load[wt.MaintenanceScheduler.slot(T0)] = 90.0
+    load[wt.MaintenanceScheduler.slot(T0 + HOUR)] = 10.0
+    # Average of known hours is 50: an unknown hour beats the busy one, loses to the quiet one
+    assert scheduler(load, window=3).plan("nightly", T0) == T0 - 600 + HOUR
+
+
+def test_jitter_only_delays():
+    s = scheduler(jitter=30)
+    starts = [s.plan("nightly", T0) for _ in range(50)]
+    assert all(T0 <= t <= T0 + 30 * 60 for t in starts)
+    assert len(set(starts)) > 1
+
+
+def test_expected_duration_uses_the_median():
+    s = scheduler()
+    for seconds in (100, 900, 200, 300, 250, 120):
+        s.record_task("trim", seconds)
+    assert s.durations["trim"] == [900, 200, 300, 250, 120]  # Last KEEP_RUNS
+    assert s.expected_duration(["trim", "never_timed"]) == 250 + s.DEFAULT_TASK_S
+
+
+def test_due_plans_then_reschedules_after_a_run():
+    s = scheduler()
+    assert s.due(T0) == ["nightly"]
+    s.finish_run("nightly", T0)
+    assert s.next_run["nightly"] == T0 + 24 * HOUR
+    assert s.due(T0 + HOUR) == []
+
+
+def test_gate_and_state_round_trip(tmp_path):
+    s = scheduler()
+    for _ in range(20):
+        s.observe(T0, cpu=95.0, disk_bps=0.0)
+    assert s.blocked(idle_s=3600).startswith("CPU")
+    for _ in range(20):
+        s.observe(T0, cpu=1.0, disk_bps=0.0)
+    assert s.blocked(idle_s=10) == "user active"
+    assert s.blocked(idle_s=None) is None
+    path = str(tmp_path / "state.json")
+    s.save_state(path)
+    again = wt.MaintenanceScheduler.load_files(str(tmp_path / "absent.json"), path)
+    assert again.load[again.slot(T0)] == pytest.approx(s.load[s.slot(T0)], abs=0.01)
@@ -0,0 +1,84 @@
+import tracemalloc
+
+import pytest
+
+import WindowsTweak as wt
+
+
+def test_default_budget_keeps_the_default_caps():
+    budget = wt.MemoryBudget()
+    assert budget.mb == wt.MemoryBudget.DEFAULT_MB
+    assert budget.console_lines == wt.MemoryBudget.CONSOLE_LINES
+    assert budget.heatmap_columns == wt.HEATMAP_COLUMNS
+    assert budget.proc_history == wt.PROC_HISTORY_LEN
+
+
+def test_caps_shrink_in_proportion():
+    half = wt.MemoryBudget(wt.MemoryBudget.DEFAULT_MB // 2)
+    assert half.console_lines == wt.MemoryBudget.CONSOLE_LINES // 2
+    assert half.heatmap_columns == wt.HEATMAP_COLUMNS // 2
+    assert half.proc_history == wt.PROC_HISTORY_LEN // 2
+    assert half.alloc_reports == 30
+
+
+def test_caps_have_floors_and_never_grow():
+    tiny = wt.MemoryBudget(1)
+    assert (tiny.console_lines, tiny.heatmap_columns, tiny.proc_history,
+            tiny.alloc_reports) == (200, 120, 10, 10)
+    huge = wt.MemoryBudget(10 * wt.MemoryBudget.DEFAULT_MB)
+    assert huge.console_lines == wt.MemoryBudget.CONSOLE_LINES
+    assert huge.heatmap_columns == wt.HEATMAP_COLUMNS
+
+
+def test_over_budget():
+    budget = wt.MemoryBudget(64)
+    assert not budget.over(64 * 1048576)
+    assert budget.over(64 * 1048576 + 1)
+
+
+def test_shrunk_process_history_stays_bounded():
+    history = wt.ProcessHistory(wt.MemoryBudget(40).proc_history)
+    for i in range(100):
+        history.record(1, float(i), 0)
+    assert history.cpu_history(1) == [float(i) for i in range(88, 100)]
+
+
+def test_shrunk_heatmap_wraps(qapp):
+    heatmap = wt.CoreHeatmap(2, wt.MemoryBudget(1).heatmap_columns)
+    for i in range(heatmap.columns + 5):
+        heatmap.push([50, 60])
+    assert heatmap.img.height() == 120
+    assert heatmap.head == 5
+
+
+@pytest.fixture
+def tracker():
+    t = wt.AllocationTracker(keep=3, top=5)
+    t.start()
+    yield t
+    t.stop()
+
+
+def test_allocation_tracker_finds_the_growing_site(tracker):
+    hoard = []
+    for _ in range(4):
+        hoard.append(bytearray(256 * 1024))
+        rows = tracker.sample()
+    site, size, size_diff, _ = rows[0]
+    assert site.startswith("test_memory.py:")
+    assert size_diff >= 4 * 256 * 1024
+    assert len(tracker.reports) == 3  # keep=3
+    trend = tracker.trend(site)
+    assert trend == sorted(trend) and trend[-1] == size
+    assert tracker.dump()[-1]["sites"][0]["site"] == site
+
+
+def test_allocation_tracker_leaves_foreign_tracing_on():
+    tracemalloc.start()
+    try:
+        t = wt.AllocationTracker()
+        t.start()
+        t.stop()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
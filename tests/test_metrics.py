@@ -0,0 +1,104 @@
+import math
+import re
+from types import SimpleNamespace
+
+import pytest
+
+import WindowsTweak as wt
+
+NAME = r"[a-zA-Z_:][a-zA-Z0-9_:]*"
+LABEL = r'[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*"'
+VALUE = r"NaN|[+-]Inf|[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?"
+SAMPLE_RE = re.compile(rf"({NAME})(?:\{{((?:{LABEL})(?:,{LABEL})*)\}})? ({VALUE})")
+LABEL_RE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def parse(text):
+    """Strict OpenMetrics gauge parser: {family: {labels tuple: float}}."""
+    assert text.endswith("# EOF\n")
+    families, current = {}, None
+    for line in text[:-len("# EOF\n")].rstrip("\n").split("\n"):
+        if line.startswith("# TYPE "):
+            _, _, current, typ = line.split(" ")
+            assert typ == "gauge" and current not in families
+            families[current] = {}
+        elif line.startswith("# UNIT "):
+            _, _, name, unit = line.split(" ")
+            assert name == current and name.endswith("_" + unit)
+        elif line.startswith("# HELP "):
+            assert line.split(" ")[2] == current
+        else:
+            m = SAMPLE_RE.fullmatch(line)
+            assert m, f"not an OpenMetrics sample: {line!r}"
+            assert m.group(1) == current
+            labels = tuple((k, re.sub(r"\\(.)", lambda e: {"n": "\n"}.get(e.group(1), e.group(1)), v))
+                           for k, v in LABEL_RE.findall(m.group(2) or ""))
+            families[current][labels] = float(m.group(3))
+    return families
+
+
+def disk(busy, read, write, latency_ms):
+    return {"busy": busy, "read_bps": read, "write_bps": write, "latency_ms": latency_ms}
+
+
+def nic(recv, sent):
+    return {"bytes_recv": recv, "bytes_sent": sent}
+
+
+def sample():
+    np = pytest.importorskip("numpy")
+    return {"ts": 1700000000.25, "cpu": np.float64(12.5), "cpu_cores": [np.float32(3.0), 22.0],
+            "ram": 41.0, "ram_available": 2 ** 33,
+            "disk_io": {wt.DiskTelemetry.ALL: disk(5.0, 1e6, 2e6, 1.5),
+                        "C:": disk(np.float64(7.5), 1024, 0, float("nan")),
+                        'PhysicalDrive"1"': disk(0.0, float("inf"), 3.0, 0.25)},
+            "partitions": {"C:\\": 73.5},
+            "net": {wt.NetTelemetry.ALL: nic(1000.5, 10),
+                    "Wi-Fi": nic(np.float64(1000.5), 0),
+                    "vEthernet (WSL)\nbridge": nic(float("-inf"), 1e-7)}}
+
+
+def test_exposition_parses_with_disks_and_nics():
+    snap = wt.SyntheticProcessProvider(50, seed=2).sample()
+    alerts = SimpleNamespace(rules=[SimpleNamespace(name="cpu high", active=True),
+                                    SimpleNamespace(name="disk", active=False)])
+    text = wt.render_openmetrics(sample(), snap, top=5, alerts=alerts,
+                                 own={"cpu": 0.5, "rss": 81920000})
+    fam = parse(text)
+    p = "windowstweak_"
+
+    assert fam[p + "cpu_percent"] == {(): 12.5}
+    assert fam[p + "cpu_core_percent"] == {(("core", "0"),): 3.0, (("core", "1"),): 22.0}
+    assert fam[p + "memory_available_bytes"] == {(): 2.0 ** 33}
+    busy = fam[p + "disk_busy_percent"]
+    assert busy[(("disk", wt.DiskTelemetry.ALL),)] == 5.0
+    assert busy[(("disk", "C:"),)] == 7.5
+    assert busy[(("disk", 'PhysicalDrive"1"'),)] == 0.0
+    assert math.isnan(fam[p + "disk_latency_seconds"][(("disk", "C:"),)])
+    assert fam[p + "disk_latency_seconds"][(("disk", 'PhysicalDrive"1"'),)] == 0.00025
+    assert fam[p + "disk_read_bytes_per_second"][(("disk", 'PhysicalDrive"1"'),)] == math.inf
+    assert fam[p + "filesystem_used_percent"] == {(("mount", "C:\\"),): 73.5}
+    recv = fam[p + "network_receive_bytes_per_second"]
+    assert recv[(("interface", "Wi-Fi"),)] == 1000.5
+    assert recv[(("interface", "vEthernet (WSL)\nbridge"),)] == -math.inf
+    assert fam[p + "network_transmit_bytes_per_second"][
+        (("interface", "vEthernet (WSL)\nbridge"),)] == 1e-7
+    assert len(fam[p + "process_cpu_percent"]) == 5
+    assert fam[p + "self_resident_memory_bytes"] == {(): 81920000.0}
+    assert fam[p + "alert_active"] == {(("rule", "cpu high"),): 1.0, (("rule", "disk"),): 0.0}
+
+
+@pytest.mark.parametrize("value, text", [
+    (float("nan"), "NaN"), (float("inf"), "+Inf"), (float("-inf"), "-Inf"),
+    (1, "1.0"), (True, "1.0"), (0.1, "0.1"), (1e-7, "1e-07"), (2 ** 60, "1.152921504606847e+18"),
+])
+def test_om_value(value, text):
+    assert wt._om_value(value) == text
+
+
+def test_om_value_numpy_scalars():
+    np = pytest.importorskip("numpy")
+    assert wt._om_value(np.float64(2.5)) == "2.5"
+    assert wt._om_value(np.float32(0.5)) == "0.5"
+    assert wt._om_value(np.int64(7)) == "7.0"
+    assert wt._om_value(np.float64("nan")) == "NaN"
@@ -0,0 +1,57 @@
+import WindowsTweak as wt
+
+
+def test_topn_orders_by_latest_value():
+    top = wt.TopN()
+    for pid, value in [(1, 10), (2, 50), (3, 30), (4, 20)]:
+        top.update(pid, value)
+    assert top.top(2) == [(2, 50), (3, 30)]
+    top.update(2, 5)  # Older entry for pid 2 goes stale
+    assert top.top(3) == [(3, 30), (4, 20), (1, 10)]
+    assert len(top) == 4
+
+
+def test_topn_remove_and_repeated_top():
+    top = wt.TopN()
+    for pid in range(10):
+        top.update(pid, pid)
+    top.remove(9)
+    top.remove(42)  # Unknown pid is ignored
+    assert top.top(2) == [(8, 8), (7, 7)]
+    assert top.top(2) == [(8, 8), (7, 7)]  # top() leaves the heap intact
+    assert len(top) == 9
+
+
+def test_topn_compacts_stale_entries():
+    top = wt.TopN()
+    for i in range(1000):
+        top.update(i % 3, i)
+    assert len(top._heap) <= 2 * len(top) + 64
+    assert top.top(3) == [(0, 999), (2, 998), (1, 997)]
+
+
+def test_history_ring_keeps_the_newest_samples():
+    hist = wt.ProcessHistory(maxlen=4)
+    for i in range(6):
+        hist.record(7, float(i), i * 1048576)
+    assert hist.cpu_history(7) == [2.0, 3.0, 4.0, 5.0]
+    assert hist.rss_history(7) == [2.0, 3.0, 4.0, 5.0]
+
+
+def test_history_partial_ring_and_eviction():
+    hist = wt.ProcessHistory(maxlen=4)
+    hist.record(1, 90.0, 100 * 1048576)
+    hist.record(2, 10.0, 900 * 1048576)
+    assert hist.cpu_history(1) == [90.0]
+    assert hist.top_cpu.top(1) == [(1, 90.0)]
+    assert hist.top_mem.top(1) == [(2, 900 * 1048576)]
+    hist.evict(2)
+    assert hist.cpu_history(2) == []
+    assert hist.top_mem.top(2) == [(1, 100 * 1048576)]
+
+
+def test_sparkline_scales():
+    assert wt.sparkline([]) == ""
+    assert wt.sparkline([0, 0]) == "▁▁"
+    assert wt.sparkline([0, 50, 100]) == "▁▄█"
+    assert wt.sparkline([50], hi=100) == "▄"
@@ -0,0 +1,94 @@
+import pytest
+
+import WindowsTweak as wt
+
+MB = 1048576
+ROWS = [  # pid, name, user, status, cpu, rss, rss_delta, read_bps, write_bps
+    (4, "System", "SYSTEM", "running", 0.5, 1 * MB, 0, 0.0, 0.0),
+    (100, "chrome.exe", "alice", "running", 12.0, 800 * MB, 5 * MB, 2048.0, 1024.0),
+    (101, "chrome.exe", "alice", "sleeping", 0.0, 120 * MB, -MB, 0.0, 0.0),
+    (200, "msedge.exe", "alice", "running", 4.9, 300 * MB, 0, 0.0, 4 * MB),
+    (300, "svchost.exe", "svc_net", "stopped", 5.0, 40 * MB, 0, 512.0, 0.0),
+    (301, "svchost.exe", "svc_audio", "running", 0.0, 20 * MB, 0, 0.0, 0.0),
+    (400, "My Tool.exe", "bob", "running", 99.0, 2048 * MB, 100 * MB, 0.0, 0.0),
+]
+MODES = [False, pytest.param(True, marks=pytest.mark.skipif(
+    not wt.HAS_NUMPY, reason="NumPy not installed"))]
+
+
+@pytest.fixture
+def snap():
+    s = wt.ProcessSnapshot()
+    for row in ROWS:
+        s.append(*row)
+    return s
+
+
+def pids(snap, text, vectorized):
+    return [snap.pid[i] for i in wt.ProcessQuery(text, vectorized=vectorized)(snap)]
+
+
+@pytest.mark.parametrize("vectorized", MODES)
+@pytest.mark.parametrize("text, expected", [
+    ("", [4, 100, 101, 200, 300, 301, 400]),
+    ("chrome", [100, 101]),
+    ("CHROME", [100, 101]),
+    ("name~chrome|edge", [100, 101, 200]),
+    ("name:svchost.exe", [300, 301]),
+    ("name:SVC*", [300, 301]),
+    ("user:svc_*", [300, 301]),
+    ("status:stopped", [300]),
+    ("state:running user:alice", [100, 200]),
+    ('"name:my tool.exe"', [400]),
+    ("mem>500", [100, 400]),
+    ("mem>=300", [100, 200, 400]),
+    ("mem<20", [4]),
+    ("mem<=20", [4, 301]),
+    ("rss>1G", [400]),
+    ("cpu>=5", [100, 300, 400]),
+    ("cpu>4.9", [100, 300, 400]),
+    ("pid=4|301", [4, 301]),
+    ("delta<0", [101]),
+    ("io>1", [100, 200]),
+    ("write>=4M", [200]),
+    ("read>0.5K", [100]),
+    ("-status:running", [101, 300]),
+    ("!name~chrome user:alice", [200]),
+    ("name!~svc cpu<1", [4, 101]),
+    ("-pid=4|100|101", [200, 300, 301, 400]),
+    ("-chrome -svchost", [4, 200, 400]),
+    ("nothing_matches", []),
+])
+def test_terms(snap, text, expected, vectorized):
+    assert pids(snap, text, vectorized) == expected
+
+
+@pytest.mark.parametrize("text, message", [
+    ("cpu~5", "is a number"),
+    ("name>5", "is text"),
+    ("colour:red", "unknown field 'colour'"),
+    ("mem>lots", "not a number"),
+    ("cpu>1|2", "only works with ="),
+    ('name~"chrome', "quotation"),
+])
+def test_parse_errors(text, message):
+    with pytest.raises(ValueError, match=message):
+        wt.ProcessQuery(text)
+
+
+def test_empty_query_is_false():
+    assert not wt.ProcessQuery("  ")
+    assert wt.ProcessQuery("chrome")
+
+
+@pytest.mark.skipif(not wt.HAS_NUMPY, reason="NumPy not installed")
+@pytest.mark.parametrize("text", [
+    "cpu>5", "mem>200 status:running", "name~a|e -user:SYSTEM", "io>1 delta>=0",
+    "status:stopped|zombie", "-name~svc mem<=100", "pid=8|12|16|20",
+])
+def test_numpy_and_pure_python_agree(text):
+    snap = wt.SyntheticProcessProvider(3000).sample()
+    fast = wt.ProcessQuery(text, vectorized=True)
+    slow = wt.ProcessQuery(text, vectorized=False)
+    assert fast.vectorized and not slow.vectorized
+    assert fast(snap) == slow(snap)
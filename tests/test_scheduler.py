@@ -0,0 +1,28 @@
+import WindowsTweak as wt
+
+
+def test_due_throttles_the_timer_path():
+    s = wt.AdaptiveScheduler()
+    assert s.due("processes", now=10.0)
+    assert not s.due("processes", now=11.0)
+    assert s.due("processes", now=12.0)
+    assert s.due("unthrottled", now=12.0) and s.due("unthrottled", now=12.0)
+
+
+def test_forced_refresh_runs_and_restarts_the_gap():
+    s = wt.AdaptiveScheduler()
+    assert s.due("connections", now=10.0)
+    assert s.due("connections", now=10.5, force=True)
+    assert not s.due("connections", now=12.0)  # 1.5 s after the forced run
+    assert s.due("connections", now=12.5)
+
+
+def test_interval_follows_visibility_alerts_and_load():
+    s = wt.AdaptiveScheduler()
+    assert s.interval(visible=True, active=True) == s.WATCHING_MS
+    assert s.interval(visible=True, active=False) == s.INACTIVE_MS
+    assert s.interval(visible=False, active=False) == s.HIDDEN_MS
+    assert s.interval(visible=False, active=False, alerting=True) == s.ALERT_MS
+    s.load = 100.0
+    assert s.interval(visible=True, active=True) == 4 * s.WATCHING_MS
+    assert s.interval(visible=False, active=False) == s.MAX_MS
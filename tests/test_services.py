@@ -0,0 +1,81 @@
+import asyncio
+import functools
+import time
+
+import WindowsTweak as wt
+
+SERVICES = ["wuauserv", "cryptSvc", "bits", "msiserver"]
+
+
+def runner(**kwargs):
+    kwargs.setdefault("exec_time", 0)
+    return wt.FakeCommandRunner(SERVICES, **kwargs)
+
+
+class Log(list):
+    def __call__(self, msg, mtype="INFO"):
+        self.append((mtype, msg))
+
+
+def test_state_parsed_from_code_whatever_the_label():
+    for label in ("STATE", "ZUSTAND", "ÉTAT", "STATO"):
+        r = runner(state_label=label)
+        assert asyncio.run(wt.service_state(r, "bits")) == "RUNNING"
+
+
+def test_real_sc_output():
+    out = ("SERVICE_NAME: wuauserv\r\n"
+           "        TYPE               : 20  WIN32_SHARE_PROCESS\r\n"
+           "        ESTADO             : 3  STOP_PENDING\r\n"
+           "                                (NOT_STOPPABLE, NOT_PAUSABLE, IGNORES_SHUTDOWN)\r\n"
+           "        WIN32_EXIT_CODE    : 5  (0x5)\r\n"
+           "        SERVICE_EXIT_CODE  : 0  (0x0)\r\n")
+    match = wt.SC_STATE_RE.search(out)
+    assert wt.SC_STATES[int(match.group(1)) - 1] == "STOP_PENDING"
+    assert wt.SC_STATE_RE.search("[SC] OpenService FAILED 1060:\r\n\r\n"
+                                 "The specified service does not exist.") is None
+
+
+def test_services_stop_concurrently():
+    r = runner(stop_time=0.2)
+    t0 = time.monotonic()
+    failed = asyncio.run(wt.set_services_state(r, SERVICES, False, Log()))
+    assert failed == []
+    assert time.monotonic() - t0 < 0.2 * len(SERVICES) * 0.75
+    assert all(asyncio.run(wt.service_state(r, s)) == "STOPPED" for s in SERVICES)
+
+
+def test_no_command_when_already_in_state():
+    r = runner()
+    assert asyncio.run(wt.set_service_state(r, "bits", True))
+    assert r.history == ["sc query bits"]
+
+
+def test_timeout_is_reported(monkeypatch):
+    r = runner(stop_time=5.0)
+    assert asyncio.run(wt.set_service_state(r, "bits", False, timeout=0.2)) is False
+
+    quick = functools.partial(wt.set_service_state, timeout=0.2)
+    monkeypatch.setattr(wt, "set_service_state", quick)
+    log = Log()
+    failed = asyncio.run(wt.set_services_state(r, ["wuauserv", "bits"], False, log))
+    assert failed == ["wuauserv", "bits"]
+    assert [t for t, _ in log] == ["WARNING", "WARNING"]
+    assert "Could not stop wuauserv" in log[0][1]
+
+
+def test_windows_update_reset_stops_everything_before_restarting():
+    r = runner(stop_time=0.05, start_time=0.05)
+    asyncio.run(wt.reset_windows_update(r, Log(), rename=lambda src, dst: None))
+    verbs = [cmd.split()[1] for cmd in r.history if cmd.split()[1] in ("stop", "start")]
+    assert verbs == ["stop"] * len(SERVICES) + ["start"] * len(SERVICES)
+    assert all(asyncio.run(wt.service_state(r, s)) == "RUNNING" for s in SERVICES)
+
+
+def test_network_reset_renews_after_release():
+    r = runner()
+    asyncio.run(wt.reset_network_stack(r, Log()))
+    h = r.history
+    assert h.index("ipconfig /release") < h.index("ipconfig /renew")
+    assert h[-1] == "netsh int ip reset"
+    assert "ipconfig /flushdns" in h
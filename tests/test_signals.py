@@ -0,0 +1,85 @@
+import subprocess
+import sys
+import time
+
+import psutil
+import pytest
+
+import WindowsTweak as wt
+
+SLEEPER = [sys.executable, "-c", "import time; time.sleep(60)"]
+TREE = [sys.executable, "-c",
+        "import subprocess, sys, time; "
+        "subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']); "
+        "time.sleep(60)"]
+
+
+@pytest.fixture
+def spawn():
+    started = []
+
+    def start(cmd=SLEEPER):
+        p = subprocess.Popen(cmd)
+        started.append(p)
+        return p
+
+    yield start
+    for p in started:
+        if p.poll() is None:
+            for q in psutil.Process(p.pid).children(recursive=True):
+                q.kill()
+            p.kill()
+        p.wait()
+
+
+def dead_pid():
+    p = subprocess.Popen([sys.executable, "-c", "pass"])
+    p.wait()
+    return p.pid
+
+
+def test_kill_counts_exited_pids_as_done(spawn):
+    live, gone = spawn(), dead_pid()
+    ok, failures = wt.signal_processes([live.pid, gone], "kill", timeout=5)
+    assert sorted(ok) == sorted([live.pid, gone])
+    assert failures == {}
+    live.wait(timeout=5)
+
+
+def test_suspend_reports_exited_pids(spawn):
+    live, gone = spawn(), dead_pid()
+    ok, failures = wt.signal_processes([live.pid, gone], "suspend")
+    assert ok == [live.pid]
+    assert failures == {gone: "process has exited"}
+    assert psutil.Process(live.pid).status() == psutil.STATUS_STOPPED
+    ok, failures = wt.signal_processes([live.pid], "resume")
+    assert (ok, failures) == ([live.pid], {})
+
+
+def test_access_denied_does_not_stop_the_others(spawn, monkeypatch):
+    live, locked = spawn(), spawn()
+
+    class Process(psutil.Process):
+        def __init__(self, pid):
+            if pid == locked.pid:
+                raise psutil.AccessDenied(pid)
+            super().__init__(pid)
+
+    monkeypatch.setattr(wt.psutil, "Process", Process)
+    ok, failures = wt.signal_processes([live.pid, locked.pid], "kill", timeout=5)
+    assert ok == [live.pid]
+    assert failures == {locked.pid: "access denied"}
+    assert locked.poll() is None
+
+
+def test_tree_kill_includes_descendants(spawn):
+    parent = spawn(TREE)
+    for _ in range(100):
+        children = psutil.Process(parent.pid).children(recursive=True)
+        if children:
+            break
+        time.sleep(0.05)
+    child = children[0].pid
+    ok, failures = wt.signal_processes([parent.pid], "kill", tree=True, timeout=5)
+    assert failures == {}
+    assert sorted(ok) == sorted([parent.pid, child])
@@ -0,0 +1,131 @@
+from collections import namedtuple
+
+import pytest
+
+import WindowsTweak as wt
+
+Nic = namedtuple("Nic", wt.NetTelemetry.FIELDS)
+
+
+class Clock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(wt.time, "monotonic", c)
+    return c
+
+
+def nic(recv, sent=0, **extra):
+    values = dict.fromkeys(wt.NetTelemetry.FIELDS, 0)
+    values.update(bytes_recv=recv, bytes_sent=sent, **extra)
+    return Nic(**values)
+
+
+def run(telemetry, clock, readings, dt=1.0):
+    """Feed counter readings one tick apart; returns the last sample."""
+    feed = iter(readings)
+    telemetry.counters = lambda: next(feed)
+    for _ in readings:
+        out = telemetry.sample()
+        clock.now += dt
+    return out
+
+
+def test_first_sample_has_no_rates(clock):
+    net = wt.NetTelemetry(counters=lambda: {"eth0": nic(1000)})
+    rates = net.sample()
+    assert rates == {net.ALL: dict.fromkeys(net.FIELDS, 0.0)}
+
+
+def test_rates_are_ewma_smoothed(clock):
+    net = wt.NetTelemetry(alpha=0.5)
+    rates = run(net, clock, [{"eth0": nic(0, 0)}, {"eth0": nic(1000, 100)},
+                             {"eth0": nic(1000, 100)}, {"eth0": nic(4000, 100)}])
+    # 1000 -> 0 -> 3000 B/s raw: seed, then halve the gap each tick
+    assert rates["eth0"]["bytes_recv"] == pytest.approx(1750.0)
+    assert rates["eth0"]["bytes_sent"] == pytest.approx(25.0)
+    assert [d for d, _ in net.history["eth0"]] == pytest.approx([1000.0, 500.0, 1750.0])
+
+
+def test_rates_use_the_elapsed_time(clock):
+    net = wt.NetTelemetry()
+    rates = run(net, clock, [{"eth0": nic(0)}, {"eth0": nic(8000, packets_recv=40)}], dt=4.0)
+    assert rates["eth0"]["bytes_recv"] == pytest.approx(2000.0)
+    assert rates["eth0"]["packets_recv"] == pytest.approx(10.0)
+
+
+def test_counter_reset_does_not_go_negative(clock):
+    net = wt.NetTelemetry(alpha=1.0)
+    rates = run(net, clock, [{"eth0": nic(5000)}, {"eth0": nic(100)}])
+    assert rates["eth0"]["bytes_recv"] == 0.0
+
+
+def test_total_and_vanished_interfaces(clock):
+    net = wt.NetTelemetry(alpha=1.0)
+    rates = run(net, clock, [{"eth0": nic(0), "wlan0": nic(0)},
+                             {"eth0": nic(300), "wlan0": nic(700)},
+                             {"eth0": nic(600)}])
+    assert rates[net.ALL]["bytes_recv"] == pytest.approx(300.0)
+    assert "wlan0" not in rates and "wlan0" not in net.history
+    assert net.interfaces() == [net.ALL, "eth0"]
+
+
+@pytest.mark.parametrize("v, ceiling", [(0, 1), (1e-320, 1), (0.3, 0.5), (1, 1),
+                                        (1.5, 2), (3, 5), (7, 10), (1200, 2000)])
+def test_nice_ceiling(v, ceiling):
+    assert wt.nice_ceiling(v) == pytest.approx(ceiling)
+
+
+def test_fmt_rate():
+    assert wt.fmt_rate(512) == "512 B/s"
+    assert wt.fmt_rate(1536) == "1.5 KB/s"
+    assert wt.fmt_rate(3 * 1024 ** 3) == "3.00 GB/s"
+
+
+Disk = namedtuple("Disk", "read_count write_count read_bytes write_bytes read_time write_time")
+LinuxDisk = namedtuple("LinuxDisk", Disk._fields + ("busy_time",))
+
+
+@pytest.fixture
+def disk(monkeypatch):
+    telemetry = wt.DiskTelemetry()
+    monkeypatch.setattr(telemetry, "_usage", dict)
+    return telemetry
+
+
+def test_disk_rates_and_latency(clock, disk):
+    rates = run(disk, clock, [{"sda": Disk(0, 0, 0, 0, 0, 0)},
+                              {"sda": Disk(30, 10, 3000, 1000, 120, 80)}], dt=2.0)
+    sda = rates["sda"]
+    assert sda["read_iops"] == 15.0 and sda["write_iops"] == 5.0
+    assert sda["read_bps"] == 1500.0 and sda["write_bps"] == 500.0
+    assert sda["latency_ms"] == 5.0  # 200 ms of I/O over 40 operations
+    assert sda["busy"] == 10.0       # Windows: read_time + write_time over 2000 ms
+
+
+def test_disk_busy_prefers_busy_time_and_caps(clock, disk):
+    rates = run(disk, clock, [{"sda": LinuxDisk(0, 0, 0, 0, 0, 0, 0),
+                               "sdb": Disk(0, 0, 0, 0, 0, 0)},
+                              {"sda": LinuxDisk(1, 1, 0, 0, 900, 900, 250),
+                               "sdb": Disk(4, 0, 0, 0, 4000, 0)}])
+    assert rates["sda"]["busy"] == 25.0   # busy_time, not the overlapping I/O times
+    assert rates["sdb"]["busy"] == 100.0  # Queued I/O time exceeds wall time
+
+
+def test_disk_idle_and_total(clock, disk):
+    rates = run(disk, clock, [{"sda": Disk(0, 0, 0, 0, 0, 0), "sdb": Disk(0, 0, 0, 0, 0, 0)},
+                              {"sda": Disk(10, 0, 0, 0, 100, 0), "sdb": Disk(0, 0, 0, 0, 0, 0)}])
+    assert rates["sdb"]["latency_ms"] == 0.0
+    total = rates[disk.ALL]
+    assert total["read_iops"] == 10.0
+    assert total["latency_ms"] == 10.0  # Weighted by operations, not averaged per disk
+    assert total["busy"] == rates["sda"]["busy"]
+    assert "_ops" not in total and "_io_ms" not in rates["sda"]
+    assert disk.disks() == [disk.ALL, "sda", "sdb"]
@@ -0,0 +1,112 @@
+import gzip
+
+import pytest
+
+import WindowsTweak as wt
+
+
+def telemetry_sample(k):
+    """Deterministic TelemetrySampler-shaped sample."""
+    Times = wt.namedtuple("scputimes", "user system idle")
+    return {"ts": 1000.0 + k, "cpu": k * 1.5, "cpu_cores": [k, k + 0.25],
+            "cpu_core_times": [Times(k, 1.0, 2.0), Times(k, 3.0, 4.0)],
+            "ram": 40.0 + k, "ram_available": 2 ** 30 + k,
+            "net": {"eth0": dict.fromkeys(wt.NetTelemetry.FIELDS, float(k))},
+            "disk_io": {"sda": dict.fromkeys(wt.DiskTelemetry.METRICS, float(k))},
+            "partitions": {"/": 50.0}}
+
+
+def snapshots(n, rows=200, churn=0.1):
+    provider = wt.SyntheticProcessProvider(rows, seed=3, churn=churn)
+    out = []
+    for i in range(n):
+        snap = provider.sample()
+        snap.ts = 1000.0 + i  # The provider stamps wall time
+        out.append(snap)
+    return out
+
+
+def columns(snap):
+    """Everything a trace keeps of a snapshot, per PID."""
+    return {pid: (snap.name[i], snap.user[i], snap.status[i], snap.cpu[i], snap.rss[i],
+                  snap.rss_delta[i], round(snap.read_bps[i]), round(snap.write_bps[i]))
+            for i, pid in enumerate(snap.pid)}
+
+
+@pytest.fixture
+def trace(tmp_path):
+    path = str(tmp_path / "t.wtr")
+    rec = wt.TraceRecorder(path)
+    snaps = snapshots(5)
+    for k, snap in enumerate(snaps):
+        rec.system(telemetry_sample(k))
+        rec.processes(snap)
+        rec.processes(snap)  # Same snapshot again: stored once
+    rec.close()
+    return path, snaps
+
+
+def test_round_trip(trace):
+    path, snaps = trace
+    player = wt.TracePlayer(path, speed=0)
+    telemetry, procs = player.telemetry(), player.processes()
+    got_samples, got_snaps = [], []
+    while not player.finished:
+        got_samples.append(telemetry.sample())
+        got_snaps.append(procs.sample())
+
+    assert [s["ts"] for s in got_samples] == [1000.0 + k for k in range(5)]
+    s = got_samples[3]
+    assert s["cpu"] == 4.5 and s["cpu_cores"] == [3, 3.25]
+    assert s["cpu_core_times"][1].system == 3.0
+    assert s["net"]["eth0"]["bytes_recv"] == 3.0
+    assert [columns(s) for s in got_snaps] == [columns(s) for s in snaps]
+
+
+def test_process_records_are_deltas(trace):
+    path, snaps = trace
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    procs = [wt.json.loads(l) for l in lines[1:] if l.startswith('{"k":"processes"')]
+    assert len(procs) == len(snaps)
+    assert len(procs[0]["add"]) == len(snaps[0]) and procs[0]["del"] == []
+    # 10% churn: later records only add the newcomers
+    assert all(len(p["add"]) == 20 and len(p["del"]) == 20 for p in procs[1:])
+
+
+def test_replays_are_identical(trace):
+    path, _ = trace
+
+    def replay():
+        player = wt.TracePlayer(path, speed=0)
+        procs = player.processes()
+        seen = []
+        while not player.finished:
+            snap = procs.sample()
+            seen.append((snap.ts, snap.pid, snap.cpu, snap.rss))
+        return seen
+    assert replay() == replay()
+
+
+def test_history_follows_the_replay(trace):
+    path, snaps = trace
+    player = wt.TracePlayer(path, speed=0)
+    procs = player.processes(wt.ProcessHistory(maxlen=10))
+    while not player.finished:
+        procs.sample()
+    pid = snaps[-1].pid[0]
+    assert procs.history.rss_history(pid)[-1] == pytest.approx(snaps[-1].rss[0] / 1048576)
+    gone = set(snaps[0].pid) - set(snaps[-1].pid)
+    assert gone and not any(procs.history.rss_history(p) for p in gone)
+
+
+def test_not_a_trace(tmp_path):
+    bad = tmp_path / "bad.wtr"
+    bad.write_bytes(b"plain text")
+    with pytest.raises(ValueError, match="not a readable trace"):
+        wt.TracePlayer(str(bad))
+    other = tmp_path / "other.wtr"
+    with gzip.open(other, "wt") as f:
+        f.write('{"wtr": 99}\n')
+    with pytest.raises(ValueError, match="version"):
+        wt.TracePlayer(str(other))
@@ -0,0 +1,84 @@
+import WindowsTweak as wt
+
+LISTING = """
+Profiles on interface Wi-Fi:
+
+Group policy profiles (read only)
+---------------------------------
+    <None>
+
+User profiles
+-------------
+    All User Profile     : Home
+    All User Profile     : Office AP 5G
+    All User Profile     : Café
+"""
+
+KEY_TEMPLATE = """
+Profile {name} on interface Wi-Fi:
+=======================================================================
+Security settings
+-----------------
+    Authentication         : WPA2-Personal
+    Key Content            : {key}
+"""
+
+OPEN_NETWORK = """
+Profile Guest on interface Wi-Fi:
+Security settings
+-----------------
+    Authentication         : Open
+    Security key           : Absent
+"""
+
+
+def test_parse_profiles_keeps_spaces_and_unicode():
+    assert wt.parse_wlan_profiles(LISTING) == ["Home", "Office AP 5G", "Café"]
+    assert wt.parse_wlan_profiles("There is no wireless interface on the system.") == []
+
+
+def test_parse_key():
+    assert wt.parse_wlan_key(KEY_TEMPLATE.format(name="Home", key="hunter2 ")) == "hunter2"
+    assert wt.parse_wlan_key(OPEN_NETWORK) == "N/A"
+
+
+def fake_netsh(keys, broken=()):
+    def run(cmd):
+        if cmd == wt.WLAN_LIST_CMD:
+            return LISTING
+        name = cmd.split('"')[1]
+        if name in broken:
+            raise OSError("netsh crashed")
+        return KEY_TEMPLATE.format(name=name, key=keys[name])
+    return run
+
+
+def run_worker(runner):
+    worker = wt.WifiWorker(runner=runner, max_workers=2)
+    got, done = {}, []
+    worker.profile_ready.connect(lambda ssid, key: got.__setitem__(ssid, key))
+    worker.scan_done.connect(lambda count, err: done.append((count, err)))
+    worker.run()  # Synchronously: the pool is what is under test
+    return got, done
+
+
+def test_worker_reads_every_profile(qapp):
+    keys = {"Home": "pw1", "Office AP 5G": "pw2", "Café": "pw3"}
+    got, done = run_worker(fake_netsh(keys))
+    assert got == keys
+    assert done == [(3, "")]
+
+
+def test_worker_skips_a_failing_profile(qapp):
+    keys = {"Home": "pw1", "Office AP 5G": "pw2", "Café": "pw3"}
+    got, done = run_worker(fake_netsh(keys, broken={"Home"}))
+    assert got == {"Office AP 5G": "pw2", "Café": "pw3"}
+    assert done == [(3, "")]
+
+
+def test_worker_reports_listing_failure(qapp):
+    def runner(cmd):
+        raise OSError("netsh not found")
+    got, done = run_worker(runner)
+    assert got == {}
+    assert done == [(0, "netsh not found")]